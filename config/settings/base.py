@@ -192,6 +192,7 @@ TEMPLATES = [
                 "django.template.context_processors.tz",
                 "django.contrib.messages.context_processors.messages",
                 "smplshop.users.context_processors.allauth_settings",
+                "smplshop.shop.context_processors.open_order_counts",
             ],
         },
     }
@@ -286,6 +287,38 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+# the database scheduler adds these to its periodic tasks when beat starts
+CELERY_BEAT_SCHEDULE = {
+    "delete-abandoned-carts": {
+        "task": "smplshop.shop.tasks.delete_abandoned_carts",
+        "schedule": 60 * 60,
+    },
+    "dispatch-order-events": {
+        "task": "smplshop.shop.tasks.dispatch_order_events",
+        "schedule": 60,
+    },
+    "prune-order-events": {
+        "task": "smplshop.shop.tasks.prune_order_events",
+        "schedule": 60 * 60,
+    },
+    "update-sales-rollups": {
+        "task": "smplshop.shop.tasks.update_sales_rollups",
+        "schedule": 5 * 60,
+    },
+    "reconcile-order-counts": {
+        "task": "smplshop.shop.tasks.reconcile_order_counts",
+        "schedule": 10 * 60,
+    },
+    "archive-orders": {
+        "task": "smplshop.shop.tasks.archive_orders",
+        "schedule": 24 * 60 * 60,
+    },
+    "create-order-partitions": {
+        "task": "smplshop.shop.tasks.create_order_partitions",
+        "schedule": 24 * 60 * 60,
+    },
+}
 # django-allauth
 # ------------------------------------------------------------------------------
 ACCOUNT_ALLOW_REGISTRATION = env.bool("DJANGO_ACCOUNT_ALLOW_REGISTRATION", True)
@@ -334,3 +367,80 @@ SPECTACULAR_SETTINGS = {
 # Your stuff...
 # ------------------------------------------------------------------------------
 ITEMS_PER_PAGE = 10
+# Number of stores each worker keeps resolved in memory for /shop/ requests
+STORE_CACHE_SIZE = env.int("STORE_CACHE_SIZE", default=256)
+# Redis used to tell the other workers when a cached store changes
+STORE_CACHE_REDIS_URL = env("REDIS_URL", default=None)
+# Seconds after the store cache listener lost Redis before it is started again,
+# stores are read from the database in between
+STORE_CACHE_LISTENER_RETRY = env.int("STORE_CACHE_LISTENER_RETRY", default=30)
+# Seconds a storefront catalog snapshot is kept, writes invalidate it earlier
+CATALOG_CACHE_TIMEOUT = env.int("CATALOG_CACHE_TIMEOUT", default=6 * 60 * 60)
+# Products shown per storefront page
+SHOP_FRONT_ITEMS_PER_PAGE = 48
+# Where carts are kept until they are ordered, RedisCartBackend keeps them out
+# of the database
+CART_BACKEND = env("CART_BACKEND", default="smplshop.shop.carts.DatabaseCartBackend")
+# Redis used by RedisCartBackend
+CART_REDIS_URL = env("REDIS_URL", default=None)
+# Seconds a cart in Redis is kept after its last change
+CART_TTL = env.int("CART_TTL", default=7 * 24 * 60 * 60)
+# Seconds a cart in Redis is held by a checkout whose order has not committed,
+# after a rolled back order it can be ordered again once they are over
+CART_CHECKOUT_LOCK = env.int("CART_CHECKOUT_LOCK", default=30)
+# Seconds without a product added after which a cart is deleted as abandoned,
+# the default is the session cookie age
+CART_ABANDONED_AFTER = env.int("CART_ABANDONED_AFTER", default=14 * 24 * 60 * 60)
+# Carts deleted per transaction when abandoned carts are deleted
+CART_REAPER_BATCH_SIZE = env.int("CART_REAPER_BATCH_SIZE", default=1000)
+# Seconds a browser may reuse the items of an order on the order board, the
+# board links to them by updated_at so a changed order is fetched again
+ORDER_ITEMS_MAX_AGE = env.int("ORDER_ITEMS_MAX_AGE", default=24 * 60 * 60)
+# Most orders one bulk status change on the order board or API may name
+ORDER_STATUS_CHANGE_MAX = env.int("ORDER_STATUS_CHANGE_MAX", default=1000)
+# Seconds a packer holds the orders claimed from the fulfilment work queue
+FULFILMENT_LEASE = env.int("FULFILMENT_LEASE", default=15 * 60)
+# Orders claimed at once from the order board
+FULFILMENT_BATCH_SIZE = env.int("FULFILMENT_BATCH_SIZE", default=10)
+# Consumers of the order events by the name their cursor is kept under
+ORDER_EVENT_HANDLERS = {
+    "email": "smplshop.shop.events.send_order_emails",
+    "webhook": "smplshop.shop.events.post_order_webhooks",
+}
+# Where post_order_webhooks sends the order events
+ORDER_EVENT_WEBHOOK_URLS = env.list("ORDER_EVENT_WEBHOOK_URLS", default=[])
+# Order events handed to a handler at once
+ORDER_EVENT_BATCH_SIZE = env.int("ORDER_EVENT_BATCH_SIZE", default=500)
+# Seconds order events are kept once every consumer has handled them, for the
+# order board feed to catch up from
+ORDER_EVENT_RETENTION = env.int("ORDER_EVENT_RETENTION", default=7 * 24 * 60 * 60)
+# Redis the order events are published to the order board feeds through by the
+# relay_order_events command, without it each feed reads the order events itself
+ORDER_FEED_REDIS_URL = env("REDIS_URL", default=None)
+# Seconds between reads of the order events by the relay, or by each feed
+# without Redis
+ORDER_FEED_POLL = env.int("ORDER_FEED_POLL", default=2)
+# Seconds an order board feed stays open before the browser reconnects. The feed
+# is served by threaded workers of its own in production, this keeps it under
+# the 30 second timeout of a sync gunicorn worker all the same
+ORDER_FEED_TIMEOUT = env.int("ORDER_FEED_TIMEOUT", default=25)
+# Rows read from the database and written out at a time by order exports
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+# Seconds an order change waits before it is rolled up into the daily sales,
+# longer than a transaction changing orders takes to commit
+SALES_ROLLUP_LAG = env.int("SALES_ROLLUP_LAG", default=60)
+# Redis keeping the open orders of each store by status for the staff pages,
+# without it they are counted in the database
+ORDER_COUNTS_REDIS_URL = env("REDIS_URL", default=None)
+# Days after their last change that closed and cancelled orders are archived
+ORDER_ARCHIVE_AFTER = env.int("ORDER_ARCHIVE_AFTER", default=180)
+# Orders written to one archive file and deleted in one transaction
+ORDER_ARCHIVE_BATCH_SIZE = env.int("ORDER_ARCHIVE_BATCH_SIZE", default=1000)
+# Storage class of the archive files, which hold customer orders, so a private
+# storage. Orders are not archived until it is set
+ORDER_ARCHIVE_STORAGE = env("ORDER_ARCHIVE_STORAGE", default=None)
+# Folder of the archive files in their storage
+ORDER_ARCHIVE_PREFIX = "order-archive"
+# Months ahead of today that partitions of partitioned order tables are kept
+# ready for, see smplshop.shop.partitions
+ORDER_PARTITION_MONTHS_AHEAD = env.int("ORDER_PARTITION_MONTHS_AHEAD", default=3)
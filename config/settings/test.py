@@ -31,3 +31,11 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore # noqa F405
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Each test process is a single worker, no invalidation broadcast needed
+STORE_CACHE_REDIS_URL = None
+# Redis is only used by the tests that turn it on with override_settings, and
+# then in a database of its own
+CART_REDIS_URL = None
+ORDER_FEED_REDIS_URL = None
+ORDER_COUNTS_REDIS_URL = None
+TEST_REDIS_URL = env("TEST_REDIS_URL", default="redis://127.0.0.1:6379/15")
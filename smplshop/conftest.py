@@ -1,5 +1,7 @@
 import pytest
+from django.core.cache import cache
 
+from smplshop.shop.stores import store_cache
 from smplshop.users.models import User
 from smplshop.users.tests.factories import UserFactory
 
@@ -9,6 +11,16 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # test transactions roll back without firing the invalidation signals
+    store_cache.clear()
+    cache.clear()
+    yield
+    store_cache.clear()
+    cache.clear()
+
+
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
@@ -0,0 +1,27 @@
+from typing import Any
+
+from django import forms
+from django.forms.widgets import MultipleHiddenInput
+from django.utils.translation import gettext_lazy as _
+
+
+class MultipleValueField(forms.Field):
+    """All the values sent under one name, each cleaned by field."""
+
+    widget = MultipleHiddenInput
+
+    def __init__(self, field: forms.Field, max_values: int, **kwargs):
+        super().__init__(**kwargs)
+        self.field = field
+        self.max_values = max_values
+
+    def to_python(self, value: Any) -> list:
+        if value in self.empty_values:
+            return []
+        if len(value) > self.max_values:
+            raise forms.ValidationError(
+                _("At most %(max)s values can be sent at once"),
+                code="max_values",
+                params={"max": self.max_values},
+            )
+        return [self.field.clean(item) for item in value]
@@ -0,0 +1,182 @@
+import base64
+import json
+from typing import Any, Optional
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Field, QuerySet
+
+from .ordering import sorts_before
+
+KEY_PREFIX = "keyset_"
+
+
+class KeysetPage:
+    """
+    A page of rows found by seeking on the ordering columns rather than with an
+    OFFSET. There is no count, so only the neighbouring pages are known.
+    """
+
+    def __init__(
+        self,
+        object_list: list,
+        next_cursor: Optional[str] = None,
+        previous_cursor: Optional[str] = None,
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(
+        json.dumps(values, cls=DjangoJSONEncoder).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str, names: list[str], fields: list[Field]) -> Optional[dict]:
+    """
+    The values of a cursor by ordering column, or None for a cursor that was
+    not made by encode_cursor for these columns, which then starts over.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(names):
+        return None
+    # cursors come from the query string, so a value of the wrong type must not
+    # get as far as the query
+    try:
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except ValidationError:
+        return None
+    return dict(zip(names, values))
+
+
+def reverse_ordering(ordering: list[str]) -> list[str]:
+    return [name[1:] if name.startswith("-") else "-" + name for name in ordering]
+
+
+def _split_row(row: Any, count: int) -> tuple[Any, list]:
+    """Separate the ordering values annotated by paginate_keyset from a row."""
+    keys = [KEY_PREFIX + str(i) for i in range(count)]
+    if isinstance(row, tuple):
+        return row[:-count], list(row[-count:])
+    if isinstance(row, dict):
+        return row, [row.pop(key) for key in keys]
+    return row, [getattr(row, key) for key in keys]
+
+
+def paginate_keyset(
+    queryset: QuerySet,
+    ordering: list[str],
+    per_page: int,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    start: Optional[dict] = None,
+) -> KeysetPage:
+    """
+    Return the page of queryset following the after cursor, preceding the before
+    cursor, or starting at the row with the start values. ordering has to be
+    expanded to columns and end in a unique column so every row has its own key.
+    """
+    names = [name.lstrip("-") for name in ordering]
+    queryset = queryset.annotate(
+        **{KEY_PREFIX + str(i): F(name) for i, name in enumerate(names)}
+    )
+    fields = [
+        queryset.query.annotations[KEY_PREFIX + str(i)].output_field
+        for i in range(len(names))
+    ]
+    after_values = decode_cursor(after, names, fields) if after else None
+    before_values = decode_cursor(before, names, fields) if before else None
+    has_previous = after_values is not None
+
+    backwards = False
+    if before_values is not None:
+        backwards = True
+        queryset = queryset.filter(sorts_before(ordering, before_values)).order_by(
+            *reverse_ordering(ordering)
+        )
+    elif after_values is not None:
+        queryset = queryset.filter(
+            sorts_before(reverse_ordering(ordering), after_values)
+        ).order_by(*ordering)
+    elif start is not None:
+        has_previous = queryset.filter(sorts_before(ordering, start)).exists()
+        queryset = queryset.filter(~sorts_before(ordering, start)).order_by(*ordering)
+    else:
+        queryset = queryset.order_by(*ordering)
+
+    # one row more than the page tells whether there is another page
+    rows = [_split_row(row, len(names)) for row in queryset[: per_page + 1]]
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage([])
+
+    first_key, last_key = encode_cursor(rows[0][1]), encode_cursor(rows[-1][1])
+    if backwards:
+        return KeysetPage(
+            [row for row, _ in rows],
+            next_cursor=last_key,
+            previous_cursor=first_key if has_more else None,
+        )
+    return KeysetPage(
+        [row for row, _ in rows],
+        next_cursor=last_key if has_more else None,
+        previous_cursor=first_key if has_previous else None,
+    )
+
+
+def unique_ordering(ordering: list[str]) -> list[str]:
+    """Add the primary key as the last tie breaker, unless it is already there."""
+    if any(name.lstrip("-") in ("pk", "id") for name in ordering):
+        return ordering
+    return ordering + ["pk"]
+
+
+def paginate_list(
+    rows: list,
+    key,
+    per_page: int,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+) -> KeysetPage:
+    """
+    Keyset pagination over rows already in memory and in order, with the unique
+    key of a row as its cursor. A cursor that is no longer in rows starts over.
+    """
+    keys = [str(key(row)) for row in rows]
+    if before is not None and before in keys:
+        end = keys.index(before)
+        begin = max(end - per_page, 0)
+    else:
+        begin = keys.index(after) + 1 if after is not None and after in keys else 0
+        end = begin + per_page
+    page = rows[begin:end]
+    if not page:
+        return KeysetPage([])
+    return KeysetPage(
+        page,
+        next_cursor=keys[end - 1] if end < len(rows) else None,
+        previous_cursor=keys[begin] if begin > 0 else None,
+    )
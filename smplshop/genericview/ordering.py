@@ -0,0 +1,54 @@
+import operator
+from functools import reduce
+
+from django.db.models import Model, Q
+from django.db.models.base import ModelBase
+from django.db.models.constants import LOOKUP_SEP
+
+
+def expand_ordering(model: ModelBase, ordering) -> list[str]:
+    """
+    Expand ordering into the concrete columns the database sorts on.
+    Ordering on a relation sorts on the related model's own ordering, so
+    "store" becomes "store__code", "store__name" for Store.
+    """
+    expanded = []
+    for field_name in ordering:
+        descending = field_name.startswith("-")
+        name = field_name.lstrip("-")
+        if name == "pk":
+            name = model._meta.pk.name  # type: ignore
+        field = model._meta.get_field(name)  # type: ignore
+        related_ordering = field.related_model._meta.ordering if field.is_relation else None  # type: ignore
+        if related_ordering:
+            for related_name in expand_ordering(field.related_model, related_ordering):  # type: ignore
+                related_descending = related_name.startswith("-") != descending
+                expanded.append(
+                    ("-" if related_descending else "")
+                    + name
+                    + LOOKUP_SEP
+                    + related_name.lstrip("-")
+                )
+        else:
+            expanded.append(("-" if descending else "") + name)
+    return expanded
+
+
+def sorts_before(ordering: list[str], values: dict) -> Q:
+    """
+    Q matching the rows that sort before a row with the given values under the
+    expanded ordering, (a < x) or (a = x and b < y) and so on.
+    """
+    conditions = []
+    equal = Q()
+    for field_name in ordering:
+        name = field_name.lstrip("-")
+        lookup = "__gt" if field_name.startswith("-") else "__lt"
+        conditions.append(equal & Q(**{name + lookup: values[name]}))
+        equal &= Q(**{name: values[name]})
+    return reduce(operator.or_, conditions)
+
+
+def ordering_values(obj: Model, ordering: list[str]) -> dict:
+    names = [field_name.lstrip("-") for field_name in ordering]
+    return type(obj)._default_manager.filter(pk=obj.pk).values(*names).get()
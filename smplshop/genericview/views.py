@@ -1,4 +1,3 @@
-import math
 from typing import Any
 
 from django.conf import settings
@@ -12,12 +11,16 @@ from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, ListView
 
+from .keyset import paginate_keyset, unique_ordering
+from .ordering import expand_ordering, ordering_values, sorts_before
+
 
 # Create your views here.
 class GenericListView(LoginRequiredMixin, ListView):
     model: ModelBase
     fields: list
     paginate_by: int = settings.ITEMS_PER_PAGE
+    keyset_pagination: bool = False
     template_name: str
     attribute: str
 
@@ -33,29 +36,66 @@ class GenericListView(LoginRequiredMixin, ListView):
         context["fields"].append("Changed")
 
         new_code = self.request.GET.get("new_code", None)
-        if new_code is not None and self.paginate_by is not None:
+        if (
+            new_code is not None
+            and self.paginate_by is not None
+            and not self.keyset_pagination
+        ):
             obj = get_object_or_404(self.model, **{self.attribute: new_code})  # type: ignore
             if obj:
-                new_page = math.floor(self.get_page(obj.id))  # type: ignore
+                new_page = self.get_page(obj)
                 context["page_obj"] = context["paginator"].page(new_page)
                 context["object_list"] = (
                     context["paginator"]
                     .page(new_page)
-                    .object_list.annotate(
-                        new=Case(
-                            When(id=obj.id, then=Value("New")),
-                            When(~Q(id=obj.id), then=Value("")),  # type: ignore
-                        )
-                    )
+                    .object_list.annotate(new=self.get_new_annotation(obj))
                 )
 
         return context
 
-    def get_page(self, id):
-        return (
-            list(self.get_queryset().values_list("id", flat=True)).index(id)
-            / self.paginate_by
-        ) + 1
+    def get_new_annotation(self, obj):
+        return Case(
+            When(id=obj.id, then=Value("New")),
+            When(~Q(id=obj.id), then=Value("")),  # type: ignore
+        )
+
+    def get_ordering_columns(self) -> list[str]:
+        return expand_ordering(
+            self.model, self.get_ordering() or self.model._meta.ordering  # type: ignore
+        )
+
+    def get_page(self, obj) -> int:
+        # count the rows that sort before obj instead of loading every id
+        ordering = self.get_ordering_columns()
+        position = (
+            self.get_queryset()
+            .filter(sorts_before(ordering, ordering_values(obj, ordering)))
+            .count()
+        )
+        return position // self.paginate_by + 1
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination:
+            return super().paginate_queryset(queryset, page_size)
+
+        # seek on the ordering columns, no COUNT and no OFFSET
+        ordering = unique_ordering(self.get_ordering_columns())
+        start = None
+        new_code = self.request.GET.get("new_code", None)
+        if new_code is not None:
+            obj = get_object_or_404(self.model, **{self.attribute: new_code})  # type: ignore
+            start = ordering_values(obj, ordering)
+            queryset = queryset.annotate(new=self.get_new_annotation(obj))
+
+        page = paginate_keyset(
+            queryset,
+            ordering,
+            page_size,
+            after=self.request.GET.get("after", None),
+            before=self.request.GET.get("before", None),
+            start=start,
+        )
+        return (None, page, page.object_list, page.has_other_pages())
 
     def get_queryset(self):
         return super().get_queryset().values_list(*self.fields).annotate(new=Value(""))
@@ -0,0 +1,19 @@
+# Generated by Django 4.0 on 2026-10-17 13:34
+
+from django.db import migrations, models
+import smplshop.utils.uuids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master', '0004_alter_productinstore_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productinstore',
+            name='uuid',
+            field=models.UUIDField(default=smplshop.utils.uuids.uuid7, editable=False, unique=True),
+        ),
+    ]
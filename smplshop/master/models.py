@@ -1,10 +1,10 @@
-import uuid
-
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 from django.db.models import UniqueConstraint
 from django.utils.translation import gettext_lazy as _
 
+from smplshop.utils.uuids import uuid7
+
 
 # Create your models here.
 class Store(models.Model):
@@ -56,7 +56,7 @@ class Product(models.Model):
 
 
 class ProductInStore(models.Model):
-    uuid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(unique=True, default=uuid7, editable=False)
     store = models.ForeignKey(
         Store, to_field="name", on_delete=models.CASCADE, verbose_name="Store"
     )
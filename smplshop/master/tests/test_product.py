@@ -1,14 +1,14 @@
-from random import randint
-
 from django.conf import settings
 from django.contrib.messages import get_messages
-from django.core.paginator import Paginator
+from django.db import connection
 from django.db.models import Value
 from django.test import TestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
 
 from smplshop.functional_test.faker import fake
+from smplshop.genericview.keyset import encode_cursor
 from smplshop.master.models import Product
 from smplshop.users.tests.factory import UserFactory
 
@@ -52,33 +52,66 @@ class ProductListViewTest(TestCase):
             response=response, template_name="master/product_list.html"
         )
 
-    # check if all records are shown
+    # check if all records are shown, page by page in both directions
     def test_pagination(self):
 
-        all_product = (
-            Product.objects.all().values_list(*self.fields).annotate(new=Value(""))
+        all_product = list(
+            Product.objects.all()
+            .order_by("code", "name", "pk")
+            .values_list(*self.fields)
+            .annotate(new=Value(""))
         )
-        pages = Paginator(all_product, settings.ITEMS_PER_PAGE)
+        per_page = settings.ITEMS_PER_PAGE
+        pages = [
+            all_product[i:][:per_page] for i in range(0, len(all_product), per_page)
+        ]
 
         response = self.client.get("/master/product/")
-        page_1 = pages.page(1)
-        self.assertQuerysetEqual(page_1.object_list, response.context["object_list"])
-
-        page_last = pages.page(pages.num_pages)
-        response = self.client.get("/master/product/?page=" + str(pages.num_pages))
-        self.assertQuerysetEqual(page_last.object_list, response.context["object_list"])
-
-        page_n = pages.page(randint(1, pages.num_pages))
-        response = self.client.get("/master/product/?page=" + str(page_n.number))
-        self.assertQuerysetEqual(page_n.object_list, response.context["object_list"])
+        self.assertEqual(pages[0], response.context["object_list"])
+        self.assertIsNone(response.context["paginator"])
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+        for page in pages[1:]:
+            response = self.client.get(
+                "/master/product/?after=" + response.context["page_obj"].next_cursor
+            )
+            self.assertEqual(page, response.context["object_list"])
+        self.assertFalse(response.context["page_obj"].has_next())
+
+        for page in reversed(pages[:-1]):
+            response = self.client.get(
+                "/master/product/?before="
+                + response.context["page_obj"].previous_cursor
+            )
+            self.assertEqual(page, response.context["object_list"])
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_tampered_cursor_starts_over(self):
+        first_page = self.client.get("/master/product/").context["object_list"]
+        for values in [["a", "b", "x"], ["a", "b", {}], ["a", "b"], "x"]:
+            cursor = encode_cursor(values)
+            for direction in ["after", "before"]:
+                response = self.client.get(
+                    "/master/product/?{}={}".format(direction, cursor)
+                )
+                self.assertEqual(200, response.status_code)
+                self.assertEqual(first_page, response.context["object_list"])
+
+    def test_pagination_does_not_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/master/product/")
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"]])
 
     # check if new records are identified
     def test_new_records(self):
-        product = Product.objects.get(id=randint(1, 50))
+        product = Product.objects.order_by("?").first()
         response = self.client.get("/master/product/?new_code=" + str(product.code))
         self.assertContains(response, product.code)
         self.assertContains(response, product.name)
         self.assertContains(response, "New")
+        self.assertEqual(
+            (product.code, product.name, "New"), response.context["object_list"][0]
+        )
 
     # login required to access page
     def test_login_required(self):
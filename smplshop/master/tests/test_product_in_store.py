@@ -79,6 +79,17 @@ class TestProductInStoreListView(TestCase):
         response = self.client.get("/master/store/product/?page=" + str(page_n.number))
         self.assertQuerysetEqual(page_n.object_list, response.context["object_list"])
 
+    def test_new_record_page(self):
+        ids = list(ProductInStore.objects.values_list("id", flat=True))
+        for product_in_store in ProductInStore.objects.order_by("?")[:5]:
+            response = self.client.get(
+                "/master/store/product/?new_code=" + str(product_in_store.uuid)
+            )
+            self.assertEqual(
+                ids.index(product_in_store.id) // settings.ITEMS_PER_PAGE + 1,
+                response.context["page_obj"].number,
+            )
+
     # check if new records are identified
     def test_new_records(self):
         product_in_store = ProductInStoreFactory.create()
@@ -79,6 +79,15 @@ class StoreListViewTest(TestCase):
         self.assertContains(response, store.name)
         self.assertContains(response, "New")
 
+    def test_new_record_page(self):
+        store_ids = list(Store.objects.values_list("id", flat=True))
+        for store in Store.objects.order_by("?")[:5]:
+            response = self.client.get("/master/store/?new_code=" + str(store.code))
+            self.assertEqual(
+                store_ids.index(store.id) // settings.ITEMS_PER_PAGE + 1,
+                response.context["page_obj"].number,
+            )
+
     # login required to access page
     def test_login_required(self):
         self.client.logout()
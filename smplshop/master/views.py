@@ -27,6 +27,7 @@ class ProductListView(GenericListView):
     fields = ["code", "name"]
     template_name = "master/product_list.html"
     attribute = "code"
+    keyset_pagination = True
 
 
 class ProductCreateView(GenericCreateView):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "smplshop.shop"
+
+    def ready(self):
+        import smplshop.shop.signals  # noqa F401
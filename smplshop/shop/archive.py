@@ -0,0 +1,197 @@
+import gzip
+import json
+import uuid
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage, get_storage_class
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    ARCHIVABLE_ORDER_STATUSES,
+    ArchivedOrder,
+    ArchivedProductSales,
+    Order,
+    OrderItem,
+)
+
+
+def get_archive_storage() -> Storage:
+    # the files hold customer orders, so they never go to the public media
+    # storage by default
+    if settings.ORDER_ARCHIVE_STORAGE is None:
+        raise ImproperlyConfigured(
+            "Set ORDER_ARCHIVE_STORAGE to a private storage to archive orders"
+        )
+    return get_storage_class(settings.ORDER_ARCHIVE_STORAGE)()
+
+
+def order_record(order: Order) -> dict:
+    return {
+        "uuid": order.uuid,
+        "store": order.store.code,
+        "user": order.user.username,
+        "status": order.status,
+        "total_order_price": order.total_order_price,
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "items": [
+            {
+                "product": item.product.name,
+                "product_code": item.product.code,
+                "price": item.price,
+                "quantity": item.quantity,
+            }
+            for item in order.orderitem_set.all()
+        ],
+    }
+
+
+def write_archive(storage: Storage, orders: list[Order]) -> str:
+    """
+    Write the orders with their items as gzipped NDJSON, returning the file name.
+    The file is written under a temporary name and only moved to that name once
+    the transaction commits, so a rolled back batch leaves no archive behind.
+    """
+    lines = "".join(
+        json.dumps(order_record(order), cls=DjangoJSONEncoder) + "\n"
+        for order in orders
+    )
+    name = "{}/{}/{}.ndjson.gz".format(
+        settings.ORDER_ARCHIVE_PREFIX,
+        timezone.localdate().strftime("%Y/%m/%d"),
+        uuid.uuid4(),
+    )
+    temp_name = storage.save(name + ".tmp", ContentFile(gzip.compress(lines.encode())))
+    transaction.on_commit(lambda: move_archive(storage, temp_name, name))
+    return name
+
+
+def move_archive(storage: Storage, temp_name: str, name: str) -> None:
+    # storages have no rename, and the file is a single batch of orders
+    with storage.open(temp_name, "rb") as temp_file:
+        storage.save(name, temp_file)
+    storage.delete(temp_name)
+
+
+def add_archived_product_sales(orders: list[Order]) -> None:
+    """Add what the orders sold to ArchivedProductSales, by store, day and product."""
+    totals: dict[tuple[int, date, int], dict] = {}
+    for order in orders:
+        # cancelled orders sell nothing, as in the rollups
+        if order.status == "cancelled":
+            continue
+        day = timezone.localdate(order.created_at)
+        for item in order.orderitem_set.all():
+            total = totals.setdefault(
+                (order.store_id, day, item.product_id),
+                {"units": 0, "revenue": 0.0, "orders": set()},
+            )
+            total["units"] += item.quantity
+            total["revenue"] += item.total_price
+            total["orders"].add(order.pk)
+    for (store_id, day, product_id), total in totals.items():
+        sales = ArchivedProductSales.objects.filter(
+            store_id=store_id, day=day, product_id=product_id
+        )
+        if not sales.update(
+            units=F("units") + total["units"],
+            revenue=F("revenue") + total["revenue"],
+            orders=F("orders") + len(total["orders"]),
+        ):
+            ArchivedProductSales.objects.create(
+                store_id=store_id,
+                day=day,
+                product_id=product_id,
+                units=total["units"],
+                revenue=total["revenue"],
+                orders=len(total["orders"]),
+            )
+
+
+def archive_orders(batch_size: Optional[int] = None) -> dict[str, int]:
+    """
+    Move the closed and cancelled orders not changed for ORDER_ARCHIVE_AFTER days,
+    with their items, into archive files of batch_size orders each, deleting
+    them from the order tables a batch per transaction. What they sold is kept
+    for the sales rollups in ArchivedProductSales.
+    """
+    storage = get_archive_storage()
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=settings.ORDER_ARCHIVE_AFTER)
+    archived = {"orders": 0, "files": 0}
+    while True:
+        with transaction.atomic():
+            # orders locked by a late status change are left for the next run
+            orders = list(
+                Order.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(status__in=ARCHIVABLE_ORDER_STATUSES, updated_at__lt=cutoff)
+                .select_related("store", "user")
+                .prefetch_related("orderitem_set__product")
+                .order_by("updated_at")[:batch_size]
+            )
+            if not orders:
+                break
+            # if the deletes fail the temporary file is left behind, and the
+            # orders go to a new file next time
+            archive = write_archive(storage, orders)
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(
+                    uuid=order.uuid,
+                    user_id=order.user_id,
+                    store_id=order.store_id,
+                    status=order.status,
+                    total_order_price=order.total_order_price,
+                    created_at=order.created_at,
+                    updated_at=order.updated_at,
+                    archive=archive,
+                )
+                for order in orders
+            )
+            add_archived_product_sales(orders)
+            # in one statement each, the items first, without loading them
+            # again for the cascade and the signals of a delete. Archived
+            # orders are closed, so there are no open order counts to move
+            order_ids = [order.pk for order in orders]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM {} WHERE order_id = ANY(%s)".format(
+                        OrderItem._meta.db_table
+                    ),
+                    [order_ids],
+                )
+                cursor.execute(
+                    "DELETE FROM {} WHERE id = ANY(%s)".format(Order._meta.db_table),
+                    [order_ids],
+                )
+        archived["orders"] += len(orders)
+        archived["files"] += 1
+    return archived
+
+
+def read_archived_items(
+    archived_orders: Iterable[ArchivedOrder],
+) -> dict[uuid.UUID, list[dict]]:
+    """The items of the archived orders by order uuid, reading each file once."""
+    wanted: dict[str, set[str]] = {}
+    for archived_order in archived_orders:
+        wanted.setdefault(archived_order.archive, set()).add(str(archived_order.uuid))
+
+    storage = get_archive_storage()
+    items: dict[uuid.UUID, list[dict]] = {}
+    for archive, uuids in wanted.items():
+        with storage.open(archive, "rb") as archive_file:
+            for line in gzip.open(archive_file, "rt"):
+                record = json.loads(line)
+                if record["uuid"] in uuids:
+                    items[uuid.UUID(record["uuid"])] = [
+                        dict(item, total_price=item["price"] * item["quantity"])
+                        for item in record["items"]
+                    ]
+    return items
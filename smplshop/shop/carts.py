@@ -0,0 +1,306 @@
+import time
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Sum, Window
+from django.utils.module_loading import import_string
+
+from smplshop.master.models import ProductInStore, Store
+
+from .catalog import get_catalog
+from .models import Cart, CartItem
+
+
+class CartLine(NamedTuple):
+    product_in_store_uuid: uuid.UUID
+    product_id: int
+    product: str
+    price: float
+    quantity: int
+
+    @property
+    def total_price(self) -> float:
+        return self.price * self.quantity
+
+
+class CartContents(NamedTuple):
+    lines: list[CartLine]
+    total_cart_price: float
+
+
+class BaseCartBackend(ABC):
+    """
+    Where the carts of a shop are kept until they are ordered. Carts are found
+    by the uuid kept in the session and always belong to a single store.
+    """
+
+    @abstractmethod
+    def create(self, store: Store) -> str:
+        """Start an empty cart and return its uuid."""
+
+    @abstractmethod
+    def add(
+        self,
+        cart_uuid: str,
+        store: Store,
+        product_in_store_uuid: uuid.UUID,
+        quantity: int = 1,
+    ) -> bool:
+        """
+        Add quantity of the product to the cart. Returns False when either the
+        cart or the product is not in the store.
+        """
+
+    @abstractmethod
+    def quantities(self, cart_uuid: str, store: Store) -> dict[int, int]:
+        """Quantities in the cart by product in store id."""
+
+    @abstractmethod
+    def contents(self, cart_uuid: str, store: Store) -> Optional[CartContents]:
+        """The lines of the cart and its total, or None when there is no such cart."""
+
+    @abstractmethod
+    def update(
+        self, cart_uuid: str, store: Store, quantities: dict[uuid.UUID, int]
+    ) -> bool:
+        """
+        Set the quantities of products in the cart by product in store uuid, all
+        or none of them, removing the products set to 0. Products that are not
+        in the store are skipped. Returns False when there is no such cart.
+        """
+
+    @abstractmethod
+    def checkout(self, cart_uuid: str, store: Store) -> Optional[list[CartLine]]:
+        """
+        Return the lines of the cart at current prices, or None when there is
+        no such cart. Called inside the transaction creating the order, the cart
+        is removed once that transaction commits and stays if it rolls back. A
+        second checkout of the same cart meanwhile finds nothing to order.
+        """
+
+
+class DatabaseCartBackend(BaseCartBackend):
+    """Carts as Cart and CartItem rows."""
+
+    def create(self, store: Store) -> str:
+        return str(Cart.objects.create(store=store).uuid)
+
+    def add(self, cart_uuid, store, product_in_store_uuid, quantity=1):
+        return CartItem.objects.add_quantity(
+            cart_uuid, store, product_in_store_uuid, quantity
+        )
+
+    def quantities(self, cart_uuid, store):
+        return dict(
+            CartItem.objects.filter(
+                cart__uuid=cart_uuid, cart__store=store
+            ).values_list("product_in_store_id", "quantity")
+        )
+
+    def contents(self, cart_uuid, store):
+        # the cart left joined to its lines, so one query finds the cart, the
+        # lines and, as a window over all of them, the cart total
+        line_total = ExpressionWrapper(
+            F("cartitem__product_in_store__price") * F("cartitem__quantity"),
+            output_field=FloatField(),
+        )
+        rows = list(
+            Cart.objects.filter(uuid=cart_uuid, store=store)
+            .values_list(
+                "cartitem__product_in_store__uuid",
+                "cartitem__product_in_store__product__id",
+                "cartitem__product_in_store__product",
+                "cartitem__product_in_store__price",
+                "cartitem__quantity",
+            )
+            .annotate(total_cart_price=Window(Sum(line_total)))
+            .order_by("cartitem__id")
+        )
+        if not rows:
+            return None
+        # a cart without lines still comes back as a single row of nulls
+        return CartContents(
+            [CartLine(*row[:5]) for row in rows if row[4] is not None],
+            rows[0][5] or 0,
+        )
+
+    def update(self, cart_uuid, store, quantities):
+        return CartItem.objects.set_quantities(cart_uuid, store, quantities)
+
+    def checkout(self, cart_uuid, store):
+        # the row lock makes a second submit of the same cart wait until
+        # this one has deleted it
+        cart = (
+            Cart.objects.select_for_update().filter(uuid=cart_uuid, store=store).first()
+        )
+        if cart is None:
+            return None
+        lines = [
+            CartLine(*row)
+            for row in CartItem.objects.filter(cart=cart)
+            .order_by("id")
+            .values_list(
+                "product_in_store__uuid",
+                "product_in_store__product__id",
+                "product_in_store__product",
+                "product_in_store__price",
+                "quantity",
+            )
+        ]
+        if lines:
+            cart.delete()
+        return lines
+
+
+# adds to a cart only while it exists, and keeps it alive for another TTL
+REDIS_ADD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# sets quantities by product in store id in pairs after the TTL, 0 removes
+REDIS_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #ARGV, 2 do
+    if tonumber(ARGV[i + 1]) > 0 then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    else
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# reads a cart and, unless it has no lines to order, holds it for ARGV[1]
+# seconds with the lock key KEYS[2]; a held cart reads as no cart
+REDIS_CHECKOUT_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return {}
+end
+local fields = redis.call('HGETALL', KEYS[1])
+if #fields > 2 then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[1])
+end
+return fields
+"""
+
+
+class RedisCartBackend(BaseCartBackend):
+    """
+    Carts as a Redis hash per cart of quantities by product in store id, expiring
+    CART_TTL seconds after the last change. Rows are only written by checkout.
+    """
+
+    # the field that marks an empty cart as existing, product ids are digits
+    CREATED_FIELD = "created"
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(
+            settings.CART_REDIS_URL, decode_responses=True
+        )
+        self.add_script = self.client.register_script(REDIS_ADD_SCRIPT)
+        self.update_script = self.client.register_script(REDIS_UPDATE_SCRIPT)
+        self.checkout_script = self.client.register_script(REDIS_CHECKOUT_SCRIPT)
+
+    def key(self, cart_uuid: str, store: Store) -> str:
+        return "cart:{}:{}".format(store.pk, cart_uuid)
+
+    def read(self, cart_uuid: str, store: Store) -> Optional[dict[int, int]]:
+        fields = self.client.hgetall(self.key(cart_uuid, store))
+        return self.parse(fields) if fields else None
+
+    def parse(self, fields: dict) -> dict[int, int]:
+        return {
+            int(field): int(quantity)
+            for field, quantity in fields.items()
+            if field != self.CREATED_FIELD
+        }
+
+    def lines(self, store: Store, quantities: dict[int, int]) -> list[CartLine]:
+        # prices come from the database, as a cart may be older than a price change
+        rows = ProductInStore.objects.filter(
+            store=store, id__in=quantities
+        ).values_list("id", "uuid", "product__id", "product", "price")
+        return [CartLine(*row[1:], quantity=quantities[row[0]]) for row in sorted(rows)]
+
+    def product_in_store_ids(self, store: Store) -> dict[str, int]:
+        # the cached catalog tells which products are in the store
+        return {str(item["uuid"]): item["id"] for item in get_catalog(store)}
+
+    def create(self, store):
+        cart_uuid = str(uuid.uuid4())
+        key = self.key(cart_uuid, store)
+        with self.client.pipeline() as pipe:
+            pipe.hset(key, self.CREATED_FIELD, int(time.time()))
+            pipe.expire(key, settings.CART_TTL)
+            pipe.execute()
+        return cart_uuid
+
+    def add(self, cart_uuid, store, product_in_store_uuid, quantity=1):
+        product_in_store_id = self.product_in_store_ids(store).get(
+            str(product_in_store_uuid), None
+        )
+        if product_in_store_id is None:
+            return False
+        return bool(
+            self.add_script(
+                keys=[self.key(cart_uuid, store)],
+                args=[product_in_store_id, quantity, settings.CART_TTL],
+            )
+        )
+
+    def quantities(self, cart_uuid, store):
+        return self.read(cart_uuid, store) or {}
+
+    def contents(self, cart_uuid, store):
+        quantities = self.read(cart_uuid, store)
+        if quantities is None:
+            return None
+        lines = self.lines(store, quantities)
+        return CartContents(lines, sum(line.total_price for line in lines))
+
+    def update(self, cart_uuid, store, quantities):
+        product_in_store_ids = self.product_in_store_ids(store)
+        args = [settings.CART_TTL]
+        for product_in_store_uuid, quantity in quantities.items():
+            product_in_store_id = product_in_store_ids.get(
+                str(product_in_store_uuid), None
+            )
+            if product_in_store_id is not None:
+                args += [product_in_store_id, quantity]
+        return bool(self.update_script(keys=[self.key(cart_uuid, store)], args=args))
+
+    def checkout(self, cart_uuid, store):
+        # read and lock as one, so a second submit finds the cart gone. Redis is
+        # not part of the transaction, so the cart is only deleted once the
+        # order is committed. If it is rolled back the lock runs out and the
+        # cart can be ordered again.
+        key = self.key(cart_uuid, store)
+        lock_key = key + ":checkout"
+        fields = self.checkout_script(
+            keys=[key, lock_key], args=[settings.CART_CHECKOUT_LOCK]
+        )
+        if not fields:
+            return None
+        quantities = self.parse(dict(zip(fields[::2], fields[1::2])))
+        if quantities:
+            transaction.on_commit(lambda: self.client.delete(key, lock_key))
+        return self.lines(store, quantities)
+
+
+@lru_cache(maxsize=None)
+def get_cart_backend() -> BaseCartBackend:
+    return import_string(settings.CART_BACKEND)()
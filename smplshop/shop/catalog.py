@@ -0,0 +1,57 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from smplshop.master.models import ProductInStore, Store
+
+CATALOG_FIELDS = ("id", "uuid", "store", "product", "price")
+
+
+def _store_key(store_name: str) -> str:
+    # ProductInStore points at the store by name, which may hold spaces and
+    # other characters that are not safe in cache keys
+    return hashlib.md5(store_name.encode()).hexdigest()
+
+
+def _version_key(store_name: str) -> str:
+    return "catalog_version:" + _store_key(store_name)
+
+
+def get_catalog_version(store_name: str) -> int:
+    # start from the clock rather than 1 so a lost version key can never bring
+    # back a snapshot cached under an earlier version
+    key = _version_key(store_name)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key) or 0
+
+
+def bump_catalog_version(store_name: str):
+    key = _version_key(store_name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_catalog(store_name: str):
+    bump_catalog_version(store_name)
+    # bump again once the change is visible, in case a concurrent request
+    # cached the old rows under the new version before the commit
+    transaction.on_commit(lambda: bump_catalog_version(store_name))
+
+
+def get_catalog(store: Store) -> list[dict]:
+    """Return the products of the store as a list of dicts, cached per version."""
+    key = "catalog:{}:{}".format(
+        _store_key(store.name), get_catalog_version(store.name)
+    )
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = list(
+            ProductInStore.objects.filter(store=store).values(*CATALOG_FIELDS)
+        )
+        cache.set(key, catalog, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return catalog
@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import counters
+
+
+def open_order_counts(request):
+    """
+    The open orders of all stores by status for the staff menu, when they are
+    kept in Redis. Read only by a page that shows them.
+    """
+    if counters.get_client() is None:
+        return {}
+    return {
+        "open_order_counts": SimpleLazyObject(
+            lambda: counters.open_order_counts([counters.ALL_STORES])[
+                counters.ALL_STORES
+            ]
+        )
+    }
@@ -0,0 +1,177 @@
+import logging
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Optional, Union
+
+from django.conf import settings
+
+from .models import OPEN_ORDER_STATUSES, Order
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "smplshop:open_orders:"
+# the counts of every store together, under the key of this store id
+ALL_STORES = "all"
+# seconds between the two reads of a count that looks wrong, longer than a
+# committed change takes to be counted
+REPAIR_WAIT = 1.0
+
+StoreId = Union[int, str]
+
+
+@lru_cache(maxsize=None)
+def get_client():
+    """The Redis keeping the open order counts, None when they are not kept."""
+    if settings.ORDER_COUNTS_REDIS_URL is None:
+        return None
+    import redis
+
+    return redis.Redis.from_url(settings.ORDER_COUNTS_REDIS_URL, decode_responses=True)
+
+
+def key(store_id: StoreId) -> str:
+    return "{}{}".format(KEY_PREFIX, store_id)
+
+
+def count_status_changes(changes: Iterable[tuple[int, Optional[str], Optional[str]]]):
+    """
+    Move the counts of the stores by the status changes of their orders, given
+    as (store id, status before, status after), where None is before an order is
+    placed or after it is deleted. Only open statuses are counted.
+    """
+    client = get_client()
+    if client is None:
+        return
+    deltas: Counter = Counter()
+    for store_id, from_status, to_status in changes:
+        for status, delta in ((from_status, -1), (to_status, 1)):
+            if status in OPEN_ORDER_STATUSES:
+                deltas[store_id, status] += delta
+                deltas[ALL_STORES, status] += delta
+
+    import redis
+
+    try:
+        # MULTI, so a reader sees all of the changes or none
+        with client.pipeline(transaction=True) as pipe:
+            for (store_id, status), delta in deltas.items():
+                if delta:
+                    pipe.hincrby(key(store_id), status, delta)
+            pipe.execute()
+    except redis.RedisError:
+        logger.exception(
+            "Could not count order status changes, repair_order_counts will"
+        )
+
+
+def parse_store_id(store_id: str) -> StoreId:
+    return int(store_id) if store_id.isdigit() else store_id
+
+
+def read_counts(client, store_ids: list[StoreId]) -> dict[StoreId, dict[str, int]]:
+    with client.pipeline(transaction=False) as pipe:
+        for store_id in store_ids:
+            pipe.hgetall(key(store_id))
+        hashes = pipe.execute()
+    return {
+        store_id: {status: int(count) for status, count in fields.items() if int(count)}
+        for store_id, fields in zip(store_ids, hashes)
+    }
+
+
+def open_order_counts(store_ids: Iterable[StoreId]) -> dict[StoreId, dict[str, int]]:
+    """
+    The open orders of the stores, and of all stores together under ALL_STORES,
+    by status. Read from Redis in one round trip when the counts are kept there,
+    otherwise counted in the database.
+    """
+    store_ids = list(store_ids)
+    client = get_client()
+    if client is not None:
+        import redis
+
+        try:
+            return read_counts(client, store_ids)
+        except redis.RedisError:
+            logger.exception("Could not read the open order counts")
+
+    by_store = Order.objects.filter(
+        store_id__in=[store_id for store_id in store_ids if store_id != ALL_STORES]
+    ).open_counts()
+    counts: dict[StoreId, dict[str, int]] = {
+        store_id: by_store.get(store_id, {}) for store_id in store_ids
+    }
+    if ALL_STORES in counts:
+        total: Counter = Counter()
+        for store_counts in Order.objects.open_counts().values():
+            total.update(store_counts)
+        counts[ALL_STORES] = dict(total)
+    return counts
+
+
+def expected_counts() -> dict[StoreId, dict[str, int]]:
+    """The open orders in the database by store id and status, and ALL_STORES."""
+    expected: dict[StoreId, dict[str, int]] = {}
+    total: Counter = Counter()
+    for store_id, store_counts in Order.objects.open_counts().items():
+        expected[store_id] = store_counts
+        total.update(store_counts)
+    expected[ALL_STORES] = dict(total)
+    return expected
+
+
+def repair_order_counts(wait: float = REPAIR_WAIT) -> list[StoreId]:
+    """
+    Set the counts that differ from the open orders in the database to what
+    the database says, and return the stores repaired. A change is counted
+    just after it commits, so a count is only repaired when it differs on two
+    reads wait seconds apart without either side moving in between, and is
+    set with WATCH so a change counted meanwhile is not overwritten. Counts of
+    stores whose orders keep changing are left for a quieter run.
+    """
+    client = get_client()
+    if client is None:
+        return []
+    import redis
+
+    expected = expected_counts()
+    # stores counted in Redis without open orders any more count again from 0
+    counted = {
+        parse_store_id(name.partition(KEY_PREFIX)[2])
+        for name in client.scan_iter(match=key("*"), count=1000)
+    }
+    store_ids = list(expected) + [
+        store_id for store_id in counted if store_id not in expected
+    ]
+    actual = read_counts(client, store_ids)
+    differing = [
+        store_id
+        for store_id in store_ids
+        if actual.get(store_id, {}) != expected.get(store_id, {})
+    ]
+    if not differing:
+        return []
+
+    time.sleep(wait)
+    expected_again = expected_counts()
+    repaired = []
+    for store_id in differing:
+        if expected_again.get(store_id, {}) != expected.get(store_id, {}):
+            continue
+        with client.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(key(store_id))
+                if read_counts(client, [store_id])[store_id] != actual[store_id]:
+                    continue
+                pipe.multi()
+                pipe.delete(key(store_id))
+                if expected.get(store_id, None):
+                    pipe.hset(key(store_id), mapping=expected[store_id])
+                pipe.execute()
+            except redis.WatchError:
+                continue
+        repaired.append(store_id)
+    if repaired:
+        logger.warning("Repaired the open order counts of stores %s", repaired)
+    return repaired
@@ -0,0 +1,142 @@
+import json
+import logging
+import urllib.request
+from functools import lru_cache
+from typing import Callable
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Order, OrderEvent, OrderEventCursor
+
+logger = logging.getLogger(__name__)
+
+OrderEventHandler = Callable[[list[OrderEvent]], None]
+
+# seconds a webhook receiver has to answer
+WEBHOOK_TIMEOUT = 5
+# the Redis channel the order board feeds listen on
+FEED_CHANNEL = "smplshop:order_events"
+# the cursor of the relay publishing the order events to the feeds
+FEED_CURSOR = "feed"
+
+
+def get_order_event_handlers() -> dict[str, OrderEventHandler]:
+    """The handlers of ORDER_EVENT_HANDLERS by the name their cursor is kept under."""
+    return {
+        name: import_string(path)
+        for name, path in settings.ORDER_EVENT_HANDLERS.items()
+    }
+
+
+def handle_order_events(name: str, handler: OrderEventHandler, batch_size: int) -> int:
+    """
+    Hand handler the order events after the cursor kept under name, in batches
+    in the order of committed_after, and return how many it handled. The cursor
+    is moved past a batch in the same transaction once the batch is handled, so
+    a failing handler gets its batch again the next time, and sees an event at
+    least once.
+    """
+    handled = 0
+    OrderEventCursor.objects.get_or_create(name=name)
+    while True:
+        with transaction.atomic():
+            # another run still busy with this handler keeps its cursor locked
+            cursor = (
+                OrderEventCursor.objects.select_for_update(skip_locked=True)
+                .filter(name=name)
+                .first()
+            )
+            if cursor is None:
+                break
+            events = list(
+                OrderEvent.objects.committed_after(
+                    cursor.last_transaction_id, cursor.last_event_id
+                ).select_related("store")[:batch_size]
+            )
+            if not events:
+                break
+            try:
+                handler(events)
+            except Exception:
+                logger.exception(
+                    "Order event handler %s failed after event %s-%s",
+                    name,
+                    cursor.last_transaction_id,
+                    cursor.last_event_id,
+                )
+                break
+            cursor.last_transaction_id = events[-1].transaction_id
+            cursor.last_event_id = events[-1].id
+            cursor.save(
+                update_fields=["last_transaction_id", "last_event_id", "updated_at"]
+            )
+        handled += len(events)
+    return handled
+
+
+@lru_cache(maxsize=None)
+def get_feed_client():
+    """The Redis the order events are relayed to the feeds by, None without one."""
+    if settings.ORDER_FEED_REDIS_URL is None:
+        return None
+    import redis
+
+    return redis.Redis.from_url(settings.ORDER_FEED_REDIS_URL, decode_responses=True)
+
+
+def publish_order_events(events: list[OrderEvent]) -> None:
+    """
+    Publish the events to the order board feeds listening on FEED_CHANNEL, each
+    with its transaction id so a feed can tell which ones it has sent.
+    """
+    with get_feed_client().pipeline(transaction=False) as pipe:
+        for event in events:
+            pipe.publish(
+                FEED_CHANNEL,
+                json.dumps(
+                    {"transaction_id": event.transaction_id, "event": event.as_dict()}
+                ),
+            )
+        pipe.execute()
+
+
+def send_order_emails(events: list[OrderEvent]) -> None:
+    """Tell the customer of each order what happened to it."""
+    emails = dict(
+        Order.objects.filter(
+            uuid__in={event.order_uuid for event in events}
+        ).values_list("uuid", "user__email")
+    )
+    send_mass_mail(
+        [
+            (
+                "{}{}{}".format("Order ", event.order_uuid, " updated"),
+                "{}{}{}{}".format(
+                    event.get_status_display(), " at ", event.store.name, "."
+                ),
+                None,
+                [emails[event.order_uuid]],
+            )
+            for event in events
+            # orders archived since, or customers without an address
+            if emails.get(event.order_uuid, None)
+        ]
+    )
+
+
+def post_order_webhooks(events: list[OrderEvent]) -> None:
+    """POST the events as one JSON batch to each of ORDER_EVENT_WEBHOOK_URLS."""
+    body = json.dumps({"events": [event.as_dict() for event in events]}).encode()
+    for url in settings.ORDER_EVENT_WEBHOOK_URLS:
+        request = urllib.request.Request(
+            url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        # a receiver answering with an error raises, so the batch is sent again
+        with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT):
+            pass
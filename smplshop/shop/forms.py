@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+from smplshop.customforms.fields import MultipleValueField
+
+from .sales import start_of_day
+
+
+class CartUpdateForm(forms.Form):
+    """
+    Quantities to set in a cart, as repeated product_in_store_uuid and quantity
+    values paired by position. A quantity of 0 removes the product.
+    """
+
+    MAX_LINES = 100
+    MAX_QUANTITY = 9999
+
+    product_in_store_uuid = MultipleValueField(forms.UUIDField(), MAX_LINES)
+    quantity = MultipleValueField(
+        forms.IntegerField(min_value=0, max_value=MAX_QUANTITY), MAX_LINES
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        uuids = cleaned_data.get("product_in_store_uuid", None)
+        quantities = cleaned_data.get("quantity", None)
+        if uuids is None or quantities is None:
+            return cleaned_data
+        if len(uuids) != len(quantities):
+            raise ValidationError(_("Send a quantity for each product in store uuid"))
+        # a later value for the same product wins
+        cleaned_data["quantities"] = dict(zip(uuids, quantities))
+        return cleaned_data
+
+
+class PlacedDateRangeForm(forms.Form):
+    """The days orders were placed in, from date_from to date_to included."""
+
+    date_from = forms.DateField(
+        required=False,
+        label=_("Placed From"),
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        label=_("Placed To"),
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+
+    def filter_placed(self, qs):
+        """
+        The orders, or order items, placed in the range of days. An item has the
+        created_at of its order, so on partitioned tables either only reads the
+        partitions of the months in the range.
+        """
+        if not self.is_valid():
+            return qs
+
+        # compare created_at against datetimes, not created_at__date, so the
+        # filter can use an index on created_at
+        if self.cleaned_data["date_from"]:
+            qs = qs.filter(created_at__gte=start_of_day(self.cleaned_data["date_from"]))
+        if self.cleaned_data["date_to"]:
+            qs = qs.filter(
+                created_at__lt=start_of_day(
+                    self.cleaned_data["date_to"] + timedelta(days=1)
+                )
+            )
+        return qs
+
+
+class OrderTotalFilterForm(PlacedDateRangeForm):
+    """Order lists filtered by day placed and total, and sorted by total."""
+
+    SORT_CHOICES = [
+        ("", _("Newest")),
+        ("total_order_price", _("Lowest Total")),
+        ("-total_order_price", _("Highest Total")),
+    ]
+
+    total_min = forms.FloatField(required=False, min_value=0, label=_("Total From"))
+    total_max = forms.FloatField(required=False, min_value=0, label=_("Total To"))
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False, label=_("Sort"))
+
+    def filter_totals(self, qs):
+        """The orders placed in the range of days with a total in the range."""
+        qs = self.filter_placed(qs)
+        if not self.is_valid():
+            return qs
+
+        if self.cleaned_data["total_min"] is not None:
+            qs = qs.filter(total_order_price__gte=self.cleaned_data["total_min"])
+        if self.cleaned_data["total_max"] is not None:
+            qs = qs.filter(total_order_price__lte=self.cleaned_data["total_max"])
+        return qs
+
+
+class CustomerOrderFilterForm(OrderTotalFilterForm):
+    def filter(self, qs):
+        qs = self.filter_totals(qs)
+        if not self.is_valid():
+            return qs
+
+        if self.cleaned_data["sort"]:
+            qs = qs.order_by(self.cleaned_data["sort"], "-created_at")
+        return qs
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from smplshop.master.models import Store
+from smplshop.shop.models import ArchivedOrder, Order
+from smplshop.shop.sales import rebuild_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollups of a range of days, a day at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date-from",
+            type=date.fromisoformat,
+            help="first day to rebuild, YYYY-MM-DD, the day of the first order if not given",
+        )
+        parser.add_argument(
+            "--date-to",
+            type=date.fromisoformat,
+            help="last day to rebuild, YYYY-MM-DD, today if not given",
+        )
+        parser.add_argument(
+            "--store",
+            action="append",
+            help="code of a store to rebuild, all if not given",
+        )
+
+    def handle(self, *args, **options):
+        stores = Store.objects.all()
+        if options["store"]:
+            stores = stores.filter(code__in=options["store"])
+        store_ids = list(stores.values_list("id", flat=True))
+        if not store_ids:
+            raise CommandError("No such store")
+
+        day = options["date_from"]
+        if day is None:
+            # archived orders are the oldest, and are rolled up as well
+            first_orders = [
+                model.objects.filter(store_id__in=store_ids)
+                .order_by("created_at")
+                .first()
+                for model in [ArchivedOrder, Order]
+            ]
+            first_created = [order.created_at for order in first_orders if order]
+            if not first_created:
+                return
+            day = timezone.localdate(min(first_created))
+        last_day = options["date_to"] or timezone.localdate()
+
+        days = 0
+        while day <= last_day:
+            # a transaction a day, so the rollups being read are never locked for long
+            rebuild_sales(day, store_ids)
+            day += timedelta(days=1)
+            days += 1
+        self.stdout.write("{}{}".format(days, " days of sales rebuilt"))
@@ -0,0 +1,86 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+from smplshop.shop.models import Order
+from smplshop.utils.uuids import uuid7
+
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time bulk inserts of orders with random and with time ordered uuids, "
+        "and compare the size of the uuid index they leave, in temporary tables"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=200000)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="orders inserted per statement, as a burst of placed orders",
+        )
+
+    def handle(self, *args, **options):
+        fields = Order._meta.concrete_fields
+        columns = ", ".join(field.column for field in fields)
+        template = Order(user_id=1, store_id=1)
+
+        for name, generator in GENERATORS.items():
+            table = "benchmark_{}".format(name)
+            # the orders table's columns and indexes, without the foreign keys
+            # and the id sequence of the real one
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE {table} "
+                    f"(LIKE {Order._meta.db_table} INCLUDING INDEXES) ON COMMIT DROP"
+                )
+                seconds = 0.0
+                for first in range(0, options["orders"], options["batch_size"]):
+                    rows = []
+                    last = min(first + options["batch_size"], options["orders"])
+                    for order_id in range(first + 1, last + 1):
+                        template.id = order_id
+                        template.uuid = generator()
+                        template.created_at = template.updated_at = timezone.now()
+                        rows.append(
+                            [
+                                field.get_db_prep_save(
+                                    getattr(template, field.attname), connection
+                                )
+                                for field in fields
+                            ]
+                        )
+                    # only the inserts are timed, not building the rows
+                    started = time.perf_counter()
+                    execute_values(
+                        cursor.cursor,
+                        f"INSERT INTO {table} ({columns}) VALUES %s",
+                        rows,
+                        page_size=len(rows),
+                    )
+                    seconds += time.perf_counter() - started
+                cursor.execute(
+                    """
+                    SELECT pg_relation_size(indexrelid) FROM pg_index
+                    JOIN pg_attribute ON attrelid = indrelid AND attnum = indkey[0]
+                    WHERE indrelid = %s::regclass AND attname = 'uuid'
+                    """,
+                    [table],
+                )
+                index_size = cursor.fetchone()[0]
+            self.stdout.write(
+                "{}: {} orders in {:.2f}s, {:.0f} orders/s, uuid index {} kB".format(
+                    name,
+                    options["orders"],
+                    seconds,
+                    options["orders"] / seconds,
+                    index_size // 1024,
+                )
+            )
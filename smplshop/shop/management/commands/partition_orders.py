@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from smplshop.shop.partitions import TABLES, convert_to_partitioned, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the order and order item tables to tables partitioned by month "
+        "of created_at, locking them while every row is copied"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.ORDER_PARTITION_MONTHS_AHEAD,
+            help="months after this one to create partitions for",
+        )
+
+    def handle(self, *args, **options):
+        if any(is_partitioned(table) for table in TABLES):
+            raise CommandError("The order tables are already partitioned")
+        with transaction.atomic():
+            created = convert_to_partitioned(options["months_ahead"])
+        self.stdout.write("{}{}".format(len(created), " partitions created"))
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from smplshop.shop.events import (
+    FEED_CURSOR,
+    get_feed_client,
+    handle_order_events,
+    publish_order_events,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish the order events to the order board feeds through Redis as they "
+        "commit, reading the outbox every ORDER_FEED_POLL seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="publish what there is and stop"
+        )
+
+    def handle(self, *args, **options):
+        if get_feed_client() is None:
+            raise CommandError("ORDER_FEED_REDIS_URL is not set, nothing to relay to")
+        while True:
+            relayed = handle_order_events(
+                FEED_CURSOR, publish_order_events, settings.ORDER_EVENT_BATCH_SIZE
+            )
+            if options["once"]:
+                self.stdout.write("{}{}".format(relayed, " order events relayed"))
+                return
+            time.sleep(settings.ORDER_FEED_POLL)
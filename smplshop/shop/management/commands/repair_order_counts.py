@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from smplshop.shop.counters import get_client, repair_order_counts
+
+
+class Command(BaseCommand):
+    help = "Set the open order counts in Redis back to the orders in the database"
+
+    def handle(self, *args, **options):
+        if get_client() is None:
+            raise CommandError("ORDER_COUNTS_REDIS_URL is not set, nothing to repair")
+        repaired = repair_order_counts()
+        self.stdout.write(
+            "{}{}".format(len(repaired), " stores had their open order counts repaired")
+        )
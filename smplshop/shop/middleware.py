@@ -1,7 +1,7 @@
 from django.http import HttpResponseNotFound
 from django.http.request import HttpRequest
 
-from smplshop.master.models import Store
+from .stores import get_store
 
 
 class GetShopMiddleware:
@@ -24,8 +24,9 @@ class GetShopMiddleware:
         path_components = request.path.split("/")
 
         if path_components[1] == "shop":
-            if Store.objects.filter(code=path_components[2]).exists():
-                request.shop = Store.objects.get(code=path_components[2])  # type: ignore
+            shop = get_store(path_components[2])
+            if shop is not None:
+                request.shop = shop  # type: ignore
             else:
                 return HttpResponseNotFound(
                     "Shop %s does not exist" % (path_components[2])
@@ -0,0 +1,35 @@
+# Generated by Django 4.0 on 2026-10-17 12:34
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model("shop", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart", "product_in_store")
+        .annotate(items=Count("id"), keep=Min("id"), total=Sum("quantity"))
+        .filter(items__gt=1)
+    )
+    for duplicate in duplicates:
+        CartItem.objects.filter(
+            cart=duplicate["cart"], product_in_store=duplicate["product_in_store"]
+        ).exclude(id=duplicate["keep"]).delete()
+        CartItem.objects.filter(id=duplicate["keep"]).update(
+            quantity=duplicate["total"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_alter_order_options_order_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product_in_store'), name='unique_cart_product'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0 on 2026-10-17 12:37
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_total_order_price(apps, schema_editor):
+    Order = apps.get_model("shop", "Order")
+    OrderItem = apps.get_model("shop", "OrderItem")
+    item_totals = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(total=Sum(F("price") * F("quantity"), output_field=FloatField()))
+        .values("total")
+    )
+    Order.objects.update(total_order_price=Coalesce(Subquery(item_totals), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0012_cartitem_unique_cart_product"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="total_order_price",
+            field=models.FloatField(
+                default=0,
+                validators=[django.core.validators.MinValueValidator(0.0)],
+                verbose_name="Total Order Price",
+            ),
+        ),
+        migrations.RunPython(fill_total_order_price, migrations.RunPython.noop),
+    ]
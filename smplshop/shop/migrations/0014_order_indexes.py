@@ -0,0 +1,33 @@
+# Generated by Django 4.0 on 2026-10-17 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_order_total_order_price'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='order',
+            options={'ordering': ('store_id', '-created_at', '-updated_at')},
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', '-created_at', '-updated_at'], name='order_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'user', '-created_at', '-updated_at'], name='order_store_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['store', 'status', '-created_at', '-updated_at'], name='order_store_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['placed', 'accepted', 'shipped'])), fields=['store', '-created_at', '-updated_at'], name='order_open_store_created_idx'),
+        ),
+    ]
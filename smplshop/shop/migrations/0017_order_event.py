@@ -0,0 +1,34 @@
+# Generated by Django 4.0 on 2026-10-17 13:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master', '0004_alter_productinstore_options'),
+        ('shop', '0016_order_claim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEventCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_uuid', models.UUIDField()),
+                ('status', models.CharField(choices=[('placed', 'Order Placed'), ('accepted', 'Order Accepted'), ('shipped', 'Order Shipped'), ('delivered', 'Order Delivered'), ('closed', 'Order Closed'), ('cancelled', 'Order Cancelled')], max_length=15)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.store')),
+            ],
+        ),
+    ]
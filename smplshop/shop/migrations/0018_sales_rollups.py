@@ -0,0 +1,53 @@
+# Generated by Django 4.0 on 2026-10-17 13:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master', '0004_alter_productinstore_options'),
+        ('shop', '0017_order_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('changed_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('placed', 'Order Placed'), ('accepted', 'Order Accepted'), ('shipped', 'Order Shipped'), ('delivered', 'Order Delivered'), ('closed', 'Order Closed'), ('cancelled', 'Order Cancelled')], max_length=15)),
+                ('orders', models.IntegerField()),
+                ('revenue', models.FloatField()),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.store')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField()),
+                ('revenue', models.FloatField()),
+                ('orders', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.store')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(fields=('store', 'day', 'status'), name='unique_daily_sales'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('store', 'day', 'product'), name='unique_daily_product_sales'),
+        ),
+    ]
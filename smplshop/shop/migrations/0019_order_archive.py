@@ -0,0 +1,49 @@
+# Generated by Django 4.0 on 2026-10-17 13:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('master', '0004_alter_productinstore_options'),
+        ('shop', '0018_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(editable=False, unique=True)),
+                ('status', models.CharField(choices=[('placed', 'Order Placed'), ('accepted', 'Order Accepted'), ('shipped', 'Order Shipped'), ('delivered', 'Order Delivered'), ('closed', 'Order Closed'), ('cancelled', 'Order Cancelled')], max_length=15)),
+                ('total_order_price', models.FloatField(verbose_name='Total Order Price')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archive', models.CharField(max_length=255)),
+            ],
+            options={
+                'ordering': ('store_id', '-created_at'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['closed', 'cancelled'])), fields=['updated_at'], name='order_archivable_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.store'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.user'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['store', 'user', '-created_at'], name='archived_store_user_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.0 on 2026-10-17 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE shop_orderitem
+                SET created_at = shop_order.created_at
+                FROM shop_order
+                WHERE shop_orderitem.order_id = shop_order.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='created_at',
+            field=models.DateTimeField(),
+        ),
+    ]
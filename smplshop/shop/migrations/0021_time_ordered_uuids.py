@@ -0,0 +1,29 @@
+# Generated by Django 4.0 on 2026-10-17 13:34
+
+from django.db import migrations, models
+import smplshop.utils.uuids
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0020_orderitem_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='uuid',
+            field=models.UUIDField(default=smplshop.utils.uuids.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='uuid',
+            field=models.UUIDField(default=smplshop.utils.uuids.uuid7, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='uuid',
+            field=models.UUIDField(default=smplshop.utils.uuids.uuid7, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0 on 2026-10-17 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0021_time_ordered_uuids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['placed', 'accepted'])), fields=['created_at'], name='order_claimable_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0 on 2026-10-17 14:01
+
+from django.db import migrations, models
+import smplshop.shop.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0022_order_claimable_created_idx'),
+    ]
+
+    operations = [
+        # events written before come before any written from now on
+        migrations.AddField(
+            model_name='orderevent',
+            name='transaction_id',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='orderevent',
+            name='transaction_id',
+            field=models.BigIntegerField(default=smplshop.shop.models.current_transaction_id),
+        ),
+        migrations.AddField(
+            model_name='ordereventcursor',
+            name='last_transaction_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(fields=['transaction_id', 'id'], name='order_event_position_idx'),
+        ),
+    ]
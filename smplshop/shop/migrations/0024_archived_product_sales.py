@@ -0,0 +1,31 @@
+# Generated by Django 4.0 on 2026-10-17 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master', '0005_time_ordered_uuid'),
+        ('shop', '0023_order_event_transaction_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField()),
+                ('revenue', models.FloatField()),
+                ('orders', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.store')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='archivedproductsales',
+            constraint=models.UniqueConstraint(fields=('store', 'day', 'product'), name='unique_archived_product_sales'),
+        ),
+    ]
@@ -1,31 +1,166 @@
 import uuid
+from datetime import timedelta
+from typing import NamedTuple
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connection, connections, models, transaction
+from django.db.models import (
+    BigIntegerField,
+    Count,
+    F,
+    FloatField,
+    Func,
+    Index,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    UniqueConstraint,
+)
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from smplshop.master.models import Product, ProductInStore, Store
+from smplshop.utils.uuids import uuid7
+
+OPEN_ORDER_STATUSES = ["placed", "accepted", "shipped"]
+
+# sent once orders are placed or change status, with the changes as a list of
+# (store id, status before or None for a new order, status after)
+order_status_changed = Signal()
+# orders still waiting to be packed, which packers claim from the work queue
+CLAIMABLE_ORDER_STATUSES = ["placed", "accepted"]
+# orders that will not change again, which are archived once old enough
+ARCHIVABLE_ORDER_STATUSES = ["closed", "cancelled"]
 
 
 class Cart(models.Model):
-    uuid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(unique=True, default=uuid7, editable=False)
     store = models.ForeignKey(
         to=Store, on_delete=models.CASCADE, verbose_name="Store Name"
     )
+    # last time a product was added, carts idle for long are deleted as abandoned
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return str(self.uuid) + "-" + str(self.store)
 
-    @property
-    def total_cart_price(self):
-        return "%s" % (sum([float(obj.total_price) for obj in self.cartitem_set.all()]))  # type: ignore
+
+class CartItemManager(models.Manager):
+    def add_quantity(
+        self,
+        cart_uuid: uuid.UUID,
+        store: Store,
+        product_in_store_uuid: uuid.UUID,
+        quantity: int = 1,
+    ) -> bool:
+        """
+        Add quantity of the product to the cart in a single INSERT ... ON CONFLICT,
+        marking the cart as active in the same statement.
+        Returns False when either the cart or the product is not in the store.
+        """
+        cart_table = Cart._meta.db_table
+        item_table = self.model._meta.db_table
+        product_in_store_table = ProductInStore._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH cart AS (
+                    UPDATE {cart_table} SET updated_at = %s
+                    WHERE uuid = %s AND store_id = %s
+                    RETURNING id
+                )
+                INSERT INTO {item_table} (uuid, cart_id, product_in_store_id, quantity)
+                SELECT %s, cart.id, product_in_store.id, %s
+                FROM cart, {product_in_store_table} product_in_store
+                WHERE product_in_store.uuid = %s AND product_in_store.store_id = %s
+                ON CONFLICT (cart_id, product_in_store_id)
+                DO UPDATE SET quantity = {item_table}.quantity + EXCLUDED.quantity
+                """,
+                [
+                    timezone.now(),
+                    cart_uuid,
+                    store.pk,
+                    self.model._meta.get_field("uuid").get_default(),
+                    quantity,
+                    product_in_store_uuid,
+                    store.name,
+                ],
+            )
+            return cursor.rowcount > 0
+
+    def set_quantities(
+        self,
+        cart_uuid: uuid.UUID,
+        store: Store,
+        quantities: dict[uuid.UUID, int],
+    ) -> bool:
+        """
+        Set the quantities of products in the cart in a single statement, deleting
+        the lines set to 0 and upserting the rest, and mark the cart as active.
+        Products that are not in the store are skipped.
+        Returns False when the cart is not in the store.
+        """
+        cart_table = Cart._meta.db_table
+        item_table = self.model._meta.db_table
+        product_in_store_table = ProductInStore._meta.db_table
+        uuid_field = self.model._meta.get_field("uuid")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH cart AS (
+                    UPDATE {cart_table} SET updated_at = %s
+                    WHERE uuid = %s AND store_id = %s
+                    RETURNING id
+                ),
+                line AS (
+                    SELECT product_in_store.id AS product_in_store_id,
+                    requested.uuid, requested.quantity
+                    FROM unnest(%s::uuid[], %s::uuid[], %s::integer[])
+                    AS requested (product_in_store_uuid, uuid, quantity)
+                    JOIN {product_in_store_table} product_in_store
+                    ON product_in_store.uuid = requested.product_in_store_uuid
+                    AND product_in_store.store_id = %s
+                ),
+                removed AS (
+                    DELETE FROM {item_table} item USING cart, line
+                    WHERE item.cart_id = cart.id
+                    AND item.product_in_store_id = line.product_in_store_id
+                    AND line.quantity = 0
+                ),
+                upserted AS (
+                    INSERT INTO {item_table}
+                    (uuid, cart_id, product_in_store_id, quantity)
+                    SELECT line.uuid, cart.id, line.product_in_store_id, line.quantity
+                    FROM cart, line
+                    WHERE line.quantity > 0
+                    ON CONFLICT (cart_id, product_in_store_id)
+                    DO UPDATE SET quantity = EXCLUDED.quantity
+                )
+                SELECT count(*) FROM cart
+                """,
+                [
+                    timezone.now(),
+                    cart_uuid,
+                    store.pk,
+                    [
+                        str(product_in_store_uuid)
+                        for product_in_store_uuid in quantities
+                    ],
+                    [str(uuid_field.get_default()) for _ in quantities],
+                    list(quantities.values()),
+                    store.name,
+                ],
+            )
+            return cursor.fetchone()[0] > 0
 
 
 class CartItem(models.Model):
-    uuid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(unique=True, default=uuid7, editable=False)
     cart = models.ForeignKey(to=Cart, on_delete=models.CASCADE, verbose_name="Cart For")
     product_in_store = models.ForeignKey(
         to=ProductInStore,
@@ -39,17 +174,157 @@ class CartItem(models.Model):
         default=0,
     )
 
+    objects = CartItemManager()
+
     class Meta:
-        UniqueConstraint(
-            fields=["cart", "product_in_store"], name="unique_cart_product"
-        )
+        constraints = [
+            UniqueConstraint(
+                fields=["cart", "product_in_store"], name="unique_cart_product"
+            ),
+        ]
 
     def __str__(self):
         return str(self.cart) + "-" + str(self.product_in_store)
 
-    @property
-    def total_price(self):
-        return "%s" % (self.product_in_store.price * self.quantity)  # type: ignore
+
+class Transition(NamedTuple):
+    from_statuses: list[str]
+    to_status: str
+
+
+# the status changes staff can make, by the name used in requests
+ORDER_TRANSITIONS = {
+    "accept": Transition(["placed"], "accepted"),
+    "ship": Transition(["accepted"], "shipped"),
+    "deliver": Transition(["shipped"], "delivered"),
+    "close": Transition(["delivered"], "closed"),
+    "cancel": Transition(OPEN_ORDER_STATUSES, "cancelled"),
+}
+
+
+class OrderQuerySet(models.QuerySet):
+    def update_total_order_price(self) -> int:
+        """
+        Recompute the stored totals of these orders from their items in SQL.
+        OrderItem.save and OrderItem.delete call it for their order, code that
+        writes items in bulk calls it itself. There is no signal, so deleting
+        orders with their items costs no updates.
+        """
+        item_totals = (
+            OrderItem.objects.filter(order=OuterRef("pk"))
+            .values("order")
+            .annotate(total=Sum(F("price") * F("quantity"), output_field=FloatField()))
+            .values("total")
+        )
+        return self.update(
+            total_order_price=Coalesce(Subquery(item_totals), 0.0),
+            updated_at=timezone.now(),
+        )
+
+    def transition(self, change: str) -> list[uuid.UUID]:
+        """
+        Make the status change on the orders of this queryset that allow it, in
+        a single conditional UPDATE, and return the uuids of the orders changed.
+        The status is checked again on each row as it is updated, so of two
+        concurrent changes to an order only the first one applies. An
+        OrderEvent is appended for each order changed by the same statement, and
+        order_status_changed is sent once the change commits.
+        """
+        transition = ORDER_TRANSITIONS[change]
+        sql, params = (
+            self.filter(status__in=transition.from_statuses)
+            .order_by()
+            .values("pk")
+            .query.sql_with_params()
+        )
+        now = timezone.now()
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            # the rows are locked and their status read again before they are
+            # changed, so the status they had is the one they are changed from.
+            # They are locked in id order, so two changes of overlapping orders
+            # wait for each other instead of deadlocking
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    UPDATE {table}
+                    SET status = %s, updated_at = %s
+                    FROM (
+                        SELECT id, status FROM {table}
+                        WHERE id IN ({sql}) AND status = ANY(%s)
+                        ORDER BY id
+                        FOR UPDATE
+                    ) AS old
+                    WHERE {table}.id = old.id
+                    RETURNING {table}.uuid, {table}.store_id, old.status
+                ), event AS (
+                    INSERT INTO {OrderEvent._meta.db_table}
+                        (order_uuid, store_id, status, created_at, transaction_id)
+                    SELECT uuid, store_id, %s, %s, pg_current_xact_id()::text::bigint
+                    FROM moved
+                )
+                SELECT uuid, store_id, status FROM moved
+                """,
+                [
+                    transition.to_status,
+                    now,
+                    *params,
+                    transition.from_statuses,
+                    transition.to_status,
+                    now,
+                ],
+            )
+            rows = cursor.fetchall()
+        if rows:
+            changes = [
+                (store_id, from_status, transition.to_status)
+                for _, store_id, from_status in rows
+            ]
+            transaction.on_commit(
+                lambda: order_status_changed.send(sender=self.model, changes=changes),
+                using=self.db,
+            )
+        return [row[0] for row in rows]
+
+    def open_counts(self) -> dict[int, dict[str, int]]:
+        """The open orders of this queryset by store id and status."""
+        counts: dict[int, dict[str, int]] = {}
+        for store_id, status, orders in (
+            self.filter(status__in=OPEN_ORDER_STATUSES)
+            .order_by()
+            .values_list("store_id", "status")
+            .annotate(orders=Count("id"))
+        ):
+            counts.setdefault(store_id, {})[status] = orders
+        return counts
+
+    def claim(self, user, count: int) -> list["Order"]:
+        """
+        Lease up to count of the oldest unclaimed orders waiting to be packed to
+        user for FULFILMENT_LEASE seconds. Orders another worker is claiming at
+        the same moment are skipped rather than waited for, so concurrent claims
+        get disjoint batches. An order whose lease ran out can be claimed again.
+        """
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            orders = list(
+                self.select_for_update(skip_locked=True)
+                .filter(status__in=CLAIMABLE_ORDER_STATUSES)
+                .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+                .order_by("created_at")[:count]
+            )
+            claimed_until = now + timedelta(seconds=settings.FULFILMENT_LEASE)
+            self.model.objects.filter(pk__in=[order.pk for order in orders]).update(
+                claimed_by=user, claimed_until=claimed_until
+            )
+        for order in orders:
+            order.claimed_by = user
+            order.claimed_until = claimed_until
+        return orders
+
+    def release(self, user) -> int:
+        """Give back the orders of this queryset that user has claimed."""
+        return self.filter(claimed_by=user).update(claimed_by=None, claimed_until=None)
 
 
 class Order(models.Model):
@@ -62,89 +337,342 @@ class Order(models.Model):
         ("closed", "Order Closed"),
         ("cancelled", "Order Cancelled"),
     ]
-    uuid = models.UUIDField(unique=True, default=uuid.uuid4, editable=False)
+    # kept unique by a trigger instead of a constraint once the order tables
+    # are partitioned, see smplshop.shop.partitions
+    uuid = models.UUIDField(unique=True, default=uuid7, editable=False)
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     store = models.ForeignKey(to=Store, on_delete=models.CASCADE)
     status = models.CharField(
         max_length=15, choices=ORDER_STATUS_CHOICES, default="placed"
     )
+    total_order_price = models.FloatField(
+        validators=[MinValueValidator(0.0)],
+        verbose_name="Total Order Price",
+        default=0,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # the packer working on the order, until the lease runs out
+    claimed_by = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="claimed_orders",
+    )
+    claimed_until = models.DateTimeField(null=True, blank=True)
 
-    def can_shop_cancel_order(self):
-        return True if self.status in ["placed", "accepted", "shipped"] else False
+    objects = OrderQuerySet.as_manager()
 
-    def cancel_order(self):
-        if self.can_shop_cancel_order():
-            self.status = "cancelled"
-        else:
+    @property
+    def claimant(self):
+        """Who holds a lease on the order that has not run out, if anyone."""
+        if self.claimed_until is None or self.claimed_until < timezone.now():
+            return None
+        return self.claimed_by
+
+    def can_change_status(self, change: str) -> bool:
+        return self.status in ORDER_TRANSITIONS[change].from_statuses
+
+    def change_status(self, change: str):
+        if not Order.objects.filter(pk=self.pk).transition(change):
             raise ValidationError(
-                _("{}{}{}".format("Order ", self.uuid, " cannot be cancelled"))
+                _(
+                    "{}{}{}".format(
+                        "Order ",
+                        self.uuid,
+                        " cannot be " + ORDER_TRANSITIONS[change].to_status,
+                    )
+                )
             )
-        self.save()
+        self.refresh_from_db(fields=["status", "updated_at"])
+
+    def can_shop_cancel_order(self):
+        return self.can_change_status("cancel")
+
+    def cancel_order(self):
+        self.change_status("cancel")
 
     def can_shop_ship_order(self):
-        return True if self.status == "accepted" else False
+        return self.can_change_status("ship")
 
     def ship_order(self):
-        if self.can_shop_ship_order():
-            self.status = "shipped"
-        else:
-            raise ValidationError(
-                _("{}{}{}".format("Order ", self.uuid, " cannot be shipped"))
-            )
-        self.save()
+        self.change_status("ship")
 
     def can_shop_accept_order(self):
-        return True if self.status == "placed" else False
+        return self.can_change_status("accept")
 
     def accept_order(self):
-        if self.can_shop_accept_order():
-            self.status = "accepted"
-        else:
-            raise ValidationError(
-                _("{}{}{}".format("Order ", self.uuid, " cannot be accepted"))
-            )
-        self.save()
+        self.change_status("accept")
 
     def can_shop_deliver_order(self):
-        return True if self.status == "shipped" else False
+        return self.can_change_status("deliver")
 
     def deliver_order(self):
-        if self.can_shop_deliver_order():
-            self.status = "delivered"
-        else:
-            raise ValidationError(
-                _("{}{}{}".format("Order ", self.uuid, " cannot be delivered"))
-            )
-        self.save()
+        self.change_status("deliver")
 
     def can_shop_close_order(self):
-        return True if self.status == "delivered" else False
+        return self.can_change_status("close")
 
     def close_order(self):
-        if self.can_shop_close_order():
-            self.status = "closed"
-        else:
-            raise ValidationError(
-                _("{}{}{}".format("Order ", self.uuid, " cannot be closed"))
-            )
-        self.save()
-
-    @property
-    def total_order_price(self):
-        return sum([float(obj.total_price) for obj in self.orderitem_set.all()])  # type: ignore
+        self.change_status("close")
 
     class Meta:
-        ordering = ("store", "-created_at", "-updated_at")
+        # store_id rather than store, which would join and sort on the store code
+        # and keep the indexes below from serving the ordering
+        ordering = ("store_id", "-created_at", "-updated_at")
+        indexes = [
+            # staff order board, newest first within a store
+            Index(
+                fields=["store", "-created_at", "-updated_at"],
+                name="order_store_created_idx",
+            ),
+            # customer order list
+            Index(
+                fields=["store", "user", "-created_at", "-updated_at"],
+                name="order_store_user_created_idx",
+            ),
+            # staff order board filtered by status
+            Index(
+                fields=["store", "status", "-created_at", "-updated_at"],
+                name="order_store_status_created_idx",
+            ),
+            # orders still being worked on, a small slice of the table
+            Index(
+                fields=["store", "-created_at", "-updated_at"],
+                name="order_open_store_created_idx",
+                condition=Q(status__in=OPEN_ORDER_STATUSES),
+            ),
+            # the fulfilment queue across all stores, oldest first; claims for
+            # one store use order_open_store_created_idx
+            Index(
+                fields=["created_at"],
+                name="order_claimable_created_idx",
+                condition=Q(status__in=CLAIMABLE_ORDER_STATUSES),
+            ),
+            # closed and cancelled orders by age, for the archiver
+            Index(
+                fields=["updated_at"],
+                name="order_archivable_updated_idx",
+                condition=Q(status__in=ARCHIVABLE_ORDER_STATUSES),
+            ),
+        ]
 
 
 class OrderItem(models.Model):
+    # checked by a trigger instead of a constraint once the order tables are
+    # partitioned, see smplshop.shop.partitions
     order = models.ForeignKey(to=Order, on_delete=models.CASCADE)
     product = models.ForeignKey(to=Product, on_delete=models.PROTECT)
     price = models.FloatField(validators=[MinValueValidator(0.0)])
     quantity = models.IntegerField(validators=[MinValueValidator(0)])
+    # the created_at of the order, which partitioned item tables are split by
+    created_at = models.DateTimeField()
+
+    def save(self, *args, **kwargs):
+        if self.created_at is None:
+            self.created_at = self.order.created_at
+        super().save(*args, **kwargs)
+        Order.objects.filter(pk=self.order_id).update_total_order_price()
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        Order.objects.filter(pk=self.order_id).update_total_order_price()
+        return deleted
 
     @property
     def total_price(self):
         return self.price * self.quantity  # type: ignore
+
+
+class CurrentTransactionId(Func):
+    """The id of the transaction running the statement."""
+
+    template = "pg_current_xact_id()::text::bigint"
+    output_field = BigIntegerField()
+
+
+class OldestRunningTransactionId(Func):
+    """
+    The id below which every transaction has committed or rolled back, as seen
+    by the statement.
+    """
+
+    template = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+    output_field = BigIntegerField()
+
+
+def current_transaction_id() -> CurrentTransactionId:
+    return CurrentTransactionId()
+
+
+class OrderEventQuerySet(models.QuerySet):
+    def committed_after(
+        self, transaction_id: int, event_id: int
+    ) -> "OrderEventQuerySet":
+        """
+        The events after the position (transaction_id, event_id) that are safe to
+        read past, in the order consumers read them. Ids are handed out as events
+        are written but show up as their transactions commit, so events are read
+        by the transaction that wrote them instead, and only those of
+        transactions older than every transaction still running. Events of a
+        transaction still running wait for it however long it takes, and events
+        of different transactions come in the order the transactions started.
+        """
+        return self.filter(
+            Q(transaction_id__gt=transaction_id)
+            | Q(transaction_id=transaction_id, id__gt=event_id),
+            transaction_id__lt=OldestRunningTransactionId(),
+        ).order_by("transaction_id", "id")
+
+    def handled(self) -> "OrderEventQuerySet":
+        """The events every consumer with a cursor has read past."""
+        handled = self
+        for cursor in OrderEventCursor.objects.all():
+            handled = handled.filter(
+                Q(transaction_id__lt=cursor.last_transaction_id)
+                | Q(
+                    transaction_id=cursor.last_transaction_id,
+                    id__lte=cursor.last_event_id,
+                )
+            )
+        return handled
+
+
+class OrderEvent(models.Model):
+    """
+    An order placed or moved to a status, appended in the transaction that does
+    it and never changed afterwards. Consumers read the events in the order of
+    OrderEventQuerySet.committed_after.
+    """
+
+    # the uuid rather than a key to the order, so the event outlives it
+    order_uuid = models.UUIDField()
+    store = models.ForeignKey(to=Store, on_delete=models.CASCADE)
+    status = models.CharField(max_length=15, choices=Order.ORDER_STATUS_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+    # the transaction that wrote the event, set by the database on insert
+    transaction_id = models.BigIntegerField(default=current_transaction_id)
+
+    objects = OrderEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            Index(fields=["transaction_id", "id"], name="order_event_position_idx")
+        ]
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "order_uuid": str(self.order_uuid),
+            "store": self.store.code,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class OrderEventCursor(models.Model):
+    """The last event a consumer of the order events has handled."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    last_transaction_id = models.BigIntegerField(default=0)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DailySales(models.Model):
+    """
+    The orders of a store placed on a day that are in one status, with their
+    revenue. Rebuilt from the orders by smplshop.shop.sales, never edited.
+    """
+
+    store = models.ForeignKey(to=Store, on_delete=models.CASCADE)
+    day = models.DateField()
+    status = models.CharField(max_length=15, choices=Order.ORDER_STATUS_CHOICES)
+    orders = models.IntegerField()
+    revenue = models.FloatField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["store", "day", "status"], name="unique_daily_sales"
+            ),
+        ]
+
+
+class DailyProductSales(models.Model):
+    """
+    Units and revenue of a product in the orders of a store placed on a day,
+    leaving out cancelled orders. Rebuilt from the orders by smplshop.shop.sales.
+    """
+
+    store = models.ForeignKey(to=Store, on_delete=models.CASCADE)
+    day = models.DateField()
+    product = models.ForeignKey(to=Product, on_delete=models.CASCADE)
+    units = models.IntegerField()
+    revenue = models.FloatField()
+    orders = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["store", "day", "product"], name="unique_daily_product_sales"
+            ),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """How far the orders changed have been rolled up into the sales tables."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    changed_until = models.DateTimeField()
+
+
+class ArchivedOrder(models.Model):
+    """
+    An order moved out of Order into an archive file, keeping what a list of
+    orders shows. Its items are only in the file.
+    """
+
+    uuid = models.UUIDField(unique=True, editable=False)
+    user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    store = models.ForeignKey(to=Store, on_delete=models.CASCADE)
+    status = models.CharField(max_length=15, choices=Order.ORDER_STATUS_CHOICES)
+    total_order_price = models.FloatField(verbose_name="Total Order Price")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    # name of the archive file in the archive storage
+    archive = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ("store_id", "-created_at")
+        indexes = [
+            # customer order list
+            Index(
+                fields=["store", "user", "-created_at"],
+                name="archived_store_user_idx",
+            ),
+        ]
+
+
+class ArchivedProductSales(models.Model):
+    """
+    Units and revenue of a product in the archived orders of a store placed on
+    a day, leaving out cancelled orders. Added to as orders are archived, so the
+    sales rollups of a day rebuilt after its items are gone still count them.
+    """
+
+    store = models.ForeignKey(to=Store, on_delete=models.CASCADE)
+    day = models.DateField()
+    product = models.ForeignKey(to=Product, on_delete=models.CASCADE)
+    units = models.IntegerField()
+    revenue = models.FloatField()
+    orders = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["store", "day", "product"],
+                name="unique_archived_product_sales",
+            ),
+        ]
@@ -0,0 +1,287 @@
+"""
+Monthly range partitions of the order and order item tables on created_at.
+
+Partitioning is optional. partition_orders converts the tables once, in a
+maintenance window, and create_order_partitions keeps partitions ready for the
+months ahead from then on. PostgreSQL needs the partition key in every unique
+key of a partitioned table, so once converted the primary keys are
+(id, created_at), and neither a unique constraint on the uuid of an order nor
+a foreign key from an item to its order by id can be declared. Triggers keep
+both instead, which the migrations of the shop app do not know about:
+
+- an order cannot be given the uuid of another order
+- an item cannot be given an order that does not exist, and an order cannot be
+  deleted before its items. The cascade from an order to its items is done by
+  Django, and by the archive
+
+A DEFAULT partition takes the rows of months without a partition of their own,
+so an order is still placed if the partitions ahead ran out, and
+create_partitions moves them to their month's partition once it is made.
+"""
+import logging
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+TABLES = [Order._meta.db_table, OrderItem._meta.db_table]
+
+# set while rows are moved out of a DEFAULT partition, which deletes orders
+# whose items are still there
+MOVING_ROWS = "smplshop.moving_partition_rows"
+
+INTEGRITY_TRIGGERS = f"""
+CREATE FUNCTION shop_order_check_uuid() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- orders with the same uuid are made one at a time, so neither misses the
+    -- other
+    PERFORM pg_advisory_xact_lock(hashtextextended(NEW.uuid::text, 0));
+    IF EXISTS (
+        SELECT 1 FROM {Order._meta.db_table} WHERE uuid = NEW.uuid AND id <> NEW.id
+    ) THEN
+        RAISE unique_violation USING MESSAGE = format(
+            'an order with uuid %s already exists', NEW.uuid
+        );
+    END IF;
+    RETURN NEW;
+END
+$$;
+CREATE TRIGGER shop_order_check_uuid
+BEFORE INSERT OR UPDATE OF uuid ON {Order._meta.db_table}
+FOR EACH ROW EXECUTE FUNCTION shop_order_check_uuid();
+
+CREATE FUNCTION shop_orderitem_check_order() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    -- locked like a foreign key does, so the order is not deleted meanwhile
+    PERFORM 1 FROM {Order._meta.db_table}
+    WHERE id = NEW.order_id AND created_at = NEW.created_at
+    FOR KEY SHARE;
+    IF NOT FOUND THEN
+        RAISE foreign_key_violation USING MESSAGE = format(
+            'order %s of the item does not exist', NEW.order_id
+        );
+    END IF;
+    RETURN NEW;
+END
+$$;
+CREATE TRIGGER shop_orderitem_check_order
+BEFORE INSERT OR UPDATE OF order_id, created_at ON {OrderItem._meta.db_table}
+FOR EACH ROW EXECUTE FUNCTION shop_orderitem_check_order();
+
+CREATE FUNCTION shop_order_check_items() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('{MOVING_ROWS}', true) IS DISTINCT FROM 'on'
+    AND EXISTS (
+        SELECT 1 FROM {OrderItem._meta.db_table}
+        WHERE order_id = OLD.id AND created_at = OLD.created_at
+    ) THEN
+        RAISE foreign_key_violation USING MESSAGE = format(
+            'order %s still has items', OLD.id
+        );
+    END IF;
+    RETURN OLD;
+END
+$$;
+CREATE TRIGGER shop_order_check_items
+AFTER DELETE ON {Order._meta.db_table}
+FOR EACH ROW EXECUTE FUNCTION shop_order_check_items();
+"""
+
+
+def add_months(day: date, months: int) -> date:
+    """The first day of the month months after the month of day."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def start_of_month(month: date) -> datetime:
+    # months in the shop's time zone, like the days staff filter orders by
+    return timezone.make_aware(datetime.combine(month.replace(day=1), time.min))
+
+
+def partition_name(table: str, month: date) -> str:
+    return "{}_p{}".format(table, month.strftime("%Y%m"))
+
+
+def default_partition_name(table: str) -> str:
+    return "{}_default".format(table)
+
+
+def is_partitioned(table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partitions(table: str, first_month: date, last_month: date) -> list[str]:
+    """
+    Create the missing monthly partitions of table from first to last month,
+    moving their rows out of the DEFAULT partition. Each month is made in a
+    transaction with the DEFAULT partition locked, so rows are not added to it
+    while they are moved, and a failed month leaves them where they were.
+    """
+    created = []
+    default = default_partition_name(table)
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        name = partition_name(table, month)
+        bounds = [start_of_month(month), start_of_month(add_months(month, 1))]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is None:
+                # a partition cannot be made for rows still in the DEFAULT one
+                cursor.execute(
+                    f"CREATE TABLE {name} "
+                    f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+                cursor.execute("SELECT to_regclass(%s)", [default])
+                if cursor.fetchone()[0] is not None:
+                    cursor.execute(f"LOCK TABLE {default} IN ACCESS EXCLUSIVE MODE")
+                    cursor.execute("SELECT set_config(%s, 'on', true)", [MOVING_ROWS])
+                    cursor.execute(
+                        f"""
+                        WITH moved AS (
+                            DELETE FROM {default}
+                            WHERE created_at >= %s AND created_at < %s
+                            RETURNING *
+                        )
+                        INSERT INTO {name} SELECT * FROM moved
+                        """,
+                        bounds,
+                    )
+                    if cursor.rowcount:
+                        logger.warning(
+                            "Moved %s rows of %s out of %s, partitions should be "
+                            "made before their month",
+                            cursor.rowcount,
+                            name,
+                            default,
+                        )
+                    cursor.execute("SELECT set_config(%s, '', true)", [MOVING_ROWS])
+                cursor.execute(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    bounds,
+                )
+                created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def create_default_partition(table: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} "
+            f"PARTITION OF {table} DEFAULT"
+        )
+
+
+def create_order_partitions(months_ahead: int) -> list[str]:
+    """
+    Create the partitions of the partitioned order tables up to months_ahead
+    months from now. Tables that are not partitioned are left alone.
+    """
+    this_month = timezone.localdate()
+    created = []
+    for table in TABLES:
+        if is_partitioned(table):
+            create_default_partition(table)
+            created += create_partitions(
+                table, this_month, add_months(this_month, months_ahead)
+            )
+    return created
+
+
+def convert_to_partitioned(months_ahead: int) -> list[str]:
+    """
+    Replace the order tables with tables partitioned by month of created_at
+    holding the same rows, indexes and foreign keys, as far as partitioning
+    allows, and the triggers standing in for the rest. Locks the tables until the caller's transaction ends, and copies
+    every row, so it is meant for a maintenance window.
+    """
+    with connection.cursor() as cursor:
+        # deferred foreign key checks still pending would stop the tables from
+        # being changed
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            "LOCK TABLE {} IN ACCESS EXCLUSIVE MODE".format(", ".join(TABLES))
+        )
+        indexes = []
+        foreign_keys = []
+        for table in TABLES:
+            cursor.execute(
+                """
+                SELECT pg_get_indexdef(indexrelid) FROM pg_index
+                WHERE indrelid = %s::regclass
+                AND NOT indisunique AND NOT indisprimary
+                """,
+                [table],
+            )
+            indexes += [row[0] for row in cursor.fetchall()]
+            # the items cannot reference a partitioned order table by id alone
+            cursor.execute(
+                """
+                SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype = 'f'
+                AND confrelid <> ALL(%s::regclass[])
+                """,
+                [table, TABLES],
+            )
+            foreign_keys += [(table, *row) for row in cursor.fetchall()]
+
+        first_months = []
+        for table in TABLES:
+            cursor.execute(f"SELECT min(created_at) FROM {table}")
+            first_created_at = cursor.fetchone()[0]
+            first_months.append(
+                timezone.localdate(first_created_at)
+                if first_created_at
+                else timezone.localdate()
+            )
+
+        created = []
+        for table, first_month in zip(TABLES, first_months):
+            old = "{}_unpartitioned".format(table)
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+            cursor.execute(
+                f"""
+                CREATE TABLE {table} (
+                    LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                    PRIMARY KEY (id, created_at)
+                ) PARTITION BY RANGE (created_at)
+                """
+            )
+            created += create_partitions(
+                table,
+                first_month,
+                add_months(timezone.localdate(), months_ahead),
+            )
+            create_default_partition(table)
+            cursor.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+            # the id sequence would otherwise go with the old table
+            cursor.execute(
+                "SELECT pg_get_serial_sequence(%s, 'id')",
+                [old],
+            )
+            sequence = cursor.fetchone()[0]
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+        for table in reversed(TABLES):
+            cursor.execute(f"DROP TABLE {table}_unpartitioned")
+
+        cursor.execute(
+            f"ALTER TABLE {Order._meta.db_table} "
+            "ADD CONSTRAINT shop_order_uuid_created_at_key UNIQUE (uuid, created_at)"
+        )
+        for index in indexes:
+            cursor.execute(index)
+        for table, name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+        cursor.execute(INTEGRITY_TRIGGERS)
+    return created
@@ -0,0 +1,103 @@
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder,
+    ArchivedProductSales,
+    DailyProductSales,
+    DailySales,
+    Order,
+    OrderItem,
+)
+
+
+def start_of_day(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def changed_store_days(since: datetime, until: datetime) -> dict[date, set[int]]:
+    """The stores by day placed of the orders changed in (since, until]."""
+    store_days: dict[date, set[int]] = {}
+    for day, store_id in (
+        Order.objects.filter(updated_at__gt=since, updated_at__lte=until)
+        .annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values_list("day", "store_id")
+        .distinct()
+    ):
+        store_days.setdefault(day, set()).add(store_id)
+    return store_days
+
+
+def add_up(keys: list[str], *row_sets: Iterable[dict]) -> list[dict]:
+    """The rows of values() querysets with the same keys added together."""
+    totals: dict[tuple, dict] = {}
+    for rows in row_sets:
+        for row in rows:
+            total = totals.setdefault(tuple(row[name] for name in keys), {})
+            for name, value in row.items():
+                if name not in keys:
+                    total[name] = total.get(name, 0) + value
+    return [dict(zip(keys, key), **total) for key, total in totals.items()]
+
+
+@transaction.atomic
+def rebuild_sales(day: date, store_ids: Iterable[int]) -> None:
+    """
+    Replace the rollup rows of the stores on day with totals read from the
+    orders they placed that day, so a rebuild can be repeated any time. Orders
+    archived since are counted from ArchivedOrder and ArchivedProductSales.
+    """
+    store_ids = list(store_ids)
+    day_start, day_end = start_of_day(day), start_of_day(day + timedelta(days=1))
+    # order_by() keeps the default ordering of Order out of the GROUP BY
+    orders = Order.objects.filter(
+        store_id__in=store_ids, created_at__gte=day_start, created_at__lt=day_end
+    ).order_by()
+    archived_orders = ArchivedOrder.objects.filter(
+        store_id__in=store_ids, created_at__gte=day_start, created_at__lt=day_end
+    ).order_by()
+
+    DailySales.objects.filter(store_id__in=store_ids, day=day).delete()
+    DailySales.objects.bulk_create(
+        DailySales(day=day, **row)
+        for row in add_up(
+            ["store_id", "status"],
+            *[
+                qs.values("store_id", "status").annotate(
+                    orders=Count("id"), revenue=Sum("total_order_price")
+                )
+                for qs in [orders, archived_orders]
+            ],
+        )
+    )
+
+    DailyProductSales.objects.filter(store_id__in=store_ids, day=day).delete()
+    DailyProductSales.objects.bulk_create(
+        DailyProductSales(day=day, **row)
+        for row in add_up(
+            ["store_id", "product_id"],
+            # items have the created_at of their order, bounding it as well
+            # keeps partitioned item tables to the partition of the day
+            OrderItem.objects.filter(
+                order__in=orders.exclude(status="cancelled"),
+                created_at__gte=day_start,
+                created_at__lt=day_end,
+            )
+            .order_by()
+            .values("product_id", store_id=F("order__store_id"))
+            .annotate(
+                units=Sum("quantity"),
+                revenue=Sum(F("price") * F("quantity"), output_field=FloatField()),
+                orders=Count("order", distinct=True),
+            ),
+            ArchivedProductSales.objects.filter(store_id__in=store_ids, day=day).values(
+                "store_id", "product_id", "units", "revenue", "orders"
+            ),
+        )
+    )
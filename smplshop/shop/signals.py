@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from smplshop.master.models import ProductInStore, Store
+
+from .catalog import invalidate_catalog
+from .counters import count_status_changes
+from .models import OPEN_ORDER_STATUSES, Order, order_status_changed
+from .stores import invalidate_store
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def invalidate_cached_store(sender, instance: Store, **kwargs):
+    invalidate_store(instance)
+
+
+@receiver(post_save, sender=ProductInStore)
+@receiver(post_delete, sender=ProductInStore)
+def invalidate_cached_catalog(sender, instance: ProductInStore, **kwargs):
+    invalidate_catalog(instance.store_id)  # type: ignore
+
+
+@receiver(order_status_changed, sender=Order)
+def count_open_orders(sender, changes, **kwargs):
+    count_status_changes(changes)
+
+
+@receiver(post_delete, sender=Order)
+def uncount_deleted_order(sender, instance: Order, using, **kwargs):
+    # deletes do not change a status, so open orders deleted in the admin or
+    # with their store are taken off the counts here, once the delete commits
+    if instance.status in OPEN_ORDER_STATUSES:
+        changes = [(instance.store_id, instance.status, None)]
+        transaction.on_commit(lambda: count_status_changes(changes), using=using)
@@ -0,0 +1,144 @@
+import copy
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from smplshop.master.models import Store
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CHANNEL = "smplshop:store_cache:invalidate"
+
+
+class StoreCache:
+    """Process local LRU of Store rows keyed by store code."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._stores: "OrderedDict[str, Store]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code: str) -> Optional[Store]:
+        with self._lock:
+            store = self._stores.get(code, None)
+            if store is not None:
+                self._stores.move_to_end(code)
+        return store
+
+    def set(self, code: str, store: Store):
+        with self._lock:
+            self._stores[code] = store
+            self._stores.move_to_end(code)
+            while len(self._stores) > self.max_size:
+                self._stores.popitem(last=False)
+
+    def discard(self, pk: int):
+        # a rename changes the code, so entries are dropped by primary key
+        with self._lock:
+            for code in [code for code, s in self._stores.items() if s.pk == pk]:
+                del self._stores[code]
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+
+store_cache = StoreCache(max_size=settings.STORE_CACHE_SIZE)
+
+_listener_pid: Optional[int] = None
+_listener_failed_at: Optional[float] = None
+_listener_lock = threading.Lock()
+
+
+def _listen_for_invalidations():
+    import redis
+
+    client = redis.Redis.from_url(settings.STORE_CACHE_REDIS_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(BROADCAST_CHANNEL)
+    # anything cached before the subscription was live may have missed a message
+    store_cache.clear()
+    for message in pubsub.listen():
+        store_cache.discard(int(message["data"]))
+
+
+def _run_listener():
+    global _listener_pid, _listener_failed_at
+    try:
+        _listen_for_invalidations()
+    except Exception:
+        logger.exception("Store cache invalidation listener stopped")
+    # without a listener other workers' changes would go unseen, so stop caching
+    # until a lookup after STORE_CACHE_LISTENER_RETRY seconds restarts it
+    store_cache.clear()
+    _listener_failed_at = time.monotonic()
+    _listener_pid = None
+
+
+def _ensure_listener() -> bool:
+    """
+    Start the invalidation listener once per worker process. Returns whether
+    stores may be cached, which they may not while the listener is down.
+    """
+    global _listener_pid
+    if settings.STORE_CACHE_REDIS_URL is None or _listener_pid == os.getpid():
+        return True
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return True
+        # while Redis is down, retrying on every request would only start a
+        # thread and log a traceback per request
+        if (
+            _listener_failed_at is not None
+            and time.monotonic() - _listener_failed_at
+            < settings.STORE_CACHE_LISTENER_RETRY
+        ):
+            return False
+        # the cache may have been inherited from a parent through fork
+        store_cache.clear()
+        _listener_pid = os.getpid()
+        threading.Thread(
+            target=_run_listener, name="store-cache-listener", daemon=True
+        ).start()
+        return True
+
+
+def get_store(code: str) -> Optional[Store]:
+    """Return the store for code, hitting the database only on a cache miss."""
+    if not _ensure_listener():
+        return Store.objects.filter(code=code).first()
+    store = store_cache.get(code)
+    if store is None:
+        store = Store.objects.filter(code=code).first()
+        if store is None:
+            return None
+        store_cache.set(code, store)
+    # callers get their own copy so changes to it do not leak into the cache
+    return copy.copy(store)
+
+
+def _broadcast(pk: int):
+    import redis
+
+    try:
+        redis.Redis.from_url(settings.STORE_CACHE_REDIS_URL).publish(
+            BROADCAST_CHANNEL, pk
+        )
+    except redis.RedisError:
+        logger.exception("Could not broadcast store cache invalidation for %s", pk)
+
+
+def invalidate_store(store: Store):
+    pk = store.pk
+    store_cache.discard(pk)
+    # drop it again once the change is visible, in case a concurrent request
+    # re-read the old row before the commit
+    transaction.on_commit(lambda: store_cache.discard(pk))
+    if settings.STORE_CACHE_REDIS_URL is not None:
+        transaction.on_commit(lambda: _broadcast(pk))
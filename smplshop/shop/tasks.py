@@ -0,0 +1,159 @@
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from config import celery_app
+
+from . import archive, partitions
+from .counters import repair_order_counts
+from .events import get_order_event_handlers, handle_order_events
+from .models import Cart, OrderEvent, RollupWatermark
+from .sales import changed_store_days, rebuild_sales
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task()
+def delete_abandoned_carts(batch_size: Optional[int] = None) -> dict[str, int]:
+    """
+    Delete the carts nobody has added to for CART_ABANDONED_AFTER seconds, with
+    their items, a batch per transaction so no lock is held for long.
+    """
+    batch_size = batch_size or settings.CART_REAPER_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(seconds=settings.CART_ABANDONED_AFTER)
+    deleted = {"carts": 0, "items": 0}
+    while True:
+        with transaction.atomic():
+            # carts locked by a checkout in progress are left for the next run
+            batch = list(
+                Cart.objects.select_for_update(skip_locked=True)
+                .filter(updated_at__lt=cutoff)
+                .order_by("updated_at")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            _, rows = Cart.objects.filter(pk__in=batch).delete()
+        deleted["carts"] += rows.get("shop.Cart", 0)
+        deleted["items"] += rows.get("shop.CartItem", 0)
+
+    logger.info(
+        "Deleted %s abandoned carts with %s items", deleted["carts"], deleted["items"]
+    )
+    return deleted
+
+
+@celery_app.task()
+def dispatch_order_events(batch_size: Optional[int] = None) -> dict[str, int]:
+    """
+    Hand each handler of ORDER_EVENT_HANDLERS the order events it has not seen,
+    see smplshop.shop.events.handle_order_events. Every handler has its own
+    cursor, so a failing handler does not hold up the others.
+    """
+    batch_size = batch_size or settings.ORDER_EVENT_BATCH_SIZE
+    handled = {
+        name: handle_order_events(name, handler, batch_size)
+        for name, handler in get_order_event_handlers().items()
+    }
+
+    logger.info("Dispatched order events %s", handled)
+    return handled
+
+
+@celery_app.task()
+def prune_order_events(batch_size: Optional[int] = None) -> int:
+    """
+    Delete the order events older than ORDER_EVENT_RETENTION seconds that every
+    consumer with a cursor has handled, a batch per transaction. A consumer that
+    is gone for good should have its cursor deleted, or its events are kept.
+    """
+    batch_size = batch_size or settings.ORDER_EVENT_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(seconds=settings.ORDER_EVENT_RETENTION)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                OrderEvent.objects.handled()
+                .filter(created_at__lt=cutoff)
+                .order_by("transaction_id", "id")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            deleted += OrderEvent.objects.filter(pk__in=batch).delete()[0]
+
+    logger.info("Deleted %s handled order events", deleted)
+    return deleted
+
+
+@celery_app.task()
+def update_sales_rollups() -> int:
+    """
+    Rebuild the sales rollups of each store and day placed of the orders changed
+    since the last run, and return how many store days were rebuilt. The changes
+    are taken a day at a time, each in a transaction that moves the watermark
+    past them, so catching up after a pause never holds one long transaction.
+    """
+    # updated_at is set before a change commits, so the newest changes are left
+    # for the next run until any earlier one has had time to commit
+    until = timezone.now() - timedelta(seconds=settings.SALES_ROLLUP_LAG)
+    # the first run starts from now, the orders before are rolled up by
+    # backfill_sales
+    _, created = RollupWatermark.objects.get_or_create(
+        name="sales", defaults={"changed_until": until}
+    )
+    if created:
+        return 0
+    rebuilt = 0
+    while True:
+        with transaction.atomic():
+            # another run still busy keeps the watermark locked
+            watermark = (
+                RollupWatermark.objects.select_for_update(skip_locked=True)
+                .filter(name="sales")
+                .first()
+            )
+            if watermark is None or watermark.changed_until >= until:
+                break
+            changed_until = min(watermark.changed_until + timedelta(days=1), until)
+            store_days = changed_store_days(watermark.changed_until, changed_until)
+            for day, store_ids in sorted(store_days.items()):
+                rebuild_sales(day, store_ids)
+            watermark.changed_until = changed_until
+            watermark.save(update_fields=["changed_until"])
+        rebuilt += sum(len(store_ids) for store_ids in store_days.values())
+
+    logger.info("Rebuilt sales rollups of %s store days", rebuilt)
+    return rebuilt
+
+
+@celery_app.task()
+def reconcile_order_counts() -> int:
+    """Repair the open order counts that drifted from the database."""
+    return len(repair_order_counts())
+
+
+@celery_app.task()
+def archive_orders(batch_size: Optional[int] = None) -> dict[str, int]:
+    """Archive the old closed and cancelled orders, see smplshop.shop.archive."""
+    archived = archive.archive_orders(batch_size)
+    logger.info(
+        "Archived %s orders into %s files", archived["orders"], archived["files"]
+    )
+    return archived
+
+
+@celery_app.task()
+def create_order_partitions() -> list[str]:
+    """
+    Keep ORDER_PARTITION_MONTHS_AHEAD months of partitions ready when the order
+    tables are partitioned, so an order is never made in a month without one.
+    """
+    created = partitions.create_order_partitions(settings.ORDER_PARTITION_MONTHS_AHEAD)
+    if created:
+        logger.info("Created order partitions %s", ", ".join(created))
+    return created
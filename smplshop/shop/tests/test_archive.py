@@ -0,0 +1,153 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductFactory, StoreFactory
+from smplshop.shop.archive import get_archive_storage
+from smplshop.shop.models import (
+    ArchivedOrder,
+    DailyProductSales,
+    DailySales,
+    Order,
+    OrderItem,
+)
+from smplshop.shop.sales import rebuild_sales
+from smplshop.shop.tasks import archive_orders
+from smplshop.users.tests.factory import UserFactory
+
+from .factory import OrderFactory, OrderItemFactory
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            ORDER_ARCHIVE_STORAGE="django.core.files.storage.FileSystemStorage",
+        )
+        self.settings_override.enable()
+        self.password = fake.password()
+        self.user = UserFactory.create(password=self.password)
+        self.store = StoreFactory.create()
+        self.product = ProductFactory.create()
+        self.old = OrderFactory.create_batch(3, store=self.store, user=self.user)
+        self.recent = OrderFactory.create(store=self.store, user=self.user)
+        self.open = OrderFactory.create(store=self.store, user=self.user)
+        for order in self.old + [self.recent, self.open]:
+            OrderItemFactory.create(
+                order=order, product=self.product, price=2.5, quantity=4
+            )
+        Order.objects.filter(
+            pk__in=[o.pk for o in self.old + [self.recent]]
+        ).transition("cancel")
+        Order.objects.filter(pk__in=[o.pk for o in self.old + [self.open]]).update(
+            updated_at=timezone.now() - timedelta(days=365)
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        super().tearDown()
+
+
+class TestArchiveOrders(ArchiveTestCase):
+    def test_archives_old_closed_orders(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_orders(batch_size=2), {"orders": 3, "files": 2})
+        self.assertEqual(
+            set(Order.objects.values_list("pk", flat=True)),
+            {self.recent.pk, self.open.pk},
+        )
+        self.assertEqual(OrderItem.objects.count(), 2)
+        self.assertEqual(
+            set(
+                ArchivedOrder.objects.values_list("uuid", "status", "total_order_price")
+            ),
+            {(order.uuid, "cancelled", 10.0) for order in self.old},
+        )
+
+        archived = ArchivedOrder.objects.get(uuid=self.old[0].uuid)
+        with get_archive_storage().open(archived.archive, "rb") as archive_file:
+            records = [json.loads(line) for line in gzip.open(archive_file, "rt")]
+        record = next(r for r in records if r["uuid"] == str(self.old[0].uuid))
+        self.assertEqual(record["store"], self.store.code)
+        self.assertEqual(
+            record["items"],
+            [
+                {
+                    "product": self.product.name,
+                    "product_code": self.product.code,
+                    "price": 2.5,
+                    "quantity": 4,
+                }
+            ],
+        )
+
+        self.assertEqual(archive_orders(), {"orders": 0, "files": 0})
+
+    def test_archive_file_named_on_commit(self):
+        # the callbacks are dropped, as they are when the batch rolls back
+        with self.captureOnCommitCallbacks(execute=False):
+            archive_orders()
+        storage = get_archive_storage()
+        archive = ArchivedOrder.objects.values_list("archive", flat=True).first()
+        self.assertFalse(storage.exists(archive))
+        self.assertTrue(storage.exists(archive + ".tmp"))
+
+    def test_needs_a_private_storage(self):
+        with override_settings(ORDER_ARCHIVE_STORAGE=None):
+            with self.assertRaises(ImproperlyConfigured):
+                archive_orders()
+        self.assertEqual(Order.objects.count(), 5)
+
+    def test_rebuilt_sales_keep_archived_orders(self):
+        Order.objects.filter(pk=self.old[0].pk).update(status="closed")
+        today = timezone.localdate()
+
+        def sales():
+            return (
+                set(DailySales.objects.values_list("status", "orders", "revenue")),
+                set(
+                    DailyProductSales.objects.values_list(
+                        "product", "units", "revenue", "orders"
+                    )
+                ),
+            )
+
+        rebuild_sales(today, [self.store.pk])
+        before = sales()
+        self.assertEqual(before[1], {(self.product.pk, 8, 20.0, 2)})
+        archive_orders()
+        rebuild_sales(today, [self.store.pk])
+        self.assertEqual(sales(), before)
+
+
+class TestArchivedOrderList(ArchiveTestCase):
+    def test_customer_sees_archived_orders_on_demand(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_orders()
+        self.client.login(username=self.user.username, password=self.password)
+        url = "{}{}{}".format("/shop/", self.store.code, "/orders/")
+
+        response = self.client.get(url)
+        self.assertEqual(
+            {order.uuid for order in response.context["object_list"]},
+            {self.recent.uuid, self.open.uuid},
+        )
+
+        response = self.client.get(url, {"archived": "on"})
+        self.assertEqual(
+            {order.uuid for order in response.context["object_list"]},
+            {order.uuid for order in self.old},
+        )
+        self.assertContains(response, self.product.name, count=3)
+        self.assertContains(response, '<td id="total_price">10.00</td>', count=3)
@@ -1,14 +1,18 @@
 import re
 import uuid
+from unittest import mock
 
 from django.contrib.messages import get_messages
-from django.db.models import F
+from django.db import connection
 from django.test import TestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
 
 from smplshop.functional_test.faker import fake
 from smplshop.master.tests.factory import ProductInStoreFactory, StoreFactory
+from smplshop.shop.carts import DatabaseCartBackend
+from smplshop.shop.forms import CartUpdateForm
 from smplshop.shop.models import Cart, Order
 from smplshop.users.tests.factory import UserFactory
 
@@ -70,7 +74,8 @@ class TestShopFront(TestCase):
         response = self.client.get(
             "{}{}{}".format("/shop/", self.store1.code, "/cart/")
         )
-        self.assertQuerysetEqual(response.context["object_list"], Cart.objects.none())
+        self.assertEqual(response.context["object_list"], [])
+        self.assertEqual(response.context["total_cart_price"], 0)
         self.assertContains(response, "Cart is empty")
 
     def test_cart_queryset_with_incorrect_cart(self):
@@ -94,15 +99,15 @@ class TestShopFront(TestCase):
         response = self.client.get(
             "{}{}{}".format("/shop/", self.store1.code, "/cart/")
         )
-        self.assertQuerysetEqual(
-            response.context["object_list"],
-            Cart.objects.filter(uuid=cart[0].uuid, store__code=self.store1.code),
-        )
+        self.assertEqual(response.context["object_list"], [])
+        self.assertEqual(response.context["total_cart_price"], 0)
+        self.assertContains(response, "Cart is empty")
 
     def test_cart_queryset_with_cart_and_items(self):
         carts = CartFactory.create_batch(50, store=self.store1)
         CartItemFactory.create_batch(10, cart=carts[0])
         CartItemFactory.create_batch(10, cart=carts[1])
+        items = carts[1].cartitem_set.select_related("product_in_store").order_by("id")
 
         session = self.client.session
         session[self.store1.code] = str(carts[1].uuid)
@@ -110,21 +115,42 @@ class TestShopFront(TestCase):
         response = self.client.get(
             "{}{}{}".format("/shop/", self.store1.code, "/cart/")
         )
-        self.assertQuerysetEqual(
-            response.context["object_list"],
-            Cart.objects.filter(uuid=carts[1].uuid, store__code=self.store1.code)
-            .prefetch_related("cartitem_set")
-            .annotate(
-                product=F("cartitem__product_in_store__product"),
-                price=F("cartitem__product_in_store__price"),
-                quantity=F("cartitem__quantity"),
-            )
-            .annotate(total_price=F("price") * F("quantity")),
-            ordered=False,
-        )
         self.assertEqual(
-            response.context["total_cart_price"], carts[1].total_cart_price
+            [
+                (obj.product, obj.price, obj.quantity, obj.total_price)
+                for obj in response.context["object_list"]
+            ],
+            [
+                (
+                    item.product_in_store.product_id,
+                    item.product_in_store.price,
+                    item.quantity,
+                    item.product_in_store.price * item.quantity,
+                )
+                for item in items
+            ],
         )
+        self.assertAlmostEqual(
+            response.context["total_cart_price"],
+            sum(item.product_in_store.price * item.quantity for item in items),
+        )
+
+    def test_cart_queries_do_not_grow_with_cart_size(self):
+        def view_cart(cart):
+            session = self.client.session
+            session[self.store1.code] = str(cart.uuid)
+            session.save()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get("{}{}{}".format("/shop/", self.store1.code, "/cart/"))
+            return [q for q in queries if '"shop_cart' in q["sql"]]
+
+        small_cart = CartFactory.create(store=self.store1)
+        CartItemFactory.create_batch(2, cart=small_cart)
+        large_cart = CartFactory.create(store=self.store1)
+        CartItemFactory.create_batch(30, cart=large_cart)
+
+        self.assertEqual(len(view_cart(small_cart)), 1)
+        self.assertEqual(len(view_cart(large_cart)), 1)
 
 
 class TestPlaceOrder(TestCase):
@@ -236,6 +262,10 @@ class TestPlaceOrder(TestCase):
         new_order = Order.objects.get(store=self.store2, uuid=order_uuid)
         self.assertEqual(new_order.status, "placed")
         self.assertEqual(new_order.orderitem_set.count(), 15)
+        self.assertAlmostEqual(
+            new_order.total_order_price,
+            sum(item.product_in_store.price * item.quantity for item in cart_items),
+        )
         for item in cart_items:
             self.assertTrue(
                 new_order.orderitem_set.get(
@@ -391,3 +421,160 @@ class TestPlaceOrder(TestCase):
             )
         self.assertFalse(Cart.objects.filter(uuid=cart3_uuid).exists())
         self.assertIsNone(response.wsgi_request.session.get(self.store3.code, None))
+
+    def test_order_queries_do_not_grow_with_cart_size(self):
+        def place_order(cart):
+            session = self.client.session
+            session[cart.store.code] = str(cart.uuid)
+            session.save()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(
+                    "{}{}{}".format("/shop/", cart.store.code, "/cart/order/")
+                )
+            return len(queries)
+
+        small_cart = CartFactory.create(store=self.store1)
+        CartItemFactory.create_batch(2, cart=small_cart)
+        large_cart = CartFactory.create(store=self.store1)
+        CartItemFactory.create_batch(30, cart=large_cart)
+
+        # resolve the shop once so both orders find it cached
+        self.client.get("{}{}{}".format("/shop/", self.store1.code, "/cart/"))
+        self.assertEqual(place_order(small_cart), place_order(large_cart))
+        self.assertEqual(Order.objects.filter(store=self.store1).count(), 2)
+
+
+class TestUpdateCart(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = Client()
+
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.cart = CartFactory.create(store=self.store1)
+        self.product_in_store1 = ProductInStoreFactory.create_batch(
+            13, store=self.store1
+        )
+        self.items = [
+            CartItemFactory.create(cart=self.cart, product_in_store=product_in_store)
+            for product_in_store in self.product_in_store1[10:]
+        ]
+        self.product_in_store2 = ProductInStoreFactory.create(store=self.store2)
+
+        session = self.client.session
+        session[self.store1.code] = str(self.cart.uuid)
+        session.save()
+
+    def update(self, pairs, **headers):
+        return self.client.post(
+            "{}{}{}".format("/shop/", self.store1.code, "/cart/update/"),
+            {
+                "product_in_store_uuid": [str(uuid) for uuid, _ in pairs],
+                "quantity": [quantity for _, quantity in pairs],
+            },
+            **headers,
+        )
+
+    def quantities(self):
+        return dict(
+            self.cart.cartitem_set.values_list("product_in_store__uuid", "quantity")
+        )
+
+    def test_url_resolves_to_view(self):
+        resolver = resolve("{}{}{}".format("/shop/", self.store1.code, "/cart/update/"))
+        self.assertEqual(resolver.view_name, "smplshop.shop:update_cart")
+
+    def test_get_not_allowed(self):
+        response = self.client.get(
+            "{}{}{}".format("/shop/", self.store1.code, "/cart/update/")
+        )
+        self.assertEqual(response.status_code, 405)
+
+    def test_set_decrement_and_remove(self):
+        response = self.update(
+            [
+                (self.items[0].product_in_store.uuid, 7),
+                (self.items[1].product_in_store.uuid, 1),
+                (self.items[2].product_in_store.uuid, 0),
+                (self.product_in_store1[0].uuid, 2),
+            ]
+        )
+        self.assertRedirects(
+            response, "{}{}{}".format("/shop/", self.store1.code, "/cart/")
+        )
+        self.assertEqual(
+            self.quantities(),
+            {
+                self.items[0].product_in_store.uuid: 7,
+                self.items[1].product_in_store.uuid: 1,
+                self.product_in_store1[0].uuid: 2,
+            },
+        )
+
+    def test_product_of_other_store_is_skipped(self):
+        before = self.quantities()
+        self.update([(self.product_in_store2.uuid, 3)])
+        self.assertEqual(self.quantities(), before)
+
+    def test_returns_totals(self):
+        response = self.update(
+            [(self.items[0].product_in_store.uuid, 2)],
+            HTTP_ACCEPT="application/json",
+        )
+        data = response.json()
+        items = self.cart.cartitem_set.select_related("product_in_store")
+        self.assertEqual(len(data["lines"]), 3)
+        self.assertAlmostEqual(
+            data["total_cart_price"],
+            sum(item.product_in_store.price * item.quantity for item in items),
+        )
+
+    def test_invalid_update(self):
+        response = self.client.post(
+            "{}{}{}".format("/shop/", self.store1.code, "/cart/update/"),
+            {"product_in_store_uuid": [str(self.items[0].product_in_store.uuid)]},
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.update([(self.items[0].product_in_store.uuid, -1)])
+        self.assertEqual(response.status_code, 400)
+        response = self.update([("not a uuid", 1)])
+        self.assertEqual(response.status_code, 400)
+        # more than the quantity column holds
+        response = self.update([(self.items[0].product_in_store.uuid, 2**31)])
+        self.assertEqual(response.status_code, 400)
+        response = self.update(
+            [(self.items[0].product_in_store.uuid, 1)] * (CartUpdateForm.MAX_LINES + 1)
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cart_removed_after_update(self):
+        with mock.patch.object(DatabaseCartBackend, "contents", return_value=None):
+            response = self.update(
+                [(self.items[0].product_in_store.uuid, 2)],
+                HTTP_ACCEPT="application/json",
+            )
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_cart(self):
+        session = self.client.session
+        session[self.store1.code] = str(uuid.uuid4())
+        session.save()
+        response = self.update([(self.items[0].product_in_store.uuid, 1)])
+        self.assertEqual(response.status_code, 404)
+
+    def test_queries_do_not_grow_with_lines(self):
+        def update(pairs):
+            with CaptureQueriesContext(connection) as queries:
+                self.update(pairs, HTTP_ACCEPT="application/json")
+            return len(queries)
+
+        # resolve the shop once so both updates find it cached
+        update([(self.items[0].product_in_store.uuid, 1)])
+        self.assertEqual(
+            update([(self.items[0].product_in_store.uuid, 2)]),
+            update([(item.uuid, 3) for item in self.product_in_store1[:10]]),
+        )
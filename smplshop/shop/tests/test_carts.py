@@ -0,0 +1,226 @@
+import re
+import uuid
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.test import TestCase, override_settings
+from django.test.client import Client
+from django.urls import reverse
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductInStoreFactory, StoreFactory
+from smplshop.shop.carts import get_cart_backend
+from smplshop.shop.models import Cart, Order
+from smplshop.users.tests.factory import UserFactory
+
+from .utils import redis_available, use_redis
+
+
+class CartBackendTests:
+    backend = ""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+        cls.settings_override = override_settings(CART_BACKEND=cls.backend)
+        cls.settings_override.enable()
+        get_cart_backend.cache_clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        get_cart_backend.cache_clear()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.product_in_store1 = ProductInStoreFactory.create_batch(
+            5, store=self.store1
+        )
+        self.product_in_store2 = ProductInStoreFactory.create_batch(
+            5, store=self.store2
+        )
+        self.carts = get_cart_backend()
+        self.client.login(username=self.user.username, password=self.password)
+
+    def test_add_to_unknown_cart(self):
+        self.assertFalse(
+            self.carts.add(
+                str(uuid.uuid4()), self.store1, self.product_in_store1[0].uuid
+            )
+        )
+
+    def test_add_product_from_other_store(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.assertFalse(
+            self.carts.add(cart_uuid, self.store1, self.product_in_store2[0].uuid)
+        )
+        self.assertEqual(self.carts.quantities(cart_uuid, self.store1), {})
+
+    def test_cart_of_other_store(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.assertFalse(
+            self.carts.add(cart_uuid, self.store2, self.product_in_store2[0].uuid)
+        )
+        self.assertIsNone(self.carts.contents(cart_uuid, self.store2))
+
+    def test_add_and_read(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.assertTrue(
+            self.carts.add(cart_uuid, self.store1, self.product_in_store1[0].uuid)
+        )
+        self.assertTrue(
+            self.carts.add(cart_uuid, self.store1, self.product_in_store1[0].uuid, 2)
+        )
+        self.assertTrue(
+            self.carts.add(cart_uuid, self.store1, self.product_in_store1[3].uuid)
+        )
+
+        self.assertEqual(
+            self.carts.quantities(cart_uuid, self.store1),
+            {self.product_in_store1[0].id: 3, self.product_in_store1[3].id: 1},
+        )
+        contents = self.carts.contents(cart_uuid, self.store1)
+        prices = [
+            float(self.product_in_store1[0].price),
+            float(self.product_in_store1[3].price),
+        ]
+        self.assertEqual(
+            [(line.product, line.quantity) for line in contents.lines],
+            [
+                (self.product_in_store1[0].product.name, 3),
+                (self.product_in_store1[3].product.name, 1),
+            ],
+        )
+        self.assertAlmostEqual(contents.total_cart_price, prices[0] * 3 + prices[1])
+
+    def test_update(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.carts.add(cart_uuid, self.store1, self.product_in_store1[0].uuid, 5)
+        self.carts.add(cart_uuid, self.store1, self.product_in_store1[1].uuid)
+
+        self.assertTrue(
+            self.carts.update(
+                cart_uuid,
+                self.store1,
+                {
+                    self.product_in_store1[0].uuid: 2,
+                    self.product_in_store1[1].uuid: 0,
+                    self.product_in_store1[2].uuid: 4,
+                    self.product_in_store2[0].uuid: 1,
+                },
+            )
+        )
+        self.assertEqual(
+            self.carts.quantities(cart_uuid, self.store1),
+            {self.product_in_store1[0].id: 2, self.product_in_store1[2].id: 4},
+        )
+        self.assertFalse(
+            self.carts.update(
+                str(uuid.uuid4()), self.store1, {self.product_in_store1[0].uuid: 1}
+            )
+        )
+
+    def test_empty_cart(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.assertEqual(self.carts.contents(cart_uuid, self.store1), ([], 0))
+        self.assertEqual(self.carts.checkout(cart_uuid, self.store1), [])
+        # nothing was ordered, so the cart is still there
+        self.assertIsNotNone(self.carts.contents(cart_uuid, self.store1))
+
+    def test_checkout_removes_cart(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.carts.add(cart_uuid, self.store1, self.product_in_store1[1].uuid, 4)
+
+        # the Redis backend only removes the cart once the order commits
+        with self.captureOnCommitCallbacks(execute=True):
+            lines = self.carts.checkout(cart_uuid, self.store1)
+        self.assertEqual(
+            [(line.product_id, line.quantity) for line in lines],
+            [(self.product_in_store1[1].product.id, 4)],
+        )
+        self.assertIsNone(self.carts.checkout(cart_uuid, self.store1))
+        self.assertIsNone(self.carts.contents(cart_uuid, self.store1))
+
+    def test_views(self):
+        self.client.get(
+            reverse(
+                "smplshop.shop:add_to_cart",
+                kwargs={
+                    "shop": self.store1.code,
+                    "product_in_store_uuid": self.product_in_store1[2].uuid,
+                },
+            )
+        )
+        response = self.client.get(
+            "{}{}{}".format("/shop/", self.store1.code, "/cart/")
+        )
+        self.assertEqual(
+            [(line.product, line.quantity) for line in response.context["object_list"]],
+            [(self.product_in_store1[2].product.name, 1)],
+        )
+
+        response = self.client.get(
+            "{}{}{}".format("/shop/", self.store1.code, "/cart/order/")
+        )
+        messages = list(get_messages(response.wsgi_request))
+        order_uuid = re.search(r"Order (.*?) created", str(messages[0])).group(1)
+        order = Order.objects.get(store=self.store1, uuid=order_uuid)
+        self.assertEqual(
+            list(order.orderitem_set.values_list("product", "quantity")),
+            [(self.product_in_store1[2].product.id, 1)],
+        )
+
+
+class TestDatabaseCartBackend(CartBackendTests, TestCase):
+    backend = "smplshop.shop.carts.DatabaseCartBackend"
+
+
+@skipUnless(redis_available(), "needs a Redis server at TEST_REDIS_URL")
+@use_redis("CART_REDIS_URL")
+class TestRedisCartBackend(CartBackendTests, TestCase):
+    backend = "smplshop.shop.carts.RedisCartBackend"
+
+    def test_views(self):
+        super().test_views()
+        # the cart only ever lived in Redis
+        self.assertFalse(Cart.objects.filter(store=self.store1).exists())
+
+    def test_checkout_removes_cart_on_commit(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.carts.add(cart_uuid, self.store1, self.product_in_store1[1].uuid, 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(len(self.carts.checkout(cart_uuid, self.store1)), 1)
+            # held for the order, but not gone before it commits
+            self.assertIsNone(self.carts.checkout(cart_uuid, self.store1))
+            self.assertIsNotNone(self.carts.contents(cart_uuid, self.store1))
+        self.assertIsNone(self.carts.contents(cart_uuid, self.store1))
+
+    def test_rolled_back_checkout_keeps_cart(self):
+        cart_uuid = self.carts.create(self.store1)
+        self.carts.add(cart_uuid, self.store1, self.product_in_store1[1].uuid, 4)
+
+        # the callbacks are dropped, as they are when the order rolls back
+        with self.captureOnCommitCallbacks(execute=False):
+            self.carts.checkout(cart_uuid, self.store1)
+        lock_key = self.carts.key(cart_uuid, self.store1) + ":checkout"
+        self.assertTrue(
+            0 < self.carts.client.ttl(lock_key) <= settings.CART_CHECKOUT_LOCK
+        )
+        self.assertIsNone(self.carts.checkout(cart_uuid, self.store1))
+
+        # what the lock running out does
+        self.carts.client.delete(lock_key)
+        self.assertEqual(
+            self.carts.quantities(cart_uuid, self.store1),
+            {self.product_in_store1[1].id: 4},
+        )
+        self.assertEqual(len(self.carts.checkout(cart_uuid, self.store1)), 1)
@@ -0,0 +1,167 @@
+import io
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductInStoreFactory, StoreFactory
+from smplshop.shop import counters
+from smplshop.shop.models import Order, order_status_changed
+from smplshop.users.tests.factory import UserFactory
+
+from .factory import OrderFactory
+from .utils import redis_available, use_redis
+
+
+class CountersTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        counters.get_client.cache_clear()
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.store1orders = OrderFactory.create_batch(3, store=self.store1)
+        self.store2orders = OrderFactory.create_batch(2, store=self.store2)
+        Order.objects.filter(pk=self.store1orders[0].pk).transition("accept")
+        Order.objects.filter(pk=self.store2orders[0].pk).transition("cancel")
+
+    def tearDown(self):
+        counters.get_client.cache_clear()
+        super().tearDown()
+
+
+@override_settings(ORDER_COUNTS_REDIS_URL=None)
+class TestOpenOrderCountsFromDatabase(CountersTestCase):
+    def test_counts(self):
+        self.assertEqual(
+            counters.open_order_counts(
+                [self.store1.pk, self.store2.pk, counters.ALL_STORES]
+            ),
+            {
+                self.store1.pk: {"placed": 2, "accepted": 1},
+                self.store2.pk: {"placed": 1},
+                counters.ALL_STORES: {"placed": 3, "accepted": 1},
+            },
+        )
+
+    def test_board_shows_counts(self):
+        password = fake.password()
+        user = UserFactory.create(password=password)
+        self.client.login(username=user.username, password=password)
+        response = self.client.get("/transaction/orders/", {"store": self.store1.code})
+        self.assertContains(response, "2 placed")
+        self.assertContains(response, "1 accepted")
+
+
+class TestOrderStatusChanged(CountersTestCase):
+    def setUp(self):
+        super().setUp()
+        self.changes = []
+        order_status_changed.connect(self.record, sender=Order)
+
+    def tearDown(self):
+        order_status_changed.disconnect(self.record, sender=Order)
+        super().tearDown()
+
+    def record(self, sender, changes, **kwargs):
+        self.changes += changes
+
+    def test_sent_on_commit_with_status_before(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Order.objects.filter(store=self.store1).transition("cancel")
+            self.assertEqual(self.changes, [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            sorted(self.changes),
+            [
+                (self.store1.pk, "accepted", "cancelled"),
+                (self.store1.pk, "placed", "cancelled"),
+                (self.store1.pk, "placed", "cancelled"),
+            ],
+        )
+
+    def test_not_sent_when_nothing_moves(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Order.objects.filter(pk=self.store2orders[0].pk).transition("cancel")
+        self.assertEqual(callbacks, [])
+
+    def test_deleted_open_orders_are_uncounted(self):
+        with mock.patch("smplshop.shop.signals.count_status_changes") as count:
+            with self.captureOnCommitCallbacks(execute=True):
+                # accepted, placed and cancelled
+                Order.objects.filter(
+                    pk__in=[self.store1orders[0].pk, self.store2orders[1].pk]
+                ).delete()
+                Order.objects.get(pk=self.store2orders[0].pk).delete()
+                count.assert_not_called()
+        self.assertEqual(
+            sorted(call.args[0] for call in count.call_args_list),
+            [
+                [(self.store1.pk, "accepted", None)],
+                [(self.store2.pk, "placed", None)],
+            ],
+        )
+
+    def test_sent_by_place_order(self):
+        password = fake.password()
+        user = UserFactory.create(password=password)
+        product_in_store = ProductInStoreFactory.create(store=self.store2)
+        self.client.login(username=user.username, password=password)
+        self.client.get(
+            "{}{}{}{}/".format(
+                "/shop/", self.store2.code, "/cart/add/", product_in_store.uuid
+            )
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get("{}{}{}".format("/shop/", self.store2.code, "/cart/order/"))
+        self.assertEqual(self.changes, [(self.store2.pk, None, "placed")])
+
+
+@skipUnless(redis_available(), "needs a Redis server at TEST_REDIS_URL")
+@use_redis("ORDER_COUNTS_REDIS_URL")
+class TestOpenOrderCountsInRedis(CountersTestCase):
+    def setUp(self):
+        super().setUp()
+        client = counters.get_client()
+        client.delete(*client.keys(counters.key("*")) or [counters.key("none")])
+        call_command("repair_order_counts", stdout=io.StringIO())
+
+    def counts(self):
+        return counters.open_order_counts(
+            [self.store1.pk, self.store2.pk, counters.ALL_STORES]
+        )
+
+    def test_counts_follow_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.filter(store=self.store1).transition("accept")
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.filter(pk=self.store2orders[1].pk).transition("cancel")
+        self.assertEqual(
+            self.counts(),
+            {
+                self.store1.pk: {"accepted": 3},
+                self.store2.pk: {},
+                counters.ALL_STORES: {"accepted": 3},
+            },
+        )
+
+    def test_repair(self):
+        counters.get_client().hincrby(counters.key(self.store2.pk), "shipped", 4)
+        out = io.StringIO()
+        call_command("repair_order_counts", stdout=out)
+        self.assertIn("1 stores had their open order counts repaired", out.getvalue())
+        self.assertEqual(self.counts()[self.store2.pk], {"placed": 1})
+        self.assertEqual(counters.repair_order_counts(wait=0), [])
+
+    def test_change_counted_during_repair_is_kept(self):
+        # an order placed and committed, and counted only after the first read
+        order = OrderFactory.create(store=self.store2)
+        with mock.patch(
+            "smplshop.shop.counters.time.sleep",
+            side_effect=lambda seconds: counters.count_status_changes(
+                [(order.store_id, None, "placed")]
+            ),
+        ):
+            self.assertEqual(counters.repair_order_counts(), [])
+        self.assertEqual(self.counts()[self.store2.pk], {"placed": 2})
@@ -0,0 +1,264 @@
+import io
+import json
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductInStoreFactory, StoreFactory
+from smplshop.shop import events as order_events
+from smplshop.shop.events import post_order_webhooks
+from smplshop.shop.models import Order, OrderEvent, OrderEventCursor
+from smplshop.shop.tasks import dispatch_order_events, prune_order_events
+from smplshop.users.tests.factory import UserFactory
+
+from .factory import OrderFactory
+from .utils import redis_available, use_redis
+
+received = {"first": [], "second": []}
+
+
+def record_first(events):
+    received["first"].append([event.order_uuid for event in events])
+
+
+def record_second(events):
+    received["second"].append([event.order_uuid for event in events])
+
+
+def fail(events):
+    raise RuntimeError("receiver is down")
+
+
+class TestOrderEventOutbox(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store = StoreFactory.create()
+        self.orders = OrderFactory.create_batch(3, store=self.store)
+
+    def test_transition_appends_events(self):
+        Order.objects.filter(pk=self.orders[0].pk).transition("accept")
+        Order.objects.all().transition("cancel")
+        # only orders that moved leave an event
+        Order.objects.all().transition("accept")
+        events = list(
+            OrderEvent.objects.order_by("id").values_list("order_uuid", "status")
+        )
+        self.assertEqual(events[0], (self.orders[0].uuid, "accepted"))
+        # one statement moves the orders in no particular order
+        self.assertEqual(
+            set(events[1:]), {(order.uuid, "cancelled") for order in self.orders}
+        )
+        self.assertEqual(len(events), 4)
+
+    def test_place_order_appends_event(self):
+        password = fake.password()
+        user = UserFactory.create(password=password)
+        product_in_store = ProductInStoreFactory.create(store=self.store)
+        self.client.login(username=user.username, password=password)
+        self.client.get(
+            "{}{}{}{}/".format(
+                "/shop/", self.store.code, "/cart/add/", product_in_store.uuid
+            )
+        )
+        self.client.get("{}{}{}".format("/shop/", self.store.code, "/cart/order/"))
+        order = Order.objects.get(user=user)
+        self.assertEqual(
+            list(OrderEvent.objects.values_list("order_uuid", "store", "status")),
+            [(order.uuid, self.store.pk, "placed")],
+        )
+
+
+# events are only handed out once their transaction has committed, which a
+# TestCase never does
+@override_settings(
+    ORDER_EVENT_HANDLERS={
+        "first": "smplshop.shop.tests.test_events.record_first",
+        "second": "smplshop.shop.tests.test_events.record_second",
+    },
+)
+class TestDispatchOrderEvents(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        received["first"].clear()
+        received["second"].clear()
+        self.store = StoreFactory.create()
+        self.orders = OrderFactory.create_batch(5, store=self.store)
+        Order.objects.all().transition("accept")
+        self.uuids = list(
+            OrderEvent.objects.order_by("id").values_list("order_uuid", flat=True)
+        )
+
+    def test_fans_out_in_batches(self):
+        self.assertEqual(dispatch_order_events(batch_size=2), {"first": 5, "second": 5})
+        batches = [self.uuids[:2], self.uuids[2:4], self.uuids[4:]]
+        self.assertEqual(received["first"], batches)
+        self.assertEqual(received["second"], batches)
+
+    def test_cursor_moves_on(self):
+        dispatch_order_events()
+        Order.objects.filter(pk=self.orders[0].pk).transition("ship")
+        self.assertEqual(dispatch_order_events(), {"first": 1, "second": 1})
+        self.assertEqual(received["first"][-1], [self.orders[0].uuid])
+        self.assertEqual(
+            OrderEventCursor.objects.get(name="first").last_event_id,
+            OrderEvent.objects.latest("id").id,
+        )
+        self.assertEqual(
+            OrderEventCursor.objects.get(name="first").last_transaction_id,
+            OrderEvent.objects.latest("id").transaction_id,
+        )
+
+    def test_events_of_running_transactions_wait(self):
+        dispatch_order_events()
+        changed = threading.Event()
+        done = threading.Event()
+
+        def change_and_hold():
+            try:
+                with transaction.atomic():
+                    Order.objects.filter(pk=self.orders[0].pk).transition("ship")
+                    changed.set()
+                    # commit after the later change below
+                    done.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=change_and_hold)
+        thread.start()
+        try:
+            self.assertTrue(changed.wait(10))
+            Order.objects.filter(pk=self.orders[1].pk).transition("ship")
+            # the committed change waits for the one that started earlier
+            self.assertEqual(dispatch_order_events(), {"first": 0, "second": 0})
+        finally:
+            done.set()
+            thread.join()
+
+        self.assertEqual(dispatch_order_events(), {"first": 2, "second": 2})
+        self.assertEqual(
+            received["first"][-1], [self.orders[0].uuid, self.orders[1].uuid]
+        )
+
+    @override_settings(ORDER_EVENT_RETENTION=0)
+    def test_prune_handled_events(self):
+        with override_settings(
+            ORDER_EVENT_HANDLERS={
+                "first": "smplshop.shop.tests.test_events.fail",
+                "second": "smplshop.shop.tests.test_events.record_second",
+            }
+        ):
+            with self.assertLogs("smplshop.shop.events", "ERROR"):
+                dispatch_order_events()
+        # the first handler has not had the events yet
+        self.assertEqual(prune_order_events(), 0)
+        dispatch_order_events()
+        with override_settings(ORDER_EVENT_RETENTION=60):
+            self.assertEqual(prune_order_events(), 0)
+        self.assertEqual(prune_order_events(batch_size=2), 5)
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_failing_handler_keeps_its_cursor(self):
+        with override_settings(
+            ORDER_EVENT_HANDLERS={
+                "first": "smplshop.shop.tests.test_events.fail",
+                "second": "smplshop.shop.tests.test_events.record_second",
+            }
+        ):
+            with self.assertLogs("smplshop.shop.events", "ERROR"):
+                self.assertEqual(dispatch_order_events(), {"first": 0, "second": 5})
+        # the events the failing handler missed come again
+        self.assertEqual(dispatch_order_events(), {"first": 5, "second": 0})
+        self.assertEqual(received["first"], [self.uuids])
+
+
+class TestRelayOrderEvents(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        order_events.get_feed_client.cache_clear()
+        self.store = StoreFactory.create()
+        self.orders = OrderFactory.create_batch(2, store=self.store)
+        Order.objects.all().transition("accept")
+
+    def tearDown(self):
+        order_events.get_feed_client.cache_clear()
+        super().tearDown()
+
+    @override_settings(ORDER_FEED_REDIS_URL=None)
+    def test_needs_redis(self):
+        with self.assertRaises(CommandError):
+            call_command("relay_order_events", "--once")
+
+    @skipUnless(redis_available(), "needs a Redis server at TEST_REDIS_URL")
+    @use_redis("ORDER_FEED_REDIS_URL")
+    def test_publishes_events_once(self):
+        pubsub = order_events.get_feed_client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(order_events.FEED_CHANNEL)
+        try:
+            out = io.StringIO()
+            call_command("relay_order_events", "--once", stdout=out)
+            self.assertEqual(out.getvalue().strip(), "2 order events relayed")
+            call_command("relay_order_events", "--once", stdout=out)
+            events = list(OrderEvent.objects.order_by("transaction_id", "id"))
+            published = []
+            # get_message also returns None for the subscribe confirmation, so
+            # read until the events are all in or the time is up, then a little
+            # longer to catch any sent twice
+            deadline = time.monotonic() + 5
+            while len(published) < len(events) and time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=0.1)
+                if message is not None:
+                    published.append(json.loads(message["data"]))
+            message = pubsub.get_message(timeout=0.5)
+            if message is not None:
+                published.append(json.loads(message["data"]))
+        finally:
+            pubsub.close()
+        self.assertEqual(
+            [(item["transaction_id"], item["event"]["id"]) for item in published],
+            [(event.transaction_id, event.id) for event in events],
+        )
+
+
+class TestOrderEventHandlers(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store = StoreFactory.create()
+        self.order = OrderFactory.create(store=self.store)
+        self.order.accept_order()
+        self.events = list(OrderEvent.objects.select_related("store"))
+
+    @override_settings(
+        ORDER_EVENT_HANDLERS={"email": "smplshop.shop.events.send_order_emails"}
+    )
+    def test_email(self):
+        dispatch_order_events()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.order.user.email])
+        self.assertIn(str(self.order.uuid), mail.outbox[0].subject)
+
+    @override_settings(ORDER_EVENT_WEBHOOK_URLS=["http://hooks.example.com/orders"])
+    def test_webhook(self):
+        with mock.patch("urllib.request.urlopen") as urlopen:
+            post_order_webhooks(self.events)
+        request = urlopen.call_args.args[0]
+        self.assertEqual(request.full_url, "http://hooks.example.com/orders")
+        self.assertEqual(
+            json.loads(request.data)["events"][0],
+            {
+                "id": self.events[0].id,
+                "order_uuid": str(self.order.uuid),
+                "store": self.store.code,
+                "status": "accepted",
+                "created_at": self.events[0].created_at.isoformat(),
+            },
+        )
@@ -0,0 +1,108 @@
+from django.db import connection
+from django.test import TestCase
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.models import Product, ProductInStore, Store
+from smplshop.shop.models import (
+    CLAIMABLE_ORDER_STATUSES,
+    OPEN_ORDER_STATUSES,
+    Cart,
+    CartItem,
+    Order,
+)
+from smplshop.users.models import User
+
+
+class TestListQueriesUseIndexes(TestCase):
+    STORES = 20
+    USERS = 50
+    PRODUCTS = 200
+    ORDERS = 40000
+
+    @classmethod
+    def setUpTestData(cls):
+        fake.unique.clear()
+        stores = Store.objects.bulk_create(
+            Store(code="store_%s" % i, name="Store %s" % i) for i in range(cls.STORES)
+        )
+        users = User.objects.bulk_create(
+            User(username="user_%s" % i, email="user_%s@example.com" % i)
+            for i in range(cls.USERS)
+        )
+        products = Product.objects.bulk_create(
+            Product(code="product_%s" % i, name="Product %s" % i)
+            for i in range(cls.PRODUCTS)
+        )
+        ProductInStore.objects.bulk_create(
+            ProductInStore(store=store, product=product, price=10)
+            for store in stores
+            for product in products
+        )
+        statuses = [status for status, _ in Order.ORDER_STATUS_CHOICES]
+        # most orders are closed, as they are in a shop that has been running a while
+        Order.objects.bulk_create(
+            (
+                Order(
+                    user=users[i % cls.USERS],
+                    store=stores[i % cls.STORES],
+                    status=statuses[i % len(statuses)] if i % 10 == 0 else "closed",
+                )
+                for i in range(cls.ORDERS)
+            ),
+            batch_size=5000,
+        )
+        carts = Cart.objects.bulk_create(Cart(store=stores[0]) for i in range(500))
+        in_store = list(ProductInStore.objects.filter(store=stores[0])[:20])
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product_in_store=product_in_store, quantity=1)
+            for cart in carts
+            for product_in_store in in_store
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.store = stores[3]
+        cls.user = users[3]
+        cls.cart = carts[7]
+        cls.product_in_store = in_store[5]
+
+    def assertNoSeqScan(self, qs):
+        plan = qs.explain()
+        self.assertNotIn("Seq Scan on " + qs.model._meta.db_table, plan, plan)
+
+    def test_customer_order_list(self):
+        self.assertNoSeqScan(Order.objects.filter(store=self.store, user=self.user))
+
+    def test_staff_order_list(self):
+        self.assertNoSeqScan(Order.objects.filter(store=self.store)[:10])
+
+    def test_staff_order_list_by_status(self):
+        self.assertNoSeqScan(
+            Order.objects.filter(store=self.store, status="accepted")[:10]
+        )
+
+    def test_open_orders(self):
+        self.assertNoSeqScan(
+            Order.objects.filter(store=self.store, status__in=OPEN_ORDER_STATUSES)
+        )
+
+    def test_fulfilment_queue(self):
+        queue = (
+            Order.objects.filter(status__in=CLAIMABLE_ORDER_STATUSES)
+            .filter(claimed_until__isnull=True)
+            .order_by("created_at")[:10]
+        )
+        self.assertNoSeqScan(queue)
+        # read oldest first from an index, not every waiting order sorted
+        plan = queue.explain()
+        self.assertNotIn("Sort", plan, plan)
+
+    def test_cart_item_lookup(self):
+        self.assertNoSeqScan(
+            CartItem.objects.filter(
+                cart=self.cart, product_in_store=self.product_in_store
+            )
+        )
+
+    def test_products_in_store(self):
+        self.assertNoSeqScan(ProductInStore.objects.filter(store=self.store))
@@ -1,13 +1,20 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
+from django.utils import timezone
 
 from smplshop.functional_test.faker import fake
-from smplshop.master.tests.factory import StoreFactory
-from smplshop.shop.models import Order
+from smplshop.master.tests.factory import ProductFactory, StoreFactory
+from smplshop.shop.models import Order, OrderItem
 from smplshop.users.tests.factory import UserFactory
 
-from .factory import OrderFactory
+from .factory import OrderFactory, OrderItemFactory
 
 
 class TestCustomerOrder(TestCase):
@@ -106,3 +113,171 @@ class TestCustomerOrder(TestCase):
             Order.objects.filter(store=self.store3, user=self.user),
             ordered=False,
         )
+
+    def test_queryset_by_total(self):
+        for order, total in [
+            (self.store2order1, 5),
+            (self.store2order2, 50),
+            (self.store2order3, 500),
+            (self.store2order4, 20),
+        ]:
+            Order.objects.filter(pk=order.pk).update(total_order_price=total)
+        response = self.client.get(
+            "{}{}{}".format("/shop/", self.store2.code, "/orders/"),
+            {"total_min": 10, "total_max": 100, "sort": "total_order_price"},
+        )
+        self.assertEqual(
+            list(response.context["object_list"]),
+            [self.store2order4, self.store2order2],
+        )
+
+
+class TestOrderTotal(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.order = OrderFactory.create()
+
+    def test_total_of_order_without_items(self):
+        self.assertEqual(self.order.total_order_price, 0)
+
+    def test_total_follows_order_items(self):
+        product = ProductFactory.create()
+        item1 = OrderItem.objects.create(
+            order=self.order, product=product, price=10.5, quantity=2
+        )
+        OrderItem.objects.create(order=self.order, product=product, price=3, quantity=4)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_order_price, 33)
+
+        item1.quantity = 1
+        item1.save()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_order_price, 22.5)
+
+        item1.delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_order_price, 12)
+
+    def test_order_delete_does_not_update_totals(self):
+        OrderItemFactory.create_batch(3, order=self.order)
+        with CaptureQueriesContext(connection) as queries:
+            Order.objects.filter(pk=self.order.pk).delete()
+        self.assertFalse(
+            [query for query in queries if query["sql"].startswith("UPDATE")]
+        )
+        self.assertFalse(OrderItem.objects.filter(order_id=self.order.pk).exists())
+
+
+class TestOrderTransition(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store = StoreFactory.create()
+        self.placed = OrderFactory.create_batch(3, store=self.store)
+        self.shipped = OrderFactory.create_batch(2, store=self.store, status="shipped")
+
+    def test_moves_only_allowed_orders(self):
+        orders = Order.objects.filter(
+            uuid__in=[order.uuid for order in self.placed + self.shipped]
+        )
+        moved = orders.transition("accept")
+        self.assertEqual(set(moved), {order.uuid for order in self.placed})
+        self.assertEqual(
+            set(Order.objects.filter(status="accepted").values_list("uuid", flat=True)),
+            {order.uuid for order in self.placed},
+        )
+        self.assertEqual(Order.objects.filter(status="shipped").count(), 2)
+
+    def test_change_applies_once(self):
+        self.assertEqual(len(Order.objects.all().transition("cancel")), 5)
+        self.assertEqual(Order.objects.all().transition("cancel"), [])
+
+    def test_stale_instance_is_rejected(self):
+        order = self.placed[0]
+        Order.objects.filter(pk=order.pk).transition("cancel")
+        # the instance still says placed, the row does not
+        with self.assertRaisesMessage(
+            ValidationError, "Order {} cannot be accepted".format(order.uuid)
+        ):
+            order.accept_order()
+
+    def test_instance_follows_change(self):
+        order = self.placed[0]
+        updated_at = order.updated_at
+        order.accept_order()
+        self.assertEqual(order.status, "accepted")
+        self.assertGreater(order.updated_at, updated_at)
+
+
+class TestOrderClaim(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store = StoreFactory.create()
+        self.packer1 = UserFactory.create()
+        self.packer2 = UserFactory.create()
+        self.placed = OrderFactory.create_batch(3, store=self.store)
+        self.accepted = OrderFactory.create(store=self.store, status="accepted")
+        self.shipped = OrderFactory.create(store=self.store, status="shipped")
+
+    def test_claims_are_disjoint(self):
+        claimed1 = Order.objects.claim(self.packer1, 2)
+        claimed2 = Order.objects.claim(self.packer2, 5)
+        # oldest first, and never an order that is past packing
+        self.assertEqual(claimed1, self.placed[:2])
+        self.assertEqual(claimed2, [self.placed[2], self.accepted])
+        self.assertEqual(Order.objects.claim(self.packer1, 1), [])
+        self.assertEqual(claimed1[0].claimant, self.packer1)
+        self.assertEqual(
+            Order.objects.filter(claimed_by=self.packer2).count(), len(claimed2)
+        )
+
+    def test_expired_lease_can_be_claimed_again(self):
+        Order.objects.claim(self.packer1, 4)
+        Order.objects.filter(pk=self.placed[1].pk).update(
+            claimed_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.placed[1].refresh_from_db()
+        self.assertIsNone(self.placed[1].claimant)
+        self.assertEqual(Order.objects.claim(self.packer2, 4), [self.placed[1]])
+
+    def test_release(self):
+        Order.objects.claim(self.packer1, 2)
+        Order.objects.claim(self.packer2, 2)
+        self.assertEqual(Order.objects.release(self.packer1), 2)
+        self.assertEqual(Order.objects.claim(self.packer2, 4), self.placed[:2])
+
+
+class TestConcurrentOrderClaim(TransactionTestCase):
+    def test_locked_orders_are_skipped(self):
+        fake.unique.clear()
+        store = StoreFactory.create()
+        packer1 = UserFactory.create()
+        packer2 = UserFactory.create()
+        orders = OrderFactory.create_batch(4, store=store)
+        claimed = threading.Event()
+        done = threading.Event()
+        claimed_in_thread = []
+
+        def claim_and_hold():
+            try:
+                with transaction.atomic():
+                    claimed_in_thread.extend(Order.objects.claim(packer1, 2))
+                    claimed.set()
+                    # keep the rows locked until the other claim is over
+                    done.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=claim_and_hold)
+        thread.start()
+        try:
+            self.assertTrue(claimed.wait(10))
+            claimed_here = Order.objects.claim(packer2, 4)
+        finally:
+            done.set()
+            thread.join()
+
+        self.assertEqual(claimed_in_thread, orders[:2])
+        self.assertEqual(claimed_here, orders[2:])
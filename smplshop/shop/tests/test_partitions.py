@@ -0,0 +1,229 @@
+from datetime import date, timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import timezone
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductFactory, StoreFactory
+from smplshop.shop.models import Order, OrderItem
+from smplshop.shop.partitions import (
+    MOVING_ROWS,
+    TABLES,
+    add_months,
+    convert_to_partitioned,
+    create_partitions,
+    default_partition_name,
+    is_partitioned,
+    partition_name,
+    start_of_month,
+)
+from smplshop.shop.tasks import create_order_partitions
+from smplshop.users.tests.factory import UserFactory
+
+from .factory import OrderFactory, OrderItemFactory
+
+
+def count_rows(table: str) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+class TestAddMonths(TestCase):
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 1))
+        self.assertEqual(add_months(date(2024, 11, 5), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 5), -1), date(2023, 12, 1))
+
+
+class TestPartitionOrders(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store = StoreFactory.create()
+        self.product = ProductFactory.create()
+        self.this_month = add_months(timezone.localdate(), 0)
+        self.old = OrderFactory.create(store=self.store, user=self.user)
+        self.new = OrderFactory.create(store=self.store, user=self.user)
+        for order in [self.old, self.new]:
+            OrderItemFactory.create(
+                order=order, product=self.product, price=2.5, quantity=4
+            )
+        old_created_at = timezone.now() - timedelta(days=62)
+        Order.objects.filter(pk=self.old.pk).update(created_at=old_created_at)
+        OrderItem.objects.filter(order=self.old).update(created_at=old_created_at)
+        self.old_month = add_months(timezone.localdate(old_created_at), 0)
+
+    def test_convert(self):
+        self.assertFalse(any(is_partitioned(table) for table in TABLES))
+        created = convert_to_partitioned(months_ahead=1)
+
+        self.assertTrue(all(is_partitioned(table) for table in TABLES))
+        self.assertIn(partition_name("shop_order", self.old_month), created)
+        self.assertIn(
+            partition_name("shop_orderitem", add_months(self.this_month, 1)), created
+        )
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(OrderItem.objects.count(), 2)
+        self.assertEqual(count_rows(partition_name("shop_order", self.old_month)), 1)
+        self.assertEqual(
+            count_rows(partition_name("shop_orderitem", self.old_month)), 1
+        )
+        self.assertEqual(count_rows(default_partition_name("shop_order")), 0)
+
+    def test_orders_on_partitioned_tables(self):
+        convert_to_partitioned(months_ahead=1)
+
+        order = OrderFactory.create(store=self.store, user=self.user)
+        item = OrderItemFactory.create(
+            order=order, product=self.product, price=1.5, quantity=2
+        )
+        self.assertGreater(order.pk, self.new.pk)
+        self.assertEqual(item.created_at, order.created_at)
+        order.refresh_from_db()
+        self.assertEqual(order.total_order_price, 3.0)
+        self.assertEqual(
+            Order.objects.filter(pk=order.pk).transition("accept"), [order.uuid]
+        )
+
+        # the items go with their order without a foreign key to cascade
+        order.delete()
+        self.assertFalse(OrderItem.objects.filter(pk=item.pk).exists())
+
+    def test_date_range_reads_one_partition(self):
+        convert_to_partitioned(months_ahead=1)
+
+        since = timezone.now() - timedelta(hours=1)
+        for table, qs in [
+            ("shop_order", Order.objects.filter(store=self.store)),
+            ("shop_orderitem", OrderItem.objects.filter(order=self.new)),
+        ]:
+            plan = qs.filter(created_at__gte=since).explain()
+            self.assertIn(partition_name(table, self.this_month), plan)
+            self.assertNotIn(partition_name(table, self.old_month), plan)
+
+    def test_create_order_partitions(self):
+        # unpartitioned tables are left alone
+        self.assertEqual(create_order_partitions(), [])
+
+        convert_to_partitioned(months_ahead=0)
+        with self.settings(ORDER_PARTITION_MONTHS_AHEAD=2):
+            created = create_order_partitions()
+            self.assertEqual(
+                created,
+                [
+                    partition_name(table, add_months(self.this_month, months))
+                    for table in TABLES
+                    for months in [1, 2]
+                ],
+            )
+            self.assertEqual(create_order_partitions(), [])
+        self.assertEqual(
+            create_partitions("shop_order", self.old_month, self.this_month), []
+        )
+
+    def make_order_in(self, month) -> Order:
+        """An order in month, past the partitions made for it."""
+        order = OrderFactory.create(store=self.store, user=self.user)
+        OrderItemFactory.create(order=order, product=self.product)
+        created_at = start_of_month(month)
+        # the created_at of an order is not changed otherwise, moving it takes
+        # the order out from under its items for a moment
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, 'on', true)", [MOVING_ROWS])
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            OrderItem.objects.filter(order=order).update(created_at=created_at)
+        return order
+
+    def test_orders_past_the_partitions_are_kept(self):
+        convert_to_partitioned(months_ahead=0)
+        later = add_months(self.this_month, 2)
+        order = self.make_order_in(later)
+        for table in TABLES:
+            self.assertEqual(count_rows(default_partition_name(table)), 1)
+
+        with self.settings(ORDER_PARTITION_MONTHS_AHEAD=2):
+            with self.assertLogs("smplshop.shop.partitions", "WARNING"):
+                create_order_partitions()
+        for table in TABLES:
+            self.assertEqual(count_rows(default_partition_name(table)), 0)
+            self.assertEqual(count_rows(partition_name(table, later)), 1)
+        self.assertEqual(Order.objects.get(pk=order.pk).orderitem_set.count(), 1)
+
+    def test_failed_partition_leaves_rows_in_default(self):
+        convert_to_partitioned(months_ahead=0)
+        later = add_months(self.this_month, 1)
+        order = self.make_order_in(later)
+
+        def fail_attach(execute, sql, params, many, context):
+            if "ATTACH PARTITION" in sql:
+                raise RuntimeError("attach failed")
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(fail_attach):
+            with self.assertRaises(RuntimeError):
+                create_partitions("shop_order", later, later)
+        self.assertEqual(count_rows(default_partition_name("shop_order")), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass(%s)", [partition_name("shop_order", later)]
+            )
+            self.assertIsNone(cursor.fetchone()[0])
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+
+    def test_integrity_kept_by_triggers(self):
+        convert_to_partitioned(months_ahead=1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OrderFactory.create(store=self.store, user=self.user, uuid=self.new.uuid)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OrderItem.objects.create(
+                order_id=self.new.pk + 1000,
+                product=self.product,
+                price=1.0,
+                quantity=1,
+                created_at=self.new.created_at,
+            )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM shop_order WHERE id = %s", [self.new.pk])
+        # items first, as Django and the archive delete them
+        OrderItem.objects.filter(order=self.new).delete()
+        Order.objects.filter(pk=self.new.pk).delete()
+        self.assertFalse(Order.objects.filter(pk=self.new.pk).exists())
+
+    def test_customer_orders_by_date(self):
+        convert_to_partitioned(months_ahead=1)
+        self.client.login(username=self.user.username, password=self.password)
+
+        response = self.client.get(
+            "{}{}{}".format("/shop/", self.store.code, "/orders/"),
+            {"date_from": timezone.localdate().isoformat()},
+        )
+        self.assertEqual(
+            [order.pk for order in response.context["object_list"]], [self.new.pk]
+        )
+        self.assertEqual(
+            [
+                item.quantity
+                for item in response.context["object_list"][0].orderitem_set.all()
+            ],
+            [4],
+        )
+
+        response = self.client.get(
+            "{}{}{}".format("/shop/", self.store.code, "/orders/"),
+            {"date_to": (timezone.localdate() - timedelta(days=30)).isoformat()},
+        )
+        self.assertEqual(
+            [order.pk for order in response.context["object_list"]], [self.old.pk]
+        )
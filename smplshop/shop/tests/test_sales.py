@@ -0,0 +1,146 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductFactory, StoreFactory
+from smplshop.shop.models import DailyProductSales, DailySales, Order, RollupWatermark
+from smplshop.shop.tasks import update_sales_rollups
+
+from .factory import OrderFactory, OrderItemFactory
+
+
+class SalesTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.product1 = ProductFactory.create()
+        self.product2 = ProductFactory.create()
+        self.orders = OrderFactory.create_batch(3, store=self.store1)
+        self.other = OrderFactory.create(store=self.store2)
+        for order in self.orders + [self.other]:
+            OrderItemFactory.create(
+                order=order, product=self.product1, price=10, quantity=2
+            )
+        OrderItemFactory.create(
+            order=self.orders[0], product=self.product2, price=5, quantity=1
+        )
+        self.today = timezone.localdate()
+
+    def sales(self, store) -> dict:
+        return dict(
+            DailySales.objects.filter(store=store, day=self.today).values_list(
+                "status", "orders"
+            )
+        )
+
+    def product_sales(self, store) -> dict:
+        return {
+            row[0]: row[1:]
+            for row in DailyProductSales.objects.filter(
+                store=store, day=self.today
+            ).values_list("product", "units", "revenue", "orders")
+        }
+
+
+@override_settings(SALES_ROLLUP_LAG=0)
+class TestUpdateSalesRollups(SalesTestCase):
+    def setUp(self):
+        self.since = timezone.now() - timedelta(hours=1)
+        RollupWatermark.objects.create(name="sales", changed_until=self.since)
+        super().setUp()
+
+    def test_rolls_up_orders_of_the_day(self):
+        self.assertEqual(update_sales_rollups(), 2)
+        self.assertEqual(self.sales(self.store1), {"placed": 3})
+        self.assertEqual(
+            DailySales.objects.get(store=self.store1).revenue,
+            sum(Order.objects.get(pk=o.pk).total_order_price for o in self.orders),
+        )
+        self.assertEqual(
+            self.product_sales(self.store1),
+            {self.product1.id: (6, 60.0, 3), self.product2.id: (1, 5.0, 1)},
+        )
+        self.assertEqual(
+            self.product_sales(self.store2), {self.product1.id: (2, 20.0, 1)}
+        )
+
+    def test_only_changed_orders_are_rolled_up_again(self):
+        update_sales_rollups()
+        Order.objects.filter(pk=self.orders[0].pk).transition("cancel")
+        Order.objects.filter(pk=self.orders[1].pk).transition("accept")
+        # only the day of store1 is rebuilt
+        self.assertEqual(update_sales_rollups(), 1)
+        self.assertEqual(
+            self.sales(self.store1), {"placed": 1, "accepted": 1, "cancelled": 1}
+        )
+        # cancelled orders sell nothing
+        self.assertEqual(
+            self.product_sales(self.store1), {self.product1.id: (4, 40.0, 2)}
+        )
+        self.assertEqual(update_sales_rollups(), 0)
+
+    @override_settings(SALES_ROLLUP_LAG=2 * 60 * 60)
+    def test_recent_changes_wait(self):
+        self.assertEqual(update_sales_rollups(), 0)
+        self.assertFalse(DailySales.objects.exists())
+
+    def test_first_run_starts_from_now(self):
+        RollupWatermark.objects.all().delete()
+        self.assertEqual(update_sales_rollups(), 0)
+        self.assertFalse(DailySales.objects.exists())
+        self.assertGreater(
+            RollupWatermark.objects.get(name="sales").changed_until, self.since
+        )
+
+    def test_catches_up_a_day_of_changes_at_a_time(self):
+        RollupWatermark.objects.update(changed_until=self.since - timedelta(days=2))
+        Order.objects.filter(pk=self.other.pk).update(
+            created_at=self.since - timedelta(days=1),
+            updated_at=self.since - timedelta(days=1),
+        )
+        with mock.patch(
+            "smplshop.shop.tasks.rebuild_sales",
+            side_effect=[None, RuntimeError("database went away")],
+        ):
+            with self.assertRaises(RuntimeError):
+                update_sales_rollups()
+        # the day of changes before the failing one stays rolled up
+        self.assertEqual(
+            RollupWatermark.objects.get(name="sales").changed_until, self.since
+        )
+        self.assertEqual(update_sales_rollups(), 1)
+        self.assertEqual(self.sales(self.store1), {"placed": 3})
+
+
+class TestBackfillSales(SalesTestCase):
+    def test_backfill(self):
+        Order.objects.filter(pk=self.other.pk).update(
+            created_at=timezone.now() - timedelta(days=3)
+        )
+        out = io.StringIO()
+        call_command("backfill_sales", stdout=out)
+        self.assertIn("4 days of sales rebuilt", out.getvalue())
+        self.assertEqual(self.sales(self.store1), {"placed": 3})
+        self.assertEqual(
+            DailySales.objects.get(store=self.store2).day,
+            self.today - timedelta(days=3),
+        )
+
+    def test_backfill_of_a_store(self):
+        call_command(
+            "backfill_sales",
+            "--store",
+            self.store2.code,
+            "--date-from",
+            self.today.isoformat(),
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(self.sales(self.store1), {})
+        self.assertEqual(self.sales(self.store2), {"placed": 1})
@@ -1,8 +1,10 @@
 import uuid
 
-from django.db.models import F, FilteredRelation, IntegerField, Q, Value
+from django.conf import settings
+from django.db import IntegrityError, connection
 from django.test import TestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
 
 from smplshop.functional_test.faker import fake
@@ -62,26 +64,26 @@ class TestShopFront(TestCase):
         self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
         self.assertTemplateUsed("shop/shop_front.html")
 
+    def catalog(self, store, quantities=None):
+        quantities = quantities or {}
+        return [
+            dict(item, quantity=quantities.get(item["id"], None))
+            for item in ProductInStore.objects.filter(store=store).values(
+                "id", "uuid", "store", "product", "price"
+            )
+        ]
+
     def test_queryset_with_no_cart(self):
         response = self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
-        product_in_store1 = ProductInStore.objects.filter(store=self.store1)
-        self.assertQuerysetEqual(response.context["object_list"], product_in_store1)
+        self.assertEqual(response.context["object_list"], self.catalog(self.store1))
 
     def test_queryset_with_cart(self):
         cart = CartFactory.create(store=self.store1)
-        CartItemFactory.create(cart=cart, product_in_store=self.product_in_store1[0])
-        CartItemFactory.create(cart=cart, product_in_store=self.product_in_store1[10])
-
-        product_in_store1 = (
-            ProductInStore.objects.filter(store=self.store1)
-            .prefetch_related("cart_items")
-            .values("uuid", "store", "product", "price")
-            .annotate(
-                item_in_cart=FilteredRelation(
-                    "cart_items", condition=Q(cart_items__cart=cart)
-                )
-            )
-            .annotate(quantity=F("item_in_cart__quantity"))
+        item1 = CartItemFactory.create(
+            cart=cart, product_in_store=self.product_in_store1[0]
+        )
+        item2 = CartItemFactory.create(
+            cart=cart, product_in_store=self.product_in_store1[10]
         )
 
         session = self.client.session
@@ -89,23 +91,63 @@ class TestShopFront(TestCase):
         session.save()
 
         response = self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
-        self.assertQuerysetEqual(response.context["object_list"], product_in_store1)  # type: ignore
+        self.assertEqual(
+            response.context["object_list"],
+            self.catalog(
+                self.store1,
+                {
+                    item1.product_in_store_id: item1.quantity,
+                    item2.product_in_store_id: item2.quantity,
+                },
+            ),
+        )
 
     def test_queryset_with_cart_but_no_items(self):
         cart = CartFactory.create(store=self.store1)
 
-        product_in_store1 = (
-            ProductInStore.objects.filter(store=self.store1)
-            .annotate(quantity=Value(None, output_field=IntegerField()))
-            .values("uuid", "store", "product", "price", "quantity")
-        )
-
         session = self.client.session
         session[self.store1.code] = str(cart.uuid)
         session.save()
 
         response = self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
-        self.assertQuerysetEqual(response.context["object_list"], product_in_store1)  # type: ignore
+        self.assertEqual(response.context["object_list"], self.catalog(self.store1))
+
+    def test_catalog_is_paginated(self):
+        ProductInStoreFactory.create_batch(60, store=self.store1)
+        catalog = self.catalog(self.store1)
+        per_page = settings.SHOP_FRONT_ITEMS_PER_PAGE
+        first_page, second_page = catalog[:per_page], catalog[per_page:]
+
+        response = self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
+        self.assertEqual(response.context["object_list"], first_page)
+        response = self.client.get(
+            "{}{}{}{}".format(
+                "/shop/",
+                self.store1.code,
+                "/?after=",
+                response.context["page_obj"].next_cursor,
+            )
+        )
+        self.assertEqual(response.context["object_list"], second_page)
+        self.assertFalse(response.context["page_obj"].has_next())
+
+    def test_catalog_is_served_from_cache(self):
+        self.client.logout()
+        self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
+        self.assertEqual(response.context["object_list"], self.catalog(self.store1))
+        self.assertFalse([q for q in queries if '"master_productinstore"' in q["sql"]])
+
+    def test_catalog_changes_invalidate_cache(self):
+        self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
+        self.product_in_store1[0].price = 1234.5
+        self.product_in_store1[0].save()
+        self.product_in_store1[1].delete()
+        ProductInStoreFactory.create(store=self.store1)
+
+        response = self.client.get("{}{}{}".format("/shop/", self.store1.code, "/"))
+        self.assertEqual(response.context["object_list"], self.catalog(self.store1))
 
     def test_empty_shop(self):
         response = self.client.get("{}{}{}".format("/shop/", self.shop.code, "/"))
@@ -307,3 +349,59 @@ class TestAddToCart(TestCase):
         self.assertContains(
             response, "No ProductInStore matches the given query.", status_code=404
         )
+
+    def test_stale_cart_in_session_is_replaced(self):
+        session = self.client.session
+        session[self.store1.code] = str(uuid.uuid4())
+        session.save()
+        response = self.client.get(
+            "%s%s%s%s%s"
+            % (
+                "/shop/",
+                self.store1.code,
+                "/cart/add/",
+                str(self.product_in_store1[1].uuid),
+                "/",
+            )
+        )
+        store_cookie = response.wsgi_request.session.get(self.store1.code, None)
+        cart = Cart.objects.get(store=self.store1)
+        self.assertEqual(store_cookie, str(cart.uuid))
+        self.assertEqual(
+            1,
+            cart.cartitem_set.get(product_in_store=self.product_in_store1[1]).quantity,
+        )
+
+    def test_item_is_added_with_one_statement(self):
+        cart = CartFactory.create(store=self.store1)
+        CartItemFactory.create(
+            cart=cart, product_in_store=self.product_in_store1[1], quantity=3
+        )
+        session = self.client.session
+        session[self.store1.code] = str(cart.uuid)
+        session.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                "%s%s%s%s%s"
+                % (
+                    "/shop/",
+                    self.store1.code,
+                    "/cart/add/",
+                    str(self.product_in_store1[1].uuid),
+                    "/",
+                )
+            )
+        self.assertEqual(1, len([q for q in queries if "shop_cartitem" in q["sql"]]))
+        self.assertEqual(
+            4,
+            cart.cartitem_set.get(product_in_store=self.product_in_store1[1]).quantity,
+        )
+
+    def test_duplicate_cart_items_are_rejected(self):
+        cart = CartFactory.create(store=self.store1)
+        CartItemFactory.create(cart=cart, product_in_store=self.product_in_store1[1])
+        with self.assertRaises(IntegrityError):
+            CartItemFactory.create(
+                cart=cart, product_in_store=self.product_in_store1[1]
+            )
@@ -1,8 +1,13 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 from smplshop.master.tests.factory import StoreFactory
+from smplshop.shop import stores
 from smplshop.users.tests.factory import UserFactory
 
 
@@ -32,3 +37,55 @@ class TestShopMiddleware(TestCase):
         self.assertContains(
             response=response, text="Shop test does not exist", status_code=404
         )
+
+    def test_shop_is_resolved_once(self):
+        self.client.get("/shop/" + str(self.shop.code) + "/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/shop/" + str(self.shop.code) + "/cart/")
+        self.assertEqual(response.wsgi_request.shop, self.shop)
+        self.assertFalse(
+            [query for query in queries if '"master_store"' in query["sql"]]
+        )
+
+    def test_changed_shop_is_not_served_from_cache(self):
+        self.client.get("/shop/" + str(self.shop.code) + "/")
+        self.shop.name = self.shop.name + " renamed"
+        self.shop.save()
+        response = self.client.get("/shop/" + str(self.shop.code) + "/")
+        self.assertEqual(response.wsgi_request.shop.name, self.shop.name)
+
+    def test_renamed_shop_code_is_rejected(self):
+        old_code = self.shop.code
+        self.client.get("/shop/" + old_code + "/")
+        self.shop.code = old_code + "x"
+        self.shop.save()
+        response = self.client.get("/shop/" + old_code + "/")
+        self.assertEqual(404, response.status_code)
+
+    def test_deleted_shop_is_rejected(self):
+        code = self.shop.code
+        self.client.get("/shop/" + code + "/")
+        self.shop.delete()
+        response = self.client.get("/shop/" + code + "/")
+        self.assertEqual(404, response.status_code)
+
+    @override_settings(
+        STORE_CACHE_REDIS_URL="redis://127.0.0.1:1/0", STORE_CACHE_LISTENER_RETRY=60
+    )
+    def test_listener_is_not_restarted_while_redis_is_down(self):
+        self.addCleanup(setattr, stores, "_listener_failed_at", None)
+        self.addCleanup(setattr, stores, "_listener_pid", None)
+        with self.assertLogs("smplshop.shop.stores", "ERROR"):
+            stores._run_listener()
+
+        with mock.patch("threading.Thread") as thread:
+            for _ in range(3):
+                self.assertEqual(stores.get_store(self.shop.code), self.shop)
+        thread.assert_not_called()
+        # nothing is cached while other workers' changes would go unseen
+        self.assertIsNone(stores.store_cache.get(self.shop.code))
+
+        stores._listener_failed_at -= 60
+        with mock.patch("threading.Thread") as thread:
+            stores.get_store(self.shop.code)
+        thread.assert_called_once()
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductInStoreFactory, StoreFactory
+from smplshop.shop.models import Cart, CartItem
+from smplshop.shop.tasks import delete_abandoned_carts
+
+from .factory import CartFactory, CartItemFactory
+
+
+class TestDeleteAbandonedCarts(TestCase):
+    def setUp(self):
+        super().setUp()
+        fake.unique.clear()
+        self.store = StoreFactory.create()
+        self.old_carts = CartFactory.create_batch(5, store=self.store)
+        for cart in self.old_carts:
+            CartItemFactory.create_batch(2, cart=cart)
+        Cart.objects.filter(pk__in=[cart.pk for cart in self.old_carts]).update(
+            updated_at=timezone.now()
+            - timedelta(seconds=settings.CART_ABANDONED_AFTER + 60)
+        )
+        self.new_carts = CartFactory.create_batch(3, store=self.store)
+        for cart in self.new_carts:
+            CartItemFactory.create_batch(2, cart=cart)
+
+    def test_deletes_old_carts_in_batches(self):
+        self.assertEqual(
+            delete_abandoned_carts(batch_size=2), {"carts": 5, "items": 10}
+        )
+        self.assertEqual(
+            set(Cart.objects.values_list("pk", flat=True)),
+            {cart.pk for cart in self.new_carts},
+        )
+        self.assertEqual(CartItem.objects.count(), 6)
+
+    def test_adding_keeps_cart(self):
+        product_in_store = ProductInStoreFactory.create(store=self.store)
+        CartItem.objects.add_quantity(
+            self.old_carts[0].uuid, self.store, product_in_store.uuid
+        )
+        self.assertEqual(delete_abandoned_carts()["carts"], 4)
+        self.assertTrue(Cart.objects.filter(pk=self.old_carts[0].pk).exists())
@@ -0,0 +1,48 @@
+import io
+import time
+import uuid
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductInStoreFactory
+from smplshop.utils.uuids import uuid7
+
+from .factory import CartItemFactory, OrderFactory
+
+
+class TestTimeOrderedUUID(TestCase):
+    def test_uuid7(self):
+        first = uuid7()
+        time.sleep(0.002)
+        second = uuid7()
+        self.assertEqual(first.version, 7)
+        self.assertEqual(first.variant, uuid.RFC_4122)
+        self.assertLess(first, second)
+        # a uuid like any other in URLs
+        self.assertEqual(uuid.UUID(str(first)), first)
+        self.assertAlmostEqual(first.int >> 80, time.time_ns() // 1_000_000, delta=1000)
+
+    def test_model_defaults(self):
+        fake.unique.clear()
+        cart_item = CartItemFactory.create(
+            product_in_store=ProductInStoreFactory.create()
+        )
+        order = OrderFactory.create()
+        for value in [
+            cart_item.uuid,
+            cart_item.cart.uuid,
+            cart_item.product_in_store.uuid,
+            order.uuid,
+        ]:
+            self.assertEqual(value.version, 7)
+
+    def test_benchmark(self):
+        out = io.StringIO()
+        call_command("benchmark_order_uuids", "--orders", "250", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split(":")[0] for line in lines], ["uuid4", "uuid7"], lines
+        )
+        self.assertIn("250 orders in", lines[1])
@@ -0,0 +1,19 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.test import override_settings
+
+
+@lru_cache(maxsize=None)
+def redis_available() -> bool:
+    import redis
+
+    try:
+        return redis.Redis.from_url(settings.TEST_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+def use_redis(*names: str) -> override_settings:
+    """Point the given Redis URL settings at the test Redis database."""
+    return override_settings(**{name: settings.TEST_REDIS_URL for name in names})
@@ -6,6 +6,7 @@ from smplshop.shop.views import (
     ShopFrontView,
     add_to_cart,
     place_order,
+    update_cart,
 )
 
 app_name = "smplshop.shop"
@@ -17,6 +18,7 @@ urlpatterns = [
         name="add_to_cart",
     ),
     path("<str:shop>/cart/", view=CartView.as_view(), name="cart"),
+    path("<str:shop>/cart/update/", view=update_cart, name="update_cart"),
     path("<str:shop>/cart/order/", view=place_order, name="place_order"),
     path("<str:shop>/orders/", view=OrderListView.as_view(), name="customer_orders"),
 ]
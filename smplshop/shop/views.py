@@ -1,21 +1,36 @@
 import uuid as uid
-from typing import Any
+from typing import Any, Optional
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import F, FilteredRelation, Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.db.models.base import ModelBase
 from django.db.models.query import QuerySet
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.http.request import HttpRequest
 from django.shortcuts import get_object_or_404, redirect
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView
 
-from smplshop.master.models import ProductInStore, Store
+from smplshop.genericview.keyset import paginate_list
+from smplshop.master.models import ProductInStore
 
-from .models import Cart, CartItem, Order, OrderItem
+from .archive import read_archived_items
+from .carts import get_cart_backend
+from .catalog import get_catalog
+from .forms import CartUpdateForm, CustomerOrderFilterForm
+from .models import (
+    ArchivedOrder,
+    Cart,
+    Order,
+    OrderEvent,
+    OrderItem,
+    order_status_changed,
+)
 
 
 # Create your views here.
@@ -23,121 +38,172 @@ class ShopFrontView(ListView):
     model: ModelBase = ProductInStore
     template_name: str = "shop/shop_front.html"
 
-    def get_queryset(self) -> QuerySet[Any]:
-        shop = self.kwargs["shop"]
-        store = Store.objects.get(code=shop)
-
-        qs = super().get_queryset().filter(store=store)
-
-        if self.request.session.get(shop, None):
-            cart_uuid = self.request.session.get(shop, None)
-            cart = Cart.objects.get(uuid=cart_uuid)
-            qs = (
-                qs.prefetch_related("cart_items")
-                .values("uuid", "store", "product", "price")
-                .annotate(
-                    item_in_cart=FilteredRelation(
-                        "cart_items", condition=Q(cart_items__cart=cart)
-                    )
-                )
-                .annotate(quantity=F("item_in_cart__quantity"))
-            )
+    paginate_by: int = settings.SHOP_FRONT_ITEMS_PER_PAGE
 
-        return qs  # type: ignore
+    def get_queryset(self) -> list[dict]:  # type: ignore
+        return get_catalog(self.request.shop)  # type: ignore
+
+    def get_cart_quantities(self) -> dict:
+        shop = self.kwargs["shop"]
+        if not self.request.session.get(shop, None):
+            return {}
+
+        cart_uuid = self.request.session.get(shop, None)
+        return get_cart_backend().quantities(cart_uuid, self.request.shop)  # type: ignore
+
+    def paginate_queryset(self, catalog, page_size):
+        page = paginate_list(
+            catalog,
+            key=lambda item: item["uuid"],
+            per_page=page_size,
+            after=self.request.GET.get("after", None),
+            before=self.request.GET.get("before", None),
+        )
+
+        # the snapshot is shared, so the cart is laid over copies of its rows
+        quantities = self.get_cart_quantities()
+        page.object_list = [
+            dict(item, quantity=quantities.get(item["id"], None))
+            for item in page.object_list
+        ]
+        return (None, page, page.object_list, page.has_other_pages())
 
 
 def add_to_cart(
     request: HttpRequest, shop: str, product_in_store_uuid: uid.UUID
 ) -> HttpResponse:
 
-    product_in_store = get_object_or_404(
-        ProductInStore, uuid=product_in_store_uuid, store__code=shop
-    )
-    if not request.session.get(shop, None):
-        # if the cookie is not there,
-        # create an empty cart and create the cookie
-        # the empty cart will have user as None if
-        # the user is not logged in
-        store = Store.objects.get(code=shop)
-        new_cart = Cart.objects.create(store=store)
-        request.session[shop] = str(new_cart.uuid)
-        request.session.save()
-
+    store = request.shop  # type: ignore
     cart_uuid = request.session.get(shop, None)
-    cart = Cart.objects.get(uuid=cart_uuid)
+    carts = get_cart_backend()
 
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart, product_in_store=product_in_store
-    )
+    if cart_uuid and carts.add(cart_uuid, store, product_in_store_uuid):
+        return redirect("smplshop.shop:shop_front", shop=shop)
 
-    cart_item.quantity = cart_item.quantity + 1
-    cart_item.save()
+    # nothing was added, either the product is not in this shop or
+    # there is no usable cart for the session yet
+    get_object_or_404(ProductInStore, uuid=product_in_store_uuid, store=store)
+
+    # create an empty cart and store it in the session
+    new_cart_uuid = carts.create(store)
+    request.session[shop] = new_cart_uuid
+    request.session.save()
+
+    carts.add(new_cart_uuid, store, product_in_store_uuid)
 
     return redirect("smplshop.shop:shop_front", shop=shop)
 
 
+def cart_not_found() -> Http404:
+    # the same 404 get_object_or_404 gave when carts were always rows
+    return Http404(
+        _("No %(verbose_name)s matches the given query.")
+        % {"verbose_name": Cart._meta.object_name}
+    )
+
+
 class CartView(ListView):
     model: ModelBase = Cart
     template_name: str = "shop/cart.html"
 
     def get_store(self):
         shop = self.kwargs["shop"]
-        store = Store.objects.get(code=shop)
+        store = self.request.shop  # type: ignore
         return shop, store
 
-    def get_queryset(self) -> QuerySet[Any]:
+    def get_queryset(self) -> list[Any]:  # type: ignore
         shop, store = self.get_store()
-        qs = super().get_queryset().filter(store=store)
-
-        if self.request.session.get(shop, None):
-            cart_uuid = self.request.session.get(shop, None)
-            get_object_or_404(Cart, uuid=cart_uuid, store=store)
-            qs = qs.filter(uuid=cart_uuid)
-            qs = (
-                qs.prefetch_related("cartitem_set")
-                .annotate(
-                    #    store=F("cartitem__product_in_store__store"),
-                    product=F("cartitem__product_in_store__product"),
-                    price=F("cartitem__product_in_store__price"),
-                    quantity=F("cartitem__quantity"),
-                )
-                .annotate(total_price=F("price") * F("quantity"))
-            )
-        else:
-            qs = qs.none()
+        self.total_cart_price = 0
+
+        if not self.request.session.get(shop, None):
+            return []
 
-        return qs  # type: ignore
+        cart_uuid = self.request.session.get(shop, None)
+        contents = get_cart_backend().contents(cart_uuid, store)
+        if contents is None:
+            raise cart_not_found()
+
+        self.total_cart_price = contents.total_cart_price
+        return contents.lines
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        shop, store = self.get_store()
-        if self.request.session.get(shop, None):
-            cart_uuid = self.request.session.get(shop, None)
-            context["total_cart_price"] = Cart.objects.get(
-                store=store, uuid=cart_uuid
-            ).total_cart_price
-        else:
-            context["total_cart_price"] = 0
-
+        context["total_cart_price"] = self.total_cart_price
         return context
 
 
+@require_POST
+def update_cart(request: HttpRequest, shop: str) -> HttpResponse:
+    store = request.shop  # type: ignore
+    cart_uuid = request.session.get(shop, None)
+    form = CartUpdateForm(request.POST)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    if not cart_uuid:
+        raise cart_not_found()
+
+    carts = get_cart_backend()
+    if not carts.update(cart_uuid, store, form.cleaned_data["quantities"]):
+        raise cart_not_found()
+
+    if "application/json" not in request.headers.get("Accept", ""):
+        return redirect("smplshop.shop:cart", shop=shop)
+
+    contents = carts.contents(cart_uuid, store)
+    if contents is None:
+        # removed since the update, by a checkout or as abandoned
+        raise cart_not_found()
+    return JsonResponse(
+        {
+            "lines": [
+                {
+                    "product_in_store_uuid": line.product_in_store_uuid,
+                    "product": line.product,
+                    "price": line.price,
+                    "quantity": line.quantity,
+                    "total_price": line.total_price,
+                }
+                for line in contents.lines
+            ],
+            "total_cart_price": contents.total_cart_price,
+        }
+    )
+
+
 @login_required
 def place_order(request: HttpRequest, shop: str) -> HttpResponse:
-    store = Store.objects.get(code=shop)
+    store = request.shop  # type: ignore
     if request.session.get(shop, None):
         cart_uuid = request.session.get(shop, None)
-        cart = get_object_or_404(Cart, uuid=cart_uuid, store=store)
-        if CartItem.objects.filter(cart=cart).exists():
-            new_order = Order.objects.create(user=request.user, store=store)
-            for item in CartItem.objects.filter(cart=cart):
-                OrderItem.objects.create(
-                    order=new_order,
-                    product=item.product_in_store.product,
-                    price=item.product_in_store.price,
-                    quantity=item.quantity,
+        with transaction.atomic():
+            cart_items = get_cart_backend().checkout(cart_uuid, store)
+            if cart_items is None:
+                raise cart_not_found()
+            if cart_items:
+                new_order = Order.objects.create(user=request.user, store=store)
+                OrderItem.objects.bulk_create(
+                    [
+                        OrderItem(
+                            order=new_order,
+                            product_id=item.product_id,
+                            price=item.price,
+                            quantity=item.quantity,
+                            created_at=new_order.created_at,
+                        )
+                        for item in cart_items
+                    ]
                 )
-            cart.delete()
+                # bulk_create skips OrderItem.save, which keeps the total
+                Order.objects.filter(pk=new_order.pk).update_total_order_price()
+                OrderEvent.objects.create(
+                    order_uuid=new_order.uuid, store=store, status=new_order.status
+                )
+                transaction.on_commit(
+                    lambda: order_status_changed.send(
+                        sender=Order, changes=[(store.pk, None, "placed")]
+                    )
+                )
+        if cart_items:
             del request.session[shop]
             request.session.modified = True
             messages.success(request, _("Order " + str(new_order.uuid) + " created"))
@@ -153,10 +219,46 @@ class OrderListView(LoginRequiredMixin, ListView):
     model: ModelBase = Order
     template_name: str = "shop/orders.html"
 
+    @property
+    def archived(self) -> bool:
+        """Whether the archived orders are asked for, rather than the current ones."""
+        return bool(self.request.GET.get("archived", ""))
+
+    def get_paginate_by(self, queryset) -> Optional[int]:
+        # each page of archived orders reads their archive files
+        return settings.ITEMS_PER_PAGE if self.archived else None
+
+    def get_filter_form(self) -> CustomerOrderFilterForm:
+        if not hasattr(self, "filter_form"):
+            self.filter_form = CustomerOrderFilterForm(self.request.GET or None)
+        return self.filter_form
+
     def get_queryset(self) -> QuerySet[Any]:
-        shop = self.kwargs["shop"]
-        store = Store.objects.get(code=shop)
+        store = self.request.shop  # type: ignore
+        filter_form = self.get_filter_form()
+
+        if self.archived:
+            return filter_form.filter(
+                ArchivedOrder.objects.filter(
+                    store=store, user=self.request.user
+                ).order_by("-created_at")
+            )
 
         qs = super().get_queryset().filter(Q(store=store) & Q(user=self.request.user))
+        # the items are filtered on the same range, so they are read from the
+        # same partitions as their orders
+        items = filter_form.filter_placed(OrderItem.objects.select_related("product"))
+
+        return filter_form.filter(qs).prefetch_related(
+            Prefetch("orderitem_set", queryset=items)
+        )
 
-        return qs
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["archived"] = self.archived
+        context["filter_form"] = self.get_filter_form()
+        if self.archived:
+            items = read_archived_items(context["object_list"])
+            for archived_order in context["object_list"]:
+                archived_order.items = items.get(archived_order.uuid, [])
+        return context
@@ -1 +1,34 @@
 /* Project specific Javascript goes here. */
+
+// Order items on the staff order board are loaded from their up-source the
+// first time the order's panel is expanded.
+up.compiler('[data-order-items]', function (element) {
+  const panel = element.closest('.collapse');
+  const load = () => up.reload(element);
+  if (!panel || panel.classList.contains('show')) {
+    load();
+  } else {
+    panel.addEventListener('show.bs.collapse', load, { once: true });
+    return () => panel.removeEventListener('show.bs.collapse', load);
+  }
+});
+
+// The staff order board follows the order feed of its stores. A changed order
+// on the board is swapped in place, and a placed order is added at the top of
+// its store when the board shows the newest unfiltered orders.
+up.compiler('[data-order-feed]', function (element) {
+  const source = new EventSource(element.dataset.orderFeed);
+  source.addEventListener('order', function (message) {
+    const event = JSON.parse(message.data);
+    const url = element.dataset.orderRow.replace(
+      '00000000-0000-0000-0000-000000000000', event.order_uuid);
+    const row = element.querySelector(`[data-order-uuid="${event.order_uuid}"]`);
+    if (row) {
+      up.render({ target: `#header_table_${row.id}, #accordion_body_${row.id}`, url: url });
+    } else if (event.status === 'placed' && 'addPlacedOrders' in element.dataset &&
+               element.querySelector(`#store_orders_${event.store}`)) {
+      up.render({ target: `#store_orders_${event.store}:before`, url: url });
+    }
+  });
+  return () => source.close();
+});
@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from smplshop.master.models import Store
+from smplshop.shop.models import ORDER_TRANSITIONS, Order
+
+
+class OrderStatusChangeSerializer(serializers.Serializer):
+    order_uuids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=settings.ORDER_STATUS_CHANGE_MAX,
+    )
+    change_status = serializers.ChoiceField(choices=list(ORDER_TRANSITIONS))
+
+
+class ClaimOrdersSerializer(serializers.Serializer):
+    store = serializers.SlugRelatedField(
+        slug_field="code", queryset=Store.objects.all(), required=False
+    )
+    count = serializers.IntegerField(
+        min_value=1, max_value=100, default=settings.FULFILMENT_BATCH_SIZE
+    )
+
+
+class ClaimedOrderSerializer(serializers.ModelSerializer):
+    store = serializers.SlugRelatedField(slug_field="code", read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ["uuid", "store", "status", "claimed_until"]
@@ -0,0 +1,64 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from smplshop.shop.models import Order
+
+from .serializers import (
+    ClaimedOrderSerializer,
+    ClaimOrdersSerializer,
+    OrderStatusChangeSerializer,
+)
+
+
+class OrderViewSet(GenericViewSet):
+    # changing and claiming orders is store staff work
+    permission_classes = [IsAdminUser]
+    serializer_class = OrderStatusChangeSerializer
+    queryset = Order.objects.all()
+
+    @action(detail=False, methods=["post"])
+    def status(self, request):
+        """Make one status change on many orders, reporting which ones moved."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_uuids = list(dict.fromkeys(serializer.validated_data["order_uuids"]))
+
+        moved = set(
+            self.get_queryset()
+            .filter(uuid__in=order_uuids)
+            .transition(serializer.validated_data["change_status"])
+        )
+        return Response(
+            status=status.HTTP_200_OK,
+            data={
+                "moved": [
+                    order_uuid for order_uuid in order_uuids if order_uuid in moved
+                ],
+                "rejected": [
+                    order_uuid for order_uuid in order_uuids if order_uuid not in moved
+                ],
+            },
+        )
+
+    @action(detail=False, methods=["post"], serializer_class=ClaimOrdersSerializer)
+    def claim(self, request):
+        """Lease the next orders waiting to be packed to the requesting user."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        orders = self.get_queryset()
+        if "store" in serializer.validated_data:
+            orders = orders.filter(store=serializer.validated_data["store"])
+        claimed = orders.claim(request.user, serializer.validated_data["count"])
+        return Response(
+            status=status.HTTP_200_OK,
+            data=ClaimedOrderSerializer(claimed, many=True).data,
+        )
+
+    @action(detail=False, methods=["post"])
+    def release(self, request):
+        """Give back every order the requesting user has claimed."""
+        released = self.get_queryset().release(request.user)
+        return Response(status=status.HTTP_200_OK, data={"released": released})
@@ -0,0 +1,91 @@
+import csv
+import json
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import QuerySet
+
+from smplshop.shop.models import Order, OrderItem
+
+# exported column by the lookup it is read from
+ORDER_COLUMNS = {
+    "uuid": "uuid",
+    "store": "store__code",
+    "user": "user__username",
+    "status": "status",
+    "total_order_price": "total_order_price",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+ORDER_ITEM_COLUMNS = {
+    "order_uuid": "order__uuid",
+    "store": "order__store__code",
+    "product": "product__code",
+    "product_name": "product__name",
+    "price": "price",
+    "quantity": "quantity",
+}
+
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class Echo:
+    """A file for csv.writer that hands back each line instead of keeping it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(columns: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value for value in row
+        )
+
+
+def ndjson_lines(columns: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+EXPORT_WRITERS = {"csv": csv_lines, "ndjson": ndjson_lines}
+
+
+def export_orders(
+    orders: QuerySet[Order], items: bool, export_format: str
+) -> Iterator[str]:
+    """
+    The orders, or the items of the orders, as CSV or NDJSON text in chunks of
+    EXPORT_CHUNK_SIZE rows. Rows are read through a server-side cursor as the
+    chunks are taken, so memory stays the same however many rows there are.
+    """
+    if items:
+        columns = ORDER_ITEM_COLUMNS
+        queryset = OrderItem.objects.filter(order__in=orders.order_by()).order_by("id")
+    else:
+        columns = ORDER_COLUMNS
+        queryset = orders
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    # inside a transaction the cursor reads rows as they are asked for, outside
+    # one it is declared WITH HOLD and the server builds every row at once
+    with transaction.atomic(using=queryset.db):
+        lines = EXPORT_WRITERS[export_format](
+            list(columns),
+            queryset.values_list(*columns.values()).iterator(chunk_size=chunk_size),
+        )
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
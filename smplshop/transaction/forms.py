@@ -0,0 +1,151 @@
+from datetime import timedelta
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from smplshop.master.models import Store
+from smplshop.shop.forms import OrderTotalFilterForm, PlacedDateRangeForm
+from smplshop.shop.models import ORDER_TRANSITIONS, Order
+
+from .exports import EXPORT_WRITERS
+
+
+class OrderFilterForm(OrderTotalFilterForm):
+    field_order = [
+        "store",
+        "status",
+        "date_from",
+        "date_to",
+        "total_min",
+        "total_max",
+        "mine",
+        "sort",
+    ]
+
+    store = forms.ModelChoiceField(
+        queryset=Store.objects.all(),
+        to_field_name="code",
+        required=False,
+        label=_("Store"),
+    )
+    status = forms.ChoiceField(
+        choices=[("", "---------")] + Order.ORDER_STATUS_CHOICES,
+        required=False,
+        label=_("Status"),
+    )
+    mine = forms.BooleanField(required=False, label=_("Claimed By Me"))
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+    def filter(self, qs):
+        qs = self.filter_totals(qs)
+        if not self.is_valid():
+            return qs
+
+        if self.cleaned_data["store"]:
+            qs = qs.filter(store=self.cleaned_data["store"])
+        if self.cleaned_data["status"]:
+            qs = qs.filter(status=self.cleaned_data["status"])
+        if self.cleaned_data["mine"]:
+            qs = qs.filter(claimed_by=self.user, claimed_until__gte=timezone.now())
+        # the board groups the orders by store, so they are sorted within it
+        if self.cleaned_data["sort"]:
+            qs = qs.order_by("store_id", self.cleaned_data["sort"], "-created_at")
+
+        return qs
+
+
+class OrderExportForm(OrderFilterForm):
+    items = forms.BooleanField(required=False, label=_("Order Items"))
+    format = forms.ChoiceField(
+        choices=[
+            (export_format, export_format.upper()) for export_format in EXPORT_WRITERS
+        ],
+        label=_("Format"),
+    )
+
+
+class SalesReportForm(PlacedDateRangeForm):
+    DEFAULT_DAYS = 30
+
+    field_order = ["store", "date_from", "date_to"]
+
+    store = forms.ModelChoiceField(
+        queryset=Store.objects.all(),
+        to_field_name="code",
+        required=False,
+        label=_("Store"),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # the last DEFAULT_DAYS days unless told otherwise
+        if not cleaned_data.get("date_to", None):
+            cleaned_data["date_to"] = timezone.localdate()
+        if not cleaned_data.get("date_from", None):
+            cleaned_data["date_from"] = cleaned_data["date_to"] - timedelta(
+                days=self.DEFAULT_DAYS - 1
+            )
+        return cleaned_data
+
+    def filter(self, qs):
+        qs = qs.filter(
+            day__gte=self.cleaned_data["date_from"],
+            day__lte=self.cleaned_data["date_to"],
+        )
+        if self.cleaned_data["store"]:
+            qs = qs.filter(store=self.cleaned_data["store"])
+        return qs
+
+
+class UUIDListField(forms.Field):
+    """A list of uuids sent as repeated values of one name."""
+
+    widget = forms.MultipleHiddenInput
+
+    def __init__(self, *, max_length: int, **kwargs):
+        self.max_length = max_length
+        super().__init__(**kwargs)
+
+    def to_python(self, value) -> list:
+        if not value:
+            return []
+        if len(value) > self.max_length:
+            raise ValidationError(
+                _("At most %(max)s orders can be changed at once"),
+                params={"max": self.max_length},
+            )
+        # without repeats, but in the order they were sent
+        return list(dict.fromkeys(forms.UUIDField().clean(item) for item in value))
+
+
+class OrderStatusChangeForm(forms.Form):
+    order_uuid = UUIDListField(
+        max_length=settings.ORDER_STATUS_CHANGE_MAX,
+        label=_("Orders"),
+        error_messages={"required": _("Select the orders to change")},
+    )
+    change_status = forms.ChoiceField(
+        choices=[(change, change.capitalize()) for change in ORDER_TRANSITIONS],
+        label=_("Change Selected"),
+    )
+
+
+class ClaimOrdersForm(forms.Form):
+    store = forms.ModelChoiceField(
+        queryset=Store.objects.all(),
+        to_field_name="code",
+        required=False,
+        label=_("Store"),
+    )
+    count = forms.IntegerField(
+        min_value=1,
+        max_value=100,
+        initial=settings.FULFILMENT_BATCH_SIZE,
+        label=_("Orders"),
+    )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from smplshop.shop.models import Order
+from smplshop.transaction.exports import EXPORT_WRITERS, export_orders
+from smplshop.transaction.forms import OrderExportForm
+
+
+class Command(BaseCommand):
+    help = "Write orders or their items as CSV or NDJSON, a chunk of rows at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--store", help="code of the store to export")
+        parser.add_argument("--status", help="status of the orders to export")
+        parser.add_argument("--date-from", help="first day placed, YYYY-MM-DD")
+        parser.add_argument("--date-to", help="last day placed, YYYY-MM-DD")
+        parser.add_argument(
+            "--items", action="store_true", help="export order items, not orders"
+        )
+        parser.add_argument("--format", choices=list(EXPORT_WRITERS), default="csv")
+        parser.add_argument(
+            "--output", help="file to write, standard output if not given"
+        )
+
+    def handle(self, *args, **options):
+        form = OrderExportForm(
+            {
+                "store": options["store"],
+                "status": options["status"],
+                "date_from": options["date_from"],
+                "date_to": options["date_to"],
+                "items": options["items"],
+                "format": options["format"],
+            }
+        )
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        chunks = export_orders(
+            form.filter(Order.objects.all()),
+            form.cleaned_data["items"],
+            form.cleaned_data["format"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
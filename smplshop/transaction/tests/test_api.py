@@ -0,0 +1,120 @@
+import uuid
+
+from django.test import TestCase
+from django.urls import resolve, reverse
+from rest_framework.test import APIClient
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import StoreFactory
+from smplshop.shop.models import Order
+from smplshop.shop.tests.factory import OrderFactory
+from smplshop.users.tests.factory import UserFactory
+
+
+class TestOrderStatusAPI(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        fake.unique.clear()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.store1 = StoreFactory.create()
+        self.accepted = OrderFactory.create_batch(
+            3, store=self.store1, status="accepted"
+        )
+        self.placed = OrderFactory.create(store=self.store1)
+
+    def test_url(self):
+        self.assertEqual(reverse("api:order-status"), "/api/orders/status/")
+        self.assertEqual(resolve("/api/orders/status/").view_name, "api:order-status")
+
+    def test_reports_moved_and_rejected(self):
+        unknown = uuid.uuid4()
+        response = self.client.post(
+            "/api/orders/status/",
+            {
+                "order_uuids": [str(order.uuid) for order in self.accepted]
+                + [str(self.placed.uuid), str(unknown)],
+                "change_status": "ship",
+            },
+            format="json",
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            response.data,
+            {
+                "moved": [order.uuid for order in self.accepted],
+                "rejected": [self.placed.uuid, unknown],
+            },
+        )
+        self.assertEqual(Order.objects.filter(status="shipped").count(), 3)
+
+    def test_invalid_change(self):
+        response = self.client.post(
+            "/api/orders/status/",
+            {"order_uuids": [str(self.placed.uuid)], "change_status": "place"},
+            format="json",
+        )
+        self.assertEqual(400, response.status_code)
+
+    def test_login_required(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(
+            "/api/orders/status/",
+            {"order_uuids": [str(self.placed.uuid)], "change_status": "accept"},
+            format="json",
+        )
+        self.assertEqual(403, response.status_code)
+
+    def test_staff_required(self):
+        self.client.force_authenticate(UserFactory.create())
+        response = self.client.post(
+            "/api/orders/status/",
+            {"order_uuids": [str(self.placed.uuid)], "change_status": "accept"},
+            format="json",
+        )
+        self.assertEqual(403, response.status_code)
+        self.assertEqual(Order.objects.get(pk=self.placed.pk).status, "placed")
+
+
+class TestOrderClaimAPI(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        fake.unique.clear()
+        self.client = APIClient()
+        self.user = UserFactory.create(is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.store1orders = OrderFactory.create_batch(3, store=self.store1)
+        self.store2order = OrderFactory.create(store=self.store2)
+
+    def test_claim_from_store(self):
+        response = self.client.post(
+            "/api/orders/claim/", {"store": self.store1.code, "count": 2}, format="json"
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            [order["uuid"] for order in response.data],
+            [str(order.uuid) for order in self.store1orders[:2]],
+        )
+        self.assertEqual(
+            set(Order.objects.filter(claimed_by=self.user)),
+            set(self.store1orders[:2]),
+        )
+
+    def test_invalid_count(self):
+        response = self.client.post("/api/orders/claim/", {"count": 0}, format="json")
+        self.assertEqual(400, response.status_code)
+
+    def test_release(self):
+        self.client.post("/api/orders/claim/", {}, format="json")
+        response = self.client.post("/api/orders/release/", format="json")
+        self.assertEqual(response.data, {"released": 4})
+        self.assertFalse(Order.objects.filter(claimed_by=self.user).exists())
+
+    def test_staff_required(self):
+        self.client.force_authenticate(UserFactory.create())
+        response = self.client.post("/api/orders/claim/", {}, format="json")
+        self.assertEqual(403, response.status_code)
+        self.assertFalse(Order.objects.filter(claimed_by__isnull=False).exists())
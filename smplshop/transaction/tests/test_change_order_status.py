@@ -2,12 +2,15 @@ import urllib
 import uuid
 
 from django.contrib.messages import get_messages
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
 
 from smplshop.functional_test.faker import fake
 from smplshop.master.tests.factory import StoreFactory
-from smplshop.shop.tests.factory import OrderFactory
+from smplshop.shop.models import Order
+from smplshop.shop.tests.factory import OrderFactory, OrderItemFactory
 from smplshop.users.tests.factory import UserFactory
 
 
@@ -614,3 +617,142 @@ class TestPositiveNegativeCasesForClosed(TestCase):
             str(messages[0]),
             "{}{}{}".format("Order ", self.order1.uuid, " cannot be closed"),
         )
+
+
+class TestFragmentForUpTarget(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fake.unique.clear()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.order1 = OrderFactory.create(store=self.store1)
+        self.others = OrderFactory.create_batch(5, store=self.store1)
+
+    def change_status(self, change_status):
+        return self.client.get(
+            "{}{}{}{}".format(
+                "/transaction/order/status/?order_uuid=",
+                self.order1.uuid,
+                "&change_status=",
+                change_status,
+            ),
+            HTTP_X_UP_TARGET="#header_table_{0}, #accordion_body_{0}".format(
+                self.order1.pk
+            ),
+        )
+
+    def test_renders_only_the_order(self):
+        response = self.change_status("accept")
+        self.assertEqual(200, response.status_code)
+        self.assertTemplateUsed(response, "transaction/order_fragment.html")
+        self.assertContains(response, 'id="header_table_%s"' % self.order1.pk)
+        self.assertContains(response, 'id="accordion_body_%s"' % self.order1.pk)
+        self.assertContains(response, "Order Accepted")
+        self.assertContains(response, 'id="ship"')
+        self.assertNotContains(response, 'id="accept"')
+        for order in self.others:
+            self.assertNotContains(response, str(order.uuid))
+        # the message goes out with the fragment, not with the next page
+        self.assertContains(
+            response,
+            "{}{}{}".format(
+                "Status of order ", self.order1.uuid, " updated to accepted"
+            ),
+        )
+        response = self.client.get("/transaction/orders/")
+        self.assertNotContains(response, "updated to accepted")
+
+    def test_items_only_read_for_the_fragment(self):
+        item = OrderItemFactory.create(order=self.order1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.change_status("accept")
+        self.assertContains(response, item.product.name)
+        self.assertTrue(
+            [query for query in queries if '"shop_orderitem"' in query["sql"]]
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "{}{}{}".format(
+                    "/transaction/order/status/?order_uuid=",
+                    self.order1.uuid,
+                    "&change_status=ship",
+                )
+            )
+        self.assertEqual(302, response.status_code)
+        self.assertFalse(
+            [query for query in queries if '"shop_orderitem"' in query["sql"]]
+        )
+
+    def test_renders_error(self):
+        response = self.change_status("ship")
+        self.assertEqual(200, response.status_code)
+        self.assertContains(
+            response, "{}{}{}".format("Order ", self.order1.uuid, " cannot be shipped")
+        )
+        self.assertContains(response, 'id="accept"')
+
+
+class TestBulkStatusChange(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fake.unique.clear()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.placed = OrderFactory.create_batch(4, store=self.store1)
+        self.closed = OrderFactory.create(store=self.store1, status="closed")
+
+    def test_url_to_view(self):
+        resolver = resolve("/transaction/orders/status/")
+        self.assertEqual(
+            resolver.view_name, "smplshop.transaction:change_order_statuses"
+        )
+
+    def test_changes_selected_orders(self):
+        response = self.client.post(
+            "/transaction/orders/status/",
+            {
+                "order_uuid": [str(order.uuid) for order in self.placed]
+                + [str(self.closed.uuid)],
+                "change_status": "accept",
+                "query": "status=placed",
+            },
+        )
+        self.assertRedirects(response, "/transaction/orders/?status=placed")
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertEqual(
+            messages,
+            [
+                "4 orders updated to accepted",
+                "{}{}{}".format("Orders ", self.closed.uuid, " cannot be accepted"),
+            ],
+        )
+        self.assertEqual(
+            Order.objects.filter(store=self.store1, status="accepted").count(), 4
+        )
+
+    def test_nothing_selected(self):
+        response = self.client.post(
+            "/transaction/orders/status/", {"change_status": "accept"}
+        )
+        self.assertRedirects(response, "/transaction/orders/")
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, ["Select the orders to change"])
+
+    def test_get_not_allowed(self):
+        response = self.client.get("/transaction/orders/status/")
+        self.assertEqual(405, response.status_code)
@@ -0,0 +1,76 @@
+from django.contrib.messages import get_messages
+from django.test import Client, TestCase
+from django.urls import resolve
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import StoreFactory
+from smplshop.shop.models import Order
+from smplshop.shop.tests.factory import OrderFactory
+from smplshop.users.tests.factory import UserFactory
+
+
+class TestClaimOrders(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fake.unique.clear()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.store1orders = OrderFactory.create_batch(3, store=self.store1)
+        self.store2orders = OrderFactory.create_batch(2, store=self.store2)
+
+    def test_url_to_view(self):
+        resolver = resolve("/transaction/orders/claim/")
+        self.assertEqual(resolver.view_name, "smplshop.transaction:claim_orders")
+
+    def test_claim_and_filter_mine(self):
+        response = self.client.post(
+            "/transaction/orders/claim/", {"store": self.store1.code, "count": 2}
+        )
+        self.assertRedirects(response, "/transaction/orders/?mine=on")
+        self.assertEqual(
+            str(list(get_messages(response.wsgi_request))[0]), "2 orders claimed"
+        )
+
+        response = self.client.get("/transaction/orders/?mine=on")
+        self.assertEqual(
+            list(response.context["object_list"]),
+            list(Order.objects.filter(pk__in=[o.pk for o in self.store1orders[:2]])),
+        )
+        self.assertContains(
+            response, '<td id="claimant">{}</td>'.format(self.user), count=2
+        )
+
+    def test_nothing_to_claim(self):
+        Order.objects.update(status="shipped")
+        response = self.client.post("/transaction/orders/claim/", {"count": 2})
+        self.assertEqual(
+            str(list(get_messages(response.wsgi_request))[0]),
+            "No orders are waiting to be claimed",
+        )
+
+    def test_invalid_count(self):
+        response = self.client.post("/transaction/orders/claim/", {"count": 1000})
+        self.assertRedirects(response, "/transaction/orders/")
+        self.assertFalse(Order.objects.filter(claimed_by=self.user).exists())
+
+    def test_release(self):
+        self.client.post("/transaction/orders/claim/", {"count": 10})
+        response = self.client.post("/transaction/orders/release/")
+        self.assertEqual(
+            str(list(get_messages(response.wsgi_request))[-1]), "5 orders released"
+        )
+        self.assertFalse(Order.objects.filter(claimed_by=self.user).exists())
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.post("/transaction/orders/claim/", {"count": 2})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Order.objects.exclude(claimed_by=None).exists())
@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import StoreFactory
+from smplshop.shop.models import Order
+from smplshop.shop.tests.factory import OrderFactory, OrderItemFactory
+from smplshop.users.tests.factory import UserFactory
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class TestExportOrders(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fake.unique.clear()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.store1orders = OrderFactory.create_batch(5, store=self.store1)
+        self.store2order = OrderFactory.create(store=self.store2)
+        for order in self.store1orders[:2] + [self.store2order]:
+            OrderItemFactory.create_batch(2, order=order)
+        Order.objects.filter(pk=self.store1orders[4].pk).update(
+            created_at=timezone.now() - timedelta(days=40)
+        )
+
+    def test_url_to_view(self):
+        resolver = resolve("/transaction/orders/export/")
+        self.assertEqual(resolver.view_name, "smplshop.transaction:export_orders")
+
+    def test_csv_of_store_and_dates(self):
+        response = self.client.get(
+            "/transaction/orders/export/",
+            {
+                "store": self.store1.code,
+                "date_from": (timezone.now() - timedelta(days=7)).date(),
+                "format": "csv",
+            },
+        )
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="orders.csv"', response["Content-Disposition"])
+        chunks = list(response.streaming_content)
+        # a header and four rows in chunks of two lines
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(
+            {row["uuid"] for row in rows},
+            {str(order.uuid) for order in self.store1orders[:4]},
+        )
+        order = Order.objects.get(uuid=rows[0]["uuid"])
+        self.assertEqual(rows[0]["store"], self.store1.code)
+        self.assertEqual(rows[0]["user"], order.user.username)
+        self.assertEqual(rows[0]["created_at"], order.created_at.isoformat())
+
+    def test_ndjson_of_items(self):
+        response = self.client.get(
+            "/transaction/orders/export/",
+            {"store": self.store1.code, "items": "on", "format": "ndjson"},
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(
+            {row["order_uuid"] for row in rows},
+            {str(order.uuid) for order in self.store1orders[:2]},
+        )
+        item = self.store1orders[0].orderitem_set.order_by("id").first()
+        self.assertEqual(
+            rows[0],
+            {
+                "order_uuid": str(self.store1orders[0].uuid),
+                "store": self.store1.code,
+                "product": item.product.code,
+                "product_name": item.product.name,
+                "price": item.price,
+                "quantity": item.quantity,
+            },
+        )
+
+    def test_invalid_format(self):
+        response = self.client.get("/transaction/orders/export/", {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get("/transaction/orders/export/", {"format": "csv"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command(
+            "export_orders",
+            "--store",
+            self.store2.code,
+            "--format",
+            "ndjson",
+            stdout=out,
+        )
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["uuid"] for row in rows], [str(self.store2order.uuid)])
+
+        with self.assertRaises(CommandError):
+            call_command("export_orders", "--date-from", "yesterday", stdout=out)
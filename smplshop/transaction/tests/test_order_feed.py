@@ -0,0 +1,108 @@
+import json
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import resolve
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import StoreFactory
+from smplshop.shop import events as order_events
+from smplshop.shop.models import Order, OrderEvent
+from smplshop.shop.tests.factory import OrderFactory
+from smplshop.shop.tests.utils import redis_available, use_redis
+from smplshop.users.tests.factory import UserFactory
+
+
+def read_events(response) -> list[dict]:
+    stream = b"".join(response.streaming_content).decode()
+    return [
+        json.loads(line.partition("data: ")[2])
+        for line in stream.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+# the feed only sends events once their transaction has committed, which a
+# TestCase never does
+@override_settings(ORDER_FEED_TIMEOUT=0)
+class TestOrderFeed(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = Client()
+
+    def setUp(self) -> None:
+        super().setUp()
+        fake.unique.clear()
+        self.password = fake.password()
+        self.user = UserFactory.create(password=self.password)
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.store1orders = OrderFactory.create_batch(2, store=self.store1)
+        self.store2order = OrderFactory.create(store=self.store2)
+
+    def test_url_to_view(self):
+        resolver = resolve("/transaction/orders/feed/")
+        self.assertEqual(resolver.view_name, "smplshop.transaction:order_feed")
+
+    def test_events_of_watched_stores_after_last_event(self):
+        Order.objects.all().transition("accept")
+        last_event = OrderEvent.objects.latest("id")
+        Order.objects.all().transition("ship")
+
+        response = self.client.get(
+            "/transaction/orders/feed/",
+            {"store": self.store1.code},
+            HTTP_LAST_EVENT_ID="{}-{}".format(last_event.transaction_id, last_event.id),
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = read_events(response)
+        self.assertEqual(
+            {(event["order_uuid"], event["status"]) for event in events},
+            {(str(order.uuid), "shipped") for order in self.store1orders},
+        )
+        self.assertTrue(all(event["id"] > last_event.id for event in events))
+
+    def test_new_board_starts_from_now(self):
+        Order.objects.all().transition("accept")
+        response = self.client.get("/transaction/orders/feed/")
+        self.assertEqual(read_events(response), [])
+
+    @skipUnless(redis_available(), "needs a Redis server at TEST_REDIS_URL")
+    @use_redis("ORDER_FEED_REDIS_URL")
+    @override_settings(ORDER_FEED_TIMEOUT=1, ORDER_FEED_POLL=1)
+    def test_events_relayed_through_redis(self):
+        order_events.get_feed_client.cache_clear()
+        self.addCleanup(order_events.get_feed_client.cache_clear)
+        response = self.client.get("/transaction/orders/feed/")
+        stream = iter(response.streaming_content)
+        # subscribed once the stream has started
+        self.assertTrue(next(stream).startswith(b"retry: "))
+        Order.objects.all().transition("accept")
+        call_command("relay_order_events", "--once")
+        events = read_events(response)
+        # sent from the outbox and from Redis, but only once
+        self.assertEqual(
+            sorted(event["order_uuid"] for event in events),
+            sorted(str(order.uuid) for order in [*self.store1orders, self.store2order]),
+        )
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get("/transaction/orders/feed/")
+        self.assertEqual(response.status_code, 302)
+
+    def test_order_row(self):
+        order = self.store1orders[0]
+        response = self.client.get("{}{}/".format("/transaction/order/", order.uuid))
+        self.assertContains(response, 'id="store_orders_{}"'.format(self.store1.code))
+        self.assertContains(response, 'data-order-uuid="{}"'.format(order.uuid))
+
+    def test_board_adds_placed_orders_unless_filtered(self):
+        response = self.client.get("/transaction/orders/", {"store": self.store1.code})
+        self.assertTrue(response.context["add_placed_orders"])
+        self.assertContains(response, "data-add-placed-orders")
+        response = self.client.get("/transaction/orders/", {"status": "shipped"})
+        self.assertFalse(response.context["add_placed_orders"])
@@ -0,0 +1,85 @@
+import uuid
+
+from django.test import Client, TestCase
+from django.urls import resolve, reverse
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import StoreFactory
+from smplshop.shop.tests.factory import OrderFactory, OrderItemFactory
+from smplshop.users.tests.factories import UserFactory
+
+
+class TestOrderItemsViewAndURL(TestCase):
+    def test_url_to_name(self):
+        resolver = resolve(
+            "{}{}{}".format("/transaction/order/", uuid.uuid4(), "/items/")
+        )
+        self.assertEqual(resolver.view_name, "smplshop.transaction:order_items")
+
+    def test_name_to_url(self):
+        order_uuid = uuid.uuid4()
+        url = reverse(
+            "smplshop.transaction:order_items", kwargs={"order_uuid": order_uuid}
+        )
+        self.assertEqual(
+            url, "{}{}{}".format("/transaction/order/", order_uuid, "/items/")
+        )
+
+
+class TestOrderItems(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fake.unique.clear()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self) -> None:
+        super().setUp()
+        fake.unique.clear()
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.order1 = OrderFactory.create(store=self.store1)
+        self.items = OrderItemFactory.create_batch(3, order=self.order1)
+        self.url = reverse(
+            "smplshop.transaction:order_items", kwargs={"order_uuid": self.order1.uuid}
+        )
+
+    def test_order_list_does_not_render_items(self):
+        response = self.client.get("/transaction/orders/")
+        self.assertContains(response, 'id="order_items_%s"' % self.order1.pk)
+        self.assertContains(response, self.url)
+        for item in self.items:
+            self.assertNotContains(response, item.product.name)
+
+    def test_items(self):
+        response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertContains(response, 'id="order_items_%s"' % self.order1.pk)
+        for item in self.items:
+            self.assertContains(response, item.product.name)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_not_modified_until_order_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+        self.order1.accept_order()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response["ETag"])
+
+    def test_unknown_order(self):
+        response = self.client.get(
+            reverse(
+                "smplshop.transaction:order_items", kwargs={"order_uuid": uuid.uuid4()}
+            )
+        )
+        self.assertEqual(404, response.status_code)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(302, response.status_code)
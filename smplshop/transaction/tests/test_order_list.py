@@ -1,10 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
+from django.utils import timezone
 
 from smplshop.functional_test.faker import fake
-from smplshop.master.models import Store
 from smplshop.master.tests.factory import StoreFactory
-from smplshop.shop.tests.factory import OrderFactory
+from smplshop.shop.models import Order
+from smplshop.shop.tests.factory import OrderFactory, OrderItemFactory
 from smplshop.users.tests.factories import UserFactory
 
 
@@ -59,13 +65,73 @@ class TestQueryset(TestCase):
         super().setUp()
         fake.unique.clear()
         self.client.login(username=self.user.username, password=self.password)
-        store1 = StoreFactory.create()
-        store2 = StoreFactory.create()
-        store3 = StoreFactory.create()
-        OrderFactory.create_batch(20, store=store1)
-        OrderFactory.create_batch(5, store=store2)
-        OrderFactory.create_batch(10, store=store3)
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.store3 = StoreFactory.create()
+        OrderFactory.create_batch(20, store=self.store1)
+        OrderFactory.create_batch(5, store=self.store2)
+        OrderFactory.create_batch(10, store=self.store3, status="accepted")
 
     def test_queryset(self):
         response = self.client.get("/transaction/orders/")
-        self.assertQuerysetEqual(Store.objects.all(), response.context["object_list"])
+        self.assertQuerysetEqual(
+            Order.objects.all()[: settings.ITEMS_PER_PAGE],
+            response.context["object_list"],
+        )
+        self.assertEqual(35, response.context["paginator"].count)
+
+    def test_queryset_for_store(self):
+        response = self.client.get("/transaction/orders/?store=" + self.store2.code)
+        self.assertQuerysetEqual(
+            Order.objects.filter(store=self.store2), response.context["object_list"]
+        )
+
+    def test_queryset_for_status(self):
+        response = self.client.get("/transaction/orders/?status=accepted")
+        self.assertEqual(10, response.context["paginator"].count)
+        for order in response.context["object_list"]:
+            self.assertEqual(order.store, self.store3)
+
+    def test_queryset_for_dates(self):
+        order = Order.objects.filter(store=self.store1).first()
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        day = timezone.localdate() - timedelta(days=10)
+
+        response = self.client.get(
+            "/transaction/orders/?date_from={}&date_to={}".format(day, day)
+        )
+        self.assertQuerysetEqual(
+            Order.objects.filter(pk=order.pk), response.context["object_list"]
+        )
+
+        response = self.client.get(
+            "/transaction/orders/?date_from={}".format(day + timedelta(days=1))
+        )
+        self.assertEqual(34, response.context["paginator"].count)
+
+    def test_queryset_for_totals(self):
+        orders = list(Order.objects.filter(store=self.store2))
+        for order, total in zip(orders, [5, 50, 500, 20, 80]):
+            Order.objects.filter(pk=order.pk).update(total_order_price=total)
+
+        response = self.client.get(
+            "/transaction/orders/?store={}&total_min=20&total_max=80&sort=-total_order_price".format(
+                self.store2.code
+            )
+        )
+        self.assertEqual(
+            [order.total_order_price for order in response.context["object_list"]],
+            [80, 50, 20],
+        )
+
+    def test_query_count_does_not_grow_with_orders(self):
+        for order in Order.objects.all():
+            OrderItemFactory.create_batch(3, order=order)
+
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get("/transaction/orders/?store=" + self.store2.code)
+        with CaptureQueriesContext(connection) as full_page:
+            self.client.get("/transaction/orders/?store=" + self.store1.code)
+        self.assertEqual(len(small_page), len(full_page))
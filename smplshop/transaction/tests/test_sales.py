@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from smplshop.functional_test.faker import fake
+from smplshop.master.tests.factory import ProductFactory, StoreFactory
+from smplshop.shop.models import Order
+from smplshop.shop.sales import rebuild_sales
+from smplshop.shop.tests.factory import OrderFactory, OrderItemFactory
+from smplshop.users.tests.factory import UserFactory
+
+
+class TestSalesReport(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        fake.unique.clear()
+        cls.client = Client()
+        cls.password = fake.password()
+        cls.user = UserFactory.create(password=cls.password)
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client.login(username=self.user.username, password=self.password)
+        self.store1 = StoreFactory.create()
+        self.store2 = StoreFactory.create()
+        self.product = ProductFactory.create()
+        for store in [self.store1, self.store1, self.store2]:
+            OrderItemFactory.create(
+                order=OrderFactory.create(store=store),
+                product=self.product,
+                price=10,
+                quantity=3,
+            )
+        Order.objects.filter(store=self.store1)[:1].get().cancel_order()
+        rebuild_sales(timezone.localdate(), [self.store1.pk, self.store2.pk])
+
+    def test_url_to_view(self):
+        resolver = resolve("/transaction/sales/")
+        self.assertEqual(resolver.view_name, "smplshop.transaction:sales")
+
+    def test_reads_rollups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/transaction/sales/", {"store": self.store1.code}
+            )
+        # the orders themselves are never read
+        self.assertFalse(
+            [
+                query
+                for query in queries.captured_queries
+                if '"shop_order' in query["sql"]
+            ]
+        )
+        (day,) = response.context["days"]
+        self.assertEqual(day["day"], timezone.localdate())
+        self.assertEqual(day["orders"], [1, 0, 0, 0, 0, 1])
+        self.assertEqual(day["revenue"], 30)
+        self.assertEqual(
+            list(response.context["products"]),
+            [
+                {
+                    "product__name": self.product.name,
+                    "units": 3,
+                    "revenue": 30,
+                    "orders": 1,
+                }
+            ],
+        )
+
+    def test_all_stores(self):
+        response = self.client.get("/transaction/sales/")
+        self.assertEqual(response.context["days"][0]["orders"], [2, 0, 0, 0, 0, 1])
+
+    def test_invalid_dates(self):
+        response = self.client.get("/transaction/sales/", {"date_from": "someday"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("days", response.context)
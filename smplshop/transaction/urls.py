@@ -1,9 +1,28 @@
 from django.urls import path
 
-from smplshop.transaction.views import StoreOrderListView, change_order_status
+from smplshop.transaction.views import (
+    StoreOrderListView,
+    change_order_status,
+    change_order_statuses,
+    claim_orders,
+    export_orders,
+    order_feed,
+    order_items,
+    order_row,
+    release_orders,
+    sales,
+)
 
 app_name = "smplshop.transaction"
 urlpatterns = [
     path("orders/", view=StoreOrderListView.as_view(), name="orders"),
     path("order/status/", view=change_order_status, name="change_order_status"),
+    path("orders/status/", view=change_order_statuses, name="change_order_statuses"),
+    path("orders/claim/", view=claim_orders, name="claim_orders"),
+    path("orders/release/", view=release_orders, name="release_orders"),
+    path("orders/export/", view=export_orders, name="export_orders"),
+    path("orders/feed/", view=order_feed, name="order_feed"),
+    path("order/<uuid:order_uuid>/", view=order_row, name="order_row"),
+    path("order/<uuid:order_uuid>/items/", view=order_items, name="order_items"),
+    path("sales/", view=sales, name="sales"),
 ]
@@ -1,28 +1,111 @@
-from typing import Any
+import json
+import time
+import uuid
+from datetime import date
+from typing import Any, Iterator, Optional
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ValidationError
-from django.db.models import QuerySet
-from django.http import HttpRequest
-from django.shortcuts import get_object_or_404, redirect
+from django.db import connection, transaction
+from django.db.models import QuerySet, Sum, prefetch_related_objects
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.views.generic import ListView
 
 from smplshop.master.models import Store
-from smplshop.shop.models import Order
+from smplshop.shop.counters import open_order_counts
+from smplshop.shop.events import FEED_CHANNEL, get_feed_client
+from smplshop.shop.models import (
+    ORDER_TRANSITIONS,
+    DailyProductSales,
+    DailySales,
+    Order,
+    OrderEvent,
+)
+
+from . import exports
+from .forms import (
+    ClaimOrdersForm,
+    OrderExportForm,
+    OrderFilterForm,
+    OrderStatusChangeForm,
+    SalesReportForm,
+)
 
 
 class StoreOrderListView(LoginRequiredMixin, ListView):
-    model = Store
+    model = Order
     template_name: str = "transaction/orders.html"
+    paginate_by: int = settings.ITEMS_PER_PAGE
+
+    def get_filter_form(self) -> OrderFilterForm:
+        if not hasattr(self, "filter_form"):
+            self.filter_form = OrderFilterForm(
+                self.request.GET or None, user=self.request.user
+            )
+        return self.filter_form
 
     def get_queryset(self) -> QuerySet[Any]:
 
-        qs = super().get_queryset().prefetch_related("order_set")
+        qs = super().get_queryset().select_related("store", "user", "claimed_by")
+
+        return self.get_filter_form().filter(qs)
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["filter_form"] = self.get_filter_form()
+        # the open orders of the stores on the page, for their headings
+        counts = open_order_counts({order.store_id for order in context["object_list"]})
+        for order in context["object_list"]:
+            order.store.open_counts = counts.get(order.store_id, {})
+        context["status_form"] = OrderStatusChangeForm()
+        context["claim_form"] = ClaimOrdersForm(
+            initial={"store": self.request.GET.get("store", None)}
+        )
+        # orders placed while the board is open belong at the top of the first
+        # page, unless a filter other than the store would hide them
+        context["add_placed_orders"] = not context["page_obj"].has_previous() and {
+            key for key, value in self.request.GET.items() if value
+        } <= {"store", "page"}
+        return context
+
+
+def order_items_etag(request: HttpRequest, order_uuid: uuid.UUID) -> Optional[str]:
+    # the items and their total only change together with updated_at
+    updated_at = (
+        Order.objects.filter(uuid=order_uuid)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+    if updated_at is None:
+        return None
+    return "{}-{}".format(order_uuid, updated_at.timestamp())
+
 
-        return qs
+@login_required
+@cache_control(private=True, max_age=settings.ORDER_ITEMS_MAX_AGE)
+@condition(etag_func=order_items_etag)
+def order_items(request: HttpRequest, order_uuid: uuid.UUID) -> HttpResponse:
+    """
+    The items of one order for its panel on the order board. The board asks
+    for them with the order's updated_at in the query string, so a cached copy
+    is only reused while the order is unchanged.
+    """
+    order = get_object_or_404(
+        Order.objects.prefetch_related("orderitem_set__product"), uuid=order_uuid
+    )
+    return render(request, "transaction/__order_items.html", {"item": order})
 
 
 @login_required
@@ -33,54 +116,284 @@ def change_order_status(request: HttpRequest):
         messages.error(request, "Order id and change_status has to be filled")
         return redirect(reverse("smplshop.transaction:orders"))
 
-    order = get_object_or_404(Order, uuid=order_uuid)
-
-    try:
-        if status_change == "accept":
-            order.accept_order()
-            messages.success(
-                request,
-                "{}{}{}".format("Status of order ", order_uuid, " updated to accepted"),
-            )
+    order = get_object_or_404(Order.objects.select_related("user"), uuid=order_uuid)
 
-        elif status_change == "ship":
-            order.ship_order()
-            messages.success(
-                request,
-                "{}{}{}".format("Status of order ", order_uuid, " updated to shipped"),
-            )
-
-        elif status_change == "deliver":
-            order.deliver_order()
+    if status_change in ORDER_TRANSITIONS:
+        try:
+            order.change_status(status_change)
             messages.success(
                 request,
                 "{}{}{}".format(
-                    "Status of order ", order_uuid, " updated to delivered"
+                    "Status of order ",
+                    order_uuid,
+                    " updated to " + ORDER_TRANSITIONS[status_change].to_status,
                 ),
             )
+        except ValidationError as e:
+            messages.error(request, e.args[0])
+    else:
+        messages.error(
+            request,
+            "{}{}{}".format("Status ", status_change, " is not an allowed value"),
+        )
 
-        elif status_change == "close":
-            order.close_order()
-            messages.success(
-                request,
-                "{}{}{}".format("Status of order ", order_uuid, " updated to closed"),
-            )
+    # an Unpoly request only keeps the targeted parts of this order, so render
+    # those instead of the whole board
+    if "X-Up-Target" in request.headers:
+        # the items are only shown in the fragment, a redirect never needs them
+        prefetch_related_objects([order], "orderitem_set__product")
+        return render(request, "transaction/order_fragment.html", {"order": order})
 
-        elif status_change == "cancel":
-            order.cancel_order()
-            messages.success(
-                request,
-                "{}{}{}".format(
-                    "Status of order ", order_uuid, " updated to cancelled"
-                ),
-            )
+    return redirect(reverse("smplshop.transaction:orders"))
 
-        else:
-            messages.error(
-                request,
-                "{}{}{}".format("Status ", status_change, " is not an allowed value"),
-            )
-    except ValidationError as e:
-        messages.error(request, e.args[0])
 
+@login_required
+@require_POST
+def change_order_statuses(request: HttpRequest):
+    """Make one status change on many orders of the board at once."""
+    url = reverse("smplshop.transaction:orders")
+    # back to the page of the board the change was made from
+    if request.POST.get("query", ""):
+        url += "?" + request.POST["query"]
+
+    form = OrderStatusChangeForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect(url)
+
+    order_uuids = form.cleaned_data["order_uuid"]
+    change = form.cleaned_data["change_status"]
+    to_status = ORDER_TRANSITIONS[change].to_status
+    moved = set(Order.objects.filter(uuid__in=order_uuids).transition(change))
+    rejected = [order_uuid for order_uuid in order_uuids if order_uuid not in moved]
+
+    if moved:
+        messages.success(
+            request, "{}{}{}".format(len(moved), " orders updated to ", to_status)
+        )
+    if rejected:
+        messages.error(
+            request,
+            "{}{}{}".format(
+                "Orders ",
+                ", ".join(str(order_uuid) for order_uuid in rejected),
+                " cannot be " + to_status,
+            ),
+        )
+    return redirect(url)
+
+
+@login_required
+@require_POST
+def claim_orders(request: HttpRequest):
+    """
+    Hand the user the oldest orders waiting to be packed that nobody else holds,
+    each for FULFILMENT_LEASE seconds.
+    """
+    form = ClaimOrdersForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect(reverse("smplshop.transaction:orders"))
+
+    orders = Order.objects.all()
+    if form.cleaned_data["store"] is not None:
+        orders = orders.filter(store=form.cleaned_data["store"])
+    claimed = orders.claim(request.user, form.cleaned_data["count"])
+    if claimed:
+        messages.success(request, "{}{}".format(len(claimed), " orders claimed"))
+    else:
+        messages.info(request, "No orders are waiting to be claimed")
+    return redirect(reverse("smplshop.transaction:orders") + "?mine=on")
+
+
+@login_required
+@require_POST
+def release_orders(request: HttpRequest):
+    released = Order.objects.release(request.user)
+    messages.success(request, "{}{}".format(released, " orders released"))
     return redirect(reverse("smplshop.transaction:orders"))
+
+
+def format_order_event(transaction_id: int, event: dict) -> str:
+    return "id: {}-{}\nevent: order\ndata: {}\n\n".format(
+        transaction_id, event["id"], json.dumps(event)
+    )
+
+
+def order_event_stream(
+    stores: QuerySet[Store], last_event: Optional[tuple[int, int]]
+) -> Iterator[str]:
+    """
+    Server-sent events of the order events of stores after last_event, the
+    (transaction id, event id) position of the last event the browser saw.
+
+    The events missed since are read from the outbox once, and the rest come
+    from relay_order_events through Redis, so an open board holds no database
+    connection. Without Redis the outbox is read every ORDER_FEED_POLL seconds.
+    The stream ends after ORDER_FEED_TIMEOUT seconds so a worker is not held
+    forever, and the browser reconnects from the last event it saw.
+    """
+    events = OrderEvent.objects.filter(store__in=stores)
+    store_codes = set(stores.values_list("code", flat=True))
+    client = get_feed_client()
+    pubsub = None
+    if client is not None:
+        # subscribed before the outbox is read, so no event falls in between
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(FEED_CHANNEL)
+    if last_event is None:
+        # a new board already shows everything up to now
+        newest = events.committed_after(0, 0).order_by("-transaction_id", "-id").first()
+        last_event = (newest.transaction_id, newest.id) if newest else (0, 0)
+    deadline = time.monotonic() + settings.ORDER_FEED_TIMEOUT
+    yield "retry: {}\n\n".format(settings.ORDER_FEED_POLL * 1000)
+    try:
+        caught_up = False
+        while True:
+            if pubsub is None or not caught_up:
+                batch = list(
+                    events.committed_after(*last_event).select_related("store")[
+                        : settings.ORDER_EVENT_BATCH_SIZE
+                    ]
+                )
+                for event in batch:
+                    last_event = (event.transaction_id, event.id)
+                    yield format_order_event(event.transaction_id, event.as_dict())
+                caught_up = len(batch) < settings.ORDER_EVENT_BATCH_SIZE
+                if not caught_up:
+                    continue
+                if pubsub is not None:
+                    # the database is not needed while waiting on Redis
+                    connection.close()
+            else:
+                message = pubsub.get_message(timeout=settings.ORDER_FEED_POLL)
+                while message is not None:
+                    published = json.loads(message["data"])
+                    position = (published["transaction_id"], published["event"]["id"])
+                    # events read from the outbox are published again later
+                    if (
+                        published["event"]["store"] in store_codes
+                        and position > last_event
+                    ):
+                        last_event = position
+                        yield format_order_event(
+                            published["transaction_id"], published["event"]
+                        )
+                    message = pubsub.get_message()
+            if time.monotonic() >= deadline:
+                return
+            # a comment keeps proxies from closing a quiet stream
+            yield ": \n\n"
+            if pubsub is None:
+                time.sleep(settings.ORDER_FEED_POLL)
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+
+@login_required
+@transaction.non_atomic_requests
+def order_feed(request: HttpRequest) -> StreamingHttpResponse:
+    """Orders placed or changed in the given stores, or all stores, as they happen."""
+    stores = Store.objects.all()
+    if request.GET.getlist("store"):
+        stores = stores.filter(code__in=request.GET.getlist("store"))
+    # the position of the last event seen, as "<transaction id>-<event id>"
+    transaction_id, _, event_id = request.headers.get("Last-Event-ID", "").partition(
+        "-"
+    )
+    response = StreamingHttpResponse(
+        order_event_stream(
+            stores,
+            (int(transaction_id), int(event_id))
+            if transaction_id.isdigit() and event_id.isdigit()
+            else None,
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx would otherwise hold the events back in its buffer
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+def order_row(request: HttpRequest, order_uuid: uuid.UUID) -> HttpResponse:
+    """One order of the order board, for the board to add or swap in."""
+    order = get_object_or_404(
+        Order.objects.select_related("store", "user", "claimed_by"), uuid=order_uuid
+    )
+    return render(request, "transaction/order_row.html", {"order": order})
+
+
+@login_required
+@transaction.non_atomic_requests
+def export_orders(request: HttpRequest) -> HttpResponse:
+    """The orders of the board's filters, or their items, as a CSV or NDJSON file."""
+    form = OrderExportForm(request.GET, user=request.user)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+
+    export_format = form.cleaned_data["format"]
+    response = StreamingHttpResponse(
+        exports.export_orders(
+            form.filter(Order.objects.all()),
+            form.cleaned_data["items"],
+            export_format,
+        ),
+        content_type=exports.EXPORT_CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = 'attachment; filename="{}.{}"'.format(
+        "order_items" if form.cleaned_data["items"] else "orders", export_format
+    )
+    return response
+
+
+@login_required
+def sales(request: HttpRequest) -> HttpResponse:
+    """
+    Orders, revenue and the best selling products by day, read from the daily
+    sales rollups rather than aggregated from the orders.
+    """
+    form = SalesReportForm(request.GET or {})
+    if not form.is_valid():
+        return render(request, "transaction/sales.html", {"form": form})
+
+    statuses = [status for status, _ in Order.ORDER_STATUS_CHOICES]
+    days: dict[date, dict[str, Any]] = {}
+    for row in (
+        form.filter(DailySales.objects.all())
+        .values("day", "status")
+        .annotate(orders=Sum("orders"), revenue=Sum("revenue"))
+    ):
+        day = days.setdefault(
+            row["day"],
+            {"day": row["day"], "orders": dict.fromkeys(statuses, 0), "revenue": 0},
+        )
+        day["orders"][row["status"]] = row["orders"]
+        if row["status"] != "cancelled":
+            day["revenue"] += row["revenue"]
+
+    products = (
+        form.filter(DailyProductSales.objects.all())
+        .values("product__name")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"), orders=Sum("orders"))
+        .order_by("-revenue")[: settings.ITEMS_PER_PAGE]
+    )
+    return render(
+        request,
+        "transaction/sales.html",
+        {
+            "form": form,
+            "statuses": Order.ORDER_STATUS_CHOICES,
+            "days": [
+                dict(day, orders=[day["orders"][status] for status in statuses])
+                for _, day in sorted(days.items())
+            ],
+            "products": products,
+        },
+    )